@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from app.cli.build_store import build_from_path
+from app.cli.export_bulk import iter_json_paths
+from app.services.text_store import TextStore, section_text_refs
+from app.utils.ids import sha256_str
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_manifest(out_dir: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(out_dir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _output_stems(paths: List[str]) -> Dict[str, str]:
+    """basename without extension; disambiguated with a path hash when two inputs collide."""
+    stems: Dict[str, str] = {}
+    used = set()
+    for p in paths:
+        stem = os.path.splitext(os.path.basename(p))[0]
+        if stem in used:
+            stem = f"{stem}-{sha256_str(os.path.abspath(p))[:8]}"
+        used.add(stem)
+        stems[p] = stem
+    return stems
+
+
+def build_one(in_path: str, store_path: str, schema_path: str, opts: Dict[str, Any],
+              text_store_dir: Optional[str] = None, similarity: bool = False) -> Dict[str, Any]:
+    """
+    Worker entry point: build one store + schema and write both to disk.
+    With text_store_dir, section text goes into the shared text store and the written
+    store references it by text_hash; the caller records the returned text_refs.
+    With similarity, the sections' MinHash signatures are computed here, in the worker,
+    and returned for the caller's clause index.
+    """
+    t0 = time.perf_counter()
+    store, schema = build_from_path(in_path, **opts)
+    signatures = None
+    if similarity:
+        from app.core.config import settings
+        from app.services.similarity import section_signatures
+
+        signatures = section_signatures(store, settings.similarity_num_perm, settings.similarity_shingle_size,
+                                        settings.similarity_min_tokens)
+    text_refs = None
+    if text_store_dir:
+        store = TextStore(text_store_dir, load_refs=False).add_store(store)
+        text_refs = section_text_refs(store)
+    with open(store_path, "w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False, indent=2)
+    with open(schema_path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False, indent=2)
+    return {
+        "doc_id": store["document"]["doc_id"],
+        "elements": store["provenance"].get("elements_count", 0),
+        "sections": len(store["sections"]),
+        "seconds": time.perf_counter() - t0,
+        "text_refs": text_refs,
+        "signatures": signatures,
+    }
+
+
+def _push_to_kg(store_paths: List[str], batch_size: int, mode: str, text_store: Optional[TextStore] = None) -> int:
+    from app.services.kg import KGClient
+
+    def _load(path: str) -> Dict[str, Any]:
+        with open(path, "r", encoding="utf-8") as f:
+            store = json.load(f)
+        return text_store.rehydrate(store) if text_store is not None else store
+
+    kg = KGClient()
+    pushed = 0
+    try:
+        kg.ensure_constraints()
+        for i in range(0, len(store_paths), batch_size):
+            batch = store_paths[i: i + batch_size]
+            if mode == "full":
+                # one transaction per batch
+                kg.import_stores([_load(path) for path in batch])
+            else:
+                # delta diffs each document against what is stored for it
+                for path in batch:
+                    kg.import_store(_load(path), mode=mode)
+            pushed += len(batch)
+            print(f"KG: {pushed}/{len(store_paths)} stores imported")
+    finally:
+        kg.close()
+    return pushed
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description="Normalize a whole corpus of raw JSON files into M&A stores.")
+    p.add_argument("inputs", nargs="+", help="Raw JSON files, directories or glob patterns")
+    p.add_argument("--out-dir", dest="out_dir", default="corpus_out", help="Directory for stores, schemas and the manifest")
+    p.add_argument("--jobs", dest="jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    p.add_argument("--extracted-with", dest="extracted_with", default="unknown")
+    p.add_argument("--schema-version", dest="schema_version", default="1.0.0")
+    p.add_argument("--index-text", dest="index_text", action="store_true", help="Include full text in topology.section_index")
+    p.add_argument("--snippet-chars", dest="snippet_chars", type=int, default=280)
+    p.add_argument("--force", dest="force", action="store_true", help="Rebuild even if the manifest says an input is unchanged")
+    p.add_argument("--to-kg", dest="to_kg", action="store_true", help="Import built stores into Neo4j")
+    p.add_argument("--kg-batch", dest="kg_batch", type=int, default=50, help="Stores per KG write transaction (full mode; delta imports one store at a time)")
+    p.add_argument("--kg-mode", dest="kg_mode", default="full", choices=["full", "delta"])
+    p.add_argument("--text-store", dest="text_store", default=None,
+                   help="Directory of a shared content-addressed text store; stores then reference section text by text_hash")
+    p.add_argument("--similarity-index", dest="similarity_index", default=None,
+                   help="MinHash/LSH clause index file to update (serve it with SIMILARITY_INDEX_PATH); needs numpy")
+    args = p.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    opts = {
+        "schema_version": args.schema_version,
+        "extracted_with": args.extracted_with,
+        "index_text": args.index_text,
+        "snippet_chars": args.snippet_chars,
+    }
+    # stores written against a text store have a different shape, so it is part of the options
+    opts_hash = sha256_str(json.dumps({**opts, "text_store": os.path.abspath(args.text_store) if args.text_store else None},
+                                      sort_keys=True))
+    manifest = _load_manifest(args.out_dir)
+    text_store = TextStore(args.text_store) if args.text_store else None
+    clause_index = None
+    if args.similarity_index:
+        from app.services.similarity import ClauseIndex
+
+        clause_index = (ClauseIndex.load(args.similarity_index) if os.path.exists(args.similarity_index)
+                        else ClauseIndex())
+
+    t0 = time.perf_counter()
+    paths = list(dict.fromkeys(iter_json_paths(args.inputs)))
+    stems = _output_stems(paths)
+    todo = []
+    skipped = 0
+    unindexed = []  # unchanged inputs whose documents the clause index does not have yet
+    indexed_docs = set(clause_index.documents()) if clause_index is not None else set()
+    bytes_in = 0
+    for path in paths:
+        key = os.path.abspath(path)
+        content_hash = _file_sha256(path)
+        store_path = os.path.join(args.out_dir, stems[path] + ".store.json")
+        schema_path = os.path.join(args.out_dir, stems[path] + ".schema.json")
+        prev = manifest.get(key)
+        if (not args.force and prev and prev.get("hash") == content_hash and prev.get("options") == opts_hash
+                and os.path.exists(prev.get("store", "")) and os.path.exists(prev.get("schema", ""))):
+            skipped += 1
+            if clause_index is not None and prev.get("doc_id") not in indexed_docs:
+                unindexed.append(prev["store"])
+            continue
+        bytes_in += os.path.getsize(path)
+        todo.append((key, path, content_hash, store_path, schema_path))
+
+    built: List[str] = []
+    failed = 0
+    sections = 0
+    elements = 0
+
+    def _record(item, res):
+        nonlocal sections, elements
+        key, path, content_hash, store_path, schema_path = item
+        manifest[key] = {"hash": content_hash, "options": opts_hash, "store": store_path,
+                         "schema": schema_path, "doc_id": res["doc_id"]}
+        built.append(store_path)
+        if text_store is not None:
+            text_store.set_refs(res["doc_id"], res["text_refs"] or {})
+        if clause_index is not None:
+            clause_index.add_signatures(res["doc_id"], *res["signatures"])
+        sections += res["sections"]
+        elements += res["elements"]
+        print(f"✓ {path} → {store_path} ({res['sections']} sections, {res['seconds']:.2f}s)")
+
+    jobs = max(1, args.jobs)
+    if jobs == 1 or len(todo) <= 1:
+        for item in todo:
+            try:
+                _record(item, build_one(item[1], item[3], item[4], opts, args.text_store, clause_index is not None))
+            except Exception as e:
+                failed += 1
+                print(f"✗ {item[1]}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+            futs = {pool.submit(build_one, item[1], item[3], item[4], opts, args.text_store,
+                                   clause_index is not None): item for item in todo}
+            for fut in as_completed(futs):
+                item = futs[fut]
+                try:
+                    _record(item, fut.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"✗ {item[1]}: {e}")
+    _save_manifest(args.out_dir, manifest)
+    text_gc = 0
+    if text_store is not None:
+        text_gc = text_store.gc()
+        text_store.save()
+    if clause_index is not None:
+        for store_path in unindexed:
+            with open(store_path, "r", encoding="utf-8") as f:
+                store = json.load(f)
+            clause_index.add_store(text_store.rehydrate(store) if text_store is not None else store)
+        clause_index.save(args.similarity_index)
+    build_secs = time.perf_counter() - t0
+
+    pushed = 0
+    if args.to_kg and built:
+        pushed = _push_to_kg(sorted(built), max(1, args.kg_batch), args.kg_mode, text_store)
+    total_secs = time.perf_counter() - t0
+
+    rate = build_secs or 1e-9
+    print("")
+    print(f"Inputs: {len(paths)}  built: {len(built)}  skipped (unchanged): {skipped}  failed: {failed}")
+    print(f"Elements: {elements}  sections: {sections}  input MB: {bytes_in / 1e6:.1f}")
+    print(f"Build: {build_secs:.2f}s  ({len(built) / rate:.2f} files/s, {sections / rate:.0f} sections/s, "
+          f"{bytes_in / 1e6 / rate:.2f} MB/s, jobs={jobs})")
+    if text_store is not None:
+        ts = text_store.stats()
+        print(f"Text store: {ts['unique_texts']} unique texts for {ts['section_refs']} section refs "
+              f"(x{ts['dedupe_ratio']}), {ts['shared_texts']} shared across documents, {text_gc} collected")
+    if clause_index is not None:
+        cs = clause_index.stats()
+        print(f"Similarity index: {cs['sections']} sections from {cs['documents']} documents "
+              f"({len(unindexed)} backfilled) → {args.similarity_index}")
+    if args.to_kg:
+        print(f"KG: {pushed} stores imported (mode={args.kg_mode})  total: {total_secs:.2f}s")
+    print(f"Manifest → {os.path.join(args.out_dir, MANIFEST_NAME)}")
+
+if __name__ == "__main__":
+    main()
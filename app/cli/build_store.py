@@ -5,6 +5,22 @@ from app.services.loaders import load_from_path
 from app.services.builder import StoreBuilder
 from app.schemas.json_schema import build_dynamic_schema
 
+def build_from_path(in_path, schema_version="1.0.0", extracted_with="unknown", index_text=False, snippet_chars=280):
+    """Load one raw JSON file and return (store dict, dynamic schema)."""
+    elements = load_from_path(in_path)
+    filename = os.path.basename(in_path)
+
+    builder = StoreBuilder(
+        elements,
+        filename=filename,
+        schema_version=schema_version,
+        extracted_with=extracted_with,
+        include_text_in_index=index_text,
+        snippet_chars=snippet_chars,
+    )
+    store = builder.build().model_dump(exclude_none=False)
+    return store, build_dynamic_schema(store)
+
 def main():
     p = argparse.ArgumentParser(description="Normalize raw JSON into M&A store (non-graph).")
     p.add_argument("--in", dest="in_path", required=True, help="Path to raw JSON")
@@ -16,23 +32,17 @@ def main():
     p.add_argument("--snippet-chars", dest="snippet_chars", type=int, default=280)
     args = p.parse_args()
 
-    elements = load_from_path(args.in_path)
-    filename = os.path.basename(args.in_path)
-
-    builder = StoreBuilder(
-        elements,
-        filename=filename,
+    store, schema = build_from_path(
+        args.in_path,
         schema_version=args.schema_version,
         extracted_with=args.extracted_with,
-        include_text_in_index=args.index_text,
+        index_text=args.index_text,
         snippet_chars=args.snippet_chars,
     )
-    store = builder.build().model_dump(exclude_none=False)
 
     with open(args.out_path, "w", encoding="utf-8") as f:
         json.dump(store, f, ensure_ascii=False, indent=2)
 
-    schema = build_dynamic_schema(store)
     with open(args.schema_path, "w", encoding="utf-8") as f:
         json.dump(schema, f, ensure_ascii=False, indent=2)
 
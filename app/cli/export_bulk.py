@@ -0,0 +1,202 @@
+import argparse
+import csv
+import glob
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from app.models.store import DocumentHeader
+from app.services.kg import build_import_params
+
+# (column, neo4j-admin type) — same properties KGClient.import_store writes
+_DOC_COLUMNS = [(k, "int" if k == "version" else None) for k in DocumentHeader.model_fields if k != "doc_id"] + [
+    ("doc_key", None)]
+_SECTION_COLUMNS = [
+    ("element_id", None), ("title", None), ("label", None), ("level", "int"), ("text", None),
+    ("page_start", "int"), ("page_end", "int"), ("element_type", None), ("text_length", "int"),
+    ("missing_text", "boolean"), ("text_hash", None), ("tree_pre", "int"), ("tree_post", "int"),
+    ("tree_depth", "int"), ("ancestor_ids", "string[]"), ("sync_hash", None),
+]
+_DEFINITION_COLUMNS = [("term", None), ("text", None)]
+_TEXT_COLUMNS = [("length", "int")]
+
+# rel type -> (file stem, start id-space, end id-space)
+_RELS = {
+    "HAS_SECTION": ("has_section", "Document", "Section"),
+    "PARENT_SECTION": ("parent_section", "Section", "Section"),
+    "NEXT_SECTION": ("next_section", "Section", "Section"),
+    "DEFINES": ("defines", "Section", "Definition"),
+    "REFERS_TO": ("refers_to", "Section", "Section"),
+    "HAS_TEXT": ("has_text", "Section", "Text"),
+}
+
+
+def _header(id_col: str, id_space: str, columns: List[Tuple[str, Any]]) -> List[str]:
+    cols = [f"{id_col}:ID({id_space})"]
+    cols += [f"{name}:{typ}" if typ else name for name, typ in columns]
+    cols.append(":LABEL")
+    return cols
+
+
+def _cell(v: Any) -> Any:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, list) and all(isinstance(x, str) for x in v):
+        return ";".join(v)  # neo4j-admin array delimiter
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def iter_json_paths(inputs: Iterable[str]) -> Iterator[str]:
+    """Expand files, directories (*.json) and glob patterns, in a stable order."""
+    for item in inputs:
+        if os.path.isdir(item):
+            yield from sorted(glob.glob(os.path.join(item, "*.json")))
+        elif any(ch in item for ch in "*?["):
+            yield from sorted(glob.glob(item, recursive=True))
+        else:
+            yield item
+
+
+class BulkCSVWriter:
+    """
+    Writes node/relationship CSVs in neo4j-admin header format, one store at a time.
+    Node ids and relationships are de-duplicated across every store written.
+    """
+
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self._files = []
+        self._docs = self._open("documents", _header("doc_id", "Document", _DOC_COLUMNS))
+        self._sections = self._open("sections", _header("section_id", "Section", _SECTION_COLUMNS))
+        self._definitions = self._open("definitions", _header("def_id", "Definition", _DEFINITION_COLUMNS))
+        self._texts = self._open("texts", _header("text_hash", "Text", _TEXT_COLUMNS))
+        self._rels = {
+            rtype: self._open(stem, [f":START_ID({a})", f":END_ID({b})", ":TYPE"])
+            for rtype, (stem, a, b) in _RELS.items()
+        }
+        self.seen_docs: Set[str] = set()
+        self.seen_sections: Set[str] = set()
+        self.seen_definitions: Set[str] = set()
+        self.seen_texts: Set[str] = set()
+        self.seen_rels: Set[Tuple[str, str, str]] = set()
+        self.counts: Dict[str, int] = {"stores": 0, "Document": 0, "Section": 0, "Definition": 0, "Text": 0}
+        self.counts.update({rtype: 0 for rtype in _RELS})
+
+    def _open(self, stem: str, header: List[str]):
+        f = open(os.path.join(self.out_dir, f"{stem}.csv"), "w", encoding="utf-8", newline="")
+        self._files.append(f)
+        w = csv.writer(f)
+        w.writerow(header)
+        return w
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+
+    def _rel(self, rtype: str, a: str, b: str) -> None:
+        key = (rtype, a, b)
+        if key in self.seen_rels:
+            return
+        self.seen_rels.add(key)
+        self._rels[rtype].writerow([a, b, rtype])
+        self.counts[rtype] += 1
+
+    def write_store(self, store: Dict[str, Any]) -> None:
+        params = build_import_params(store)
+        doc_id = params["doc"]["doc_id"]
+        if not doc_id:
+            raise ValueError("store has no document.doc_id")
+        self.counts["stores"] += 1
+
+        if doc_id not in self.seen_docs:
+            self.seen_docs.add(doc_id)
+            props = params["doc"]["props"]
+            self._docs.writerow([doc_id] + [_cell(props.get(k)) for k, _ in _DOC_COLUMNS] + ["Document"])
+            self.counts["Document"] += 1
+
+        local_sections: Set[str] = set()
+        for s in params["sections"]:
+            sid = s["section_id"]
+            local_sections.add(sid)
+            if sid not in self.seen_sections:
+                self.seen_sections.add(sid)
+                self._sections.writerow([sid] + [_cell(s["props"].get(k)) for k, _ in _SECTION_COLUMNS] + ["Section"])
+                self.counts["Section"] += 1
+            self._rel("HAS_SECTION", doc_id, sid)
+            th = s["props"].get("text_hash")
+            if th:
+                if th not in self.seen_texts:
+                    self.seen_texts.add(th)
+                    self._texts.writerow([th, _cell(s["props"].get("text_length")), "Text"])
+                    self.counts["Text"] += 1
+                self._rel("HAS_TEXT", sid, th)
+
+        # Like the MATCH clauses in IMPORT_QUERY, only link sections that exist
+        known = local_sections | self.seen_sections
+        for r in params["parent_rels"]:
+            if r["child"] in known and r["parent"] in known:
+                self._rel("PARENT_SECTION", r["child"], r["parent"])
+        for r in params["next_rels"]:
+            if r["a"] in known and r["b"] in known:
+                self._rel("NEXT_SECTION", r["a"], r["b"])
+        for d in params["definitions"]:
+            if d["def_id"] not in self.seen_definitions:
+                self.seen_definitions.add(d["def_id"])
+                self._definitions.writerow([d["def_id"], _cell(d["term"]), _cell(d["text"]), "Definition"])
+                self.counts["Definition"] += 1
+            if d["section_id"] in known:
+                self._rel("DEFINES", d["section_id"], d["def_id"])
+        for x in params["xrefs"]:
+            if x["source"] in known and x["target"] in known:
+                self._rel("REFERS_TO", x["source"], x["target"])
+
+    def admin_command(self, database: str = "neo4j") -> str:
+        d = self.out_dir
+        parts = ["neo4j-admin database import full", database, "--multiline-fields=true"]
+        for stem, label in (("documents", "Document"), ("sections", "Section"), ("definitions", "Definition"), ("texts", "Text")):
+            parts.append(f"--nodes={label}={os.path.join(d, stem + '.csv')}")
+        for rtype, (stem, _a, _b) in _RELS.items():
+            parts.append(f"--relationships={rtype}={os.path.join(d, stem + '.csv')}")
+        return " ".join(parts)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export store JSON files to neo4j-admin bulk import CSVs.")
+    p.add_argument("inputs", nargs="+", help="Store JSON files, directories or glob patterns")
+    p.add_argument("--out-dir", dest="out_dir", default="kg_import", help="Directory for the CSV files")
+    p.add_argument("--database", dest="database", default="neo4j", help="Target database name for the printed command")
+    p.add_argument("--text-store", dest="text_store", default=None,
+                   help="Text store directory for stores written by build_corpus --text-store")
+    args = p.parse_args()
+
+    text_store = None
+    if args.text_store:
+        from app.services.text_store import TextStore
+        text_store = TextStore(args.text_store, load_refs=False)
+
+    writer = BulkCSVWriter(args.out_dir)
+    try:
+        for path in iter_json_paths(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                store = json.load(f)
+            # accept both a bare store and a /structure response ({"store": ...})
+            if isinstance(store, dict) and "store" in store and "document" not in store:
+                store = store["store"]
+            if text_store is not None:
+                store = text_store.rehydrate(store)
+            writer.write_store(store)
+    finally:
+        writer.close()
+
+    for k, v in writer.counts.items():
+        print(f"{k}: {v}")
+    print(f"CSV → {args.out_dir}")
+    print(writer.admin_command(args.database))
+
+if __name__ == "__main__":
+    main()
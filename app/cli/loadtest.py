@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.loaders import load_any_shape
+from app.services.builder import StoreBuilder
+
+SCENARIOS = ("pymupdf", "structure", "rawjson", "kg-import")
+# statuses the admission controller uses for "try again later"
+_REJECT_STATUSES = {429, 503}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100.0) - 1))
+    return sorted_values[k]
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """VmRSS of pid plus its direct children (uvicorn --workers), from /proc. None off Linux."""
+    def one(p: int) -> int:
+        try:
+            with open(f"/proc/{p}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    if not os.path.exists(f"/proc/{pid}"):
+        return None
+    total = one(pid)
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            total += sum(one(int(c)) for c in f.read().split())
+    except OSError:
+        pass
+    return round(total / 1024, 1)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, env: Dict[str, str], prefork: bool = False) -> subprocess.Popen:
+    if prefork:
+        cmd = [sys.executable, "-m", "app.cli.serve", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+        return subprocess.Popen(cmd, env={**os.environ, **env})
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    return subprocess.Popen(cmd, env={**os.environ, **env})
+
+
+async def wait_ready(client, base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} not ready after {timeout:.0f}s")
+
+
+def build_requests(args) -> Dict[str, Callable[[Any, str], Any]]:
+    """scenario -> coroutine factory (client, base_url) -> response. Payloads are read once."""
+    with open(args.pdf, "rb") as f:
+        pdf = f.read()
+    with open(args.json, "rb") as f:
+        json_bytes = f.read()
+    raw = json.loads(json_bytes)
+    pdf_name = os.path.basename(args.pdf)
+    json_name = os.path.basename(args.json)
+    store = None
+    if "kg-import" in args.scenario:
+        store = StoreBuilder(load_any_shape(raw), filename=json_name).build().model_dump(exclude_none=False)
+    store_body = json.dumps(store).encode("utf-8") if store is not None else b""
+    raw_body = json.dumps(raw).encode("utf-8")
+    headers = {"content-type": "application/json"}
+
+    return {
+        "pymupdf": lambda c, u: c.post(f"{u}/api/extraction/pymupdf", files={"file": (pdf_name, pdf, "application/pdf")}),
+        "structure": lambda c, u: c.post(f"{u}/api/extraction/structure", params={"include_schema": "false"},
+                                         files={"file": (json_name, json_bytes, "application/json")}),
+        "rawjson": lambda c, u: c.post(f"{u}/api/extraction/rawjson", params={"include_schema": "false"},
+                                       content=raw_body, headers=headers),
+        "kg-import": lambda c, u: c.post(f"{u}/api/kg/import", params={"mode": args.kg_mode},
+                                         content=store_body, headers=headers),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, seconds: float, status: str) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        counts = self.statuses.setdefault(name, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def report(self, name: str, wall: float) -> Dict[str, Any]:
+        lat = sorted(self.latencies.get(name, []))
+        counts = self.statuses.get(name, {})
+        n = len(lat)
+        ok = sum(v for k, v in counts.items() if k.startswith("2"))
+        rejected = sum(v for k, v in counts.items() if k.isdigit() and int(k) in _REJECT_STATUSES)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        return {
+            "requests": n,
+            "ok": ok,
+            "rejected": rejected,
+            "errors": n - ok - rejected,
+            "error_rate": round((n - ok) / n, 4) if n else 0.0,
+            "throughput_rps": round(ok / wall, 2) if wall else 0.0,
+            "p50_ms": ms(_percentile(lat, 50)),
+            "p95_ms": ms(_percentile(lat, 95)),
+            "p99_ms": ms(_percentile(lat, 99)),
+            "max_ms": ms(lat[-1] if lat else None),
+            "statuses": counts,
+        }
+
+
+async def _timed(rec: Recorder, name: str, make, client, base_url: str) -> None:
+    t0 = time.perf_counter()
+    try:
+        resp = await make(client, base_url)
+        await resp.aread()
+        status = str(resp.status_code)
+    except Exception as e:
+        status = type(e).__name__
+    rec.add(name, time.perf_counter() - t0, status)
+
+
+async def run_scenario(name: str, make, client, base_url: str, args, rec: Recorder) -> float:
+    """
+    Closed loop (rate=0): `concurrency` workers each send back-to-back requests.
+    Open loop (rate>0): requests start on a fixed schedule, at most `concurrency` in flight,
+    so a slow server shows up as latency instead of a lower offered rate.
+    """
+    deadline = time.perf_counter() + args.duration
+    budget = args.requests or None
+    sent = 0
+    t0 = time.perf_counter()
+
+    if args.rate <= 0:
+        async def worker():
+            nonlocal sent
+            while time.perf_counter() < deadline and (budget is None or sent < budget):
+                sent += 1
+                await _timed(rec, name, make, client, base_url)
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    else:
+        sem = asyncio.Semaphore(args.concurrency)
+        tasks = []
+        interval = 1.0 / args.rate
+
+        async def one():
+            async with sem:
+                await _timed(rec, name, make, client, base_url)
+
+        next_at = time.perf_counter()
+        while time.perf_counter() < deadline and (budget is None or sent < budget):
+            tasks.append(asyncio.create_task(one()))
+            sent += 1
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+    return time.perf_counter() - t0
+
+
+async def probe_health(client, base_url: str, rec: Recorder, stop: asyncio.Event, hz: float) -> None:
+    """GET /health at a steady rate: its tail latency exposes event-loop blocking under load."""
+    while not stop.is_set():
+        await _timed(rec, "health-probe", lambda c, u: c.get(f"{u}/health"), client, base_url)
+        try:
+            await asyncio.wait_for(stop.wait(), 1.0 / hz)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def sample_rss(pid: Optional[int], samples: List[float], stop: asyncio.Event) -> None:
+    while pid and not stop.is_set():
+        rss = _rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> Dict[str, Any]:
+    try:
+        import httpx
+    except ImportError as e:
+        raise RuntimeError("The load generator needs httpx. Install with: pip install httpx (or the [loadtest] extra)") from e
+
+    makers = build_requests(args)
+    server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if base_url is None:
+        port = _free_port()
+        env = {"KG_BACKEND": "memory"}
+        if args.no_admission:
+            env["ADMISSION_ENABLED"] = "false"
+        server = start_server(port, args.workers, env, args.prefork)
+        base_url = f"http://127.0.0.1:{port}"
+    pid = server.pid if server else args.server_pid
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    report: Dict[str, Any] = {"base_url": base_url, "concurrency": args.concurrency, "rate": args.rate,
+                              "duration": args.duration, "scenarios": {}}
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client, base_url, args.startup_timeout)
+            for _ in range(args.warmup):
+                for name in args.scenario:
+                    await makers[name](client, base_url)
+            report["rss_mb_idle"] = _rss_mb(pid) if pid else None
+
+            for name in args.scenario:
+                rec = Recorder()
+                stop = asyncio.Event()
+                rss: List[float] = []
+                side = [asyncio.create_task(probe_health(client, base_url, rec, stop, args.probe_hz)),
+                        asyncio.create_task(sample_rss(pid, rss, stop))]
+                wall = await run_scenario(name, makers[name], client, base_url, args, rec)
+                stop.set()
+                await asyncio.gather(*side)
+                entry = rec.report(name, wall)
+                entry["wall_seconds"] = round(wall, 3)
+                entry["health_probe"] = {k: v for k, v in rec.report("health-probe", wall).items()
+                                         if k in ("requests", "errors", "p50_ms", "p99_ms", "max_ms")}
+                entry["rss_mb_peak"] = max(rss) if rss else None
+                report["scenarios"][name] = entry
+                print_entry(name, entry)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    return report
+
+
+def print_entry(name: str, e: Dict[str, Any]) -> None:
+    hp = e["health_probe"]
+    print(f"{name:<10} n={e['requests']:<6} ok={e['ok']:<6} rej={e['rejected']:<4} err={e['errors']:<4} "
+          f"{e['throughput_rps']:>8.2f} req/s  p50={e['p50_ms']}ms p95={e['p95_ms']}ms p99={e['p99_ms']}ms "
+          f"max={e['max_ms']}ms  rss_peak={e['rss_mb_peak']}MB  /health p99={hp['p99_ms']}ms")
+
+
+def check_slos(report: Dict[str, Any], args) -> List[str]:
+    failures = []
+    for name, e in report["scenarios"].items():
+        if args.slo_p95_ms is not None and e["p95_ms"] is not None and e["p95_ms"] > args.slo_p95_ms:
+            failures.append(f"{name}: p95 {e['p95_ms']}ms > {args.slo_p95_ms}ms")
+        if args.slo_p99_ms is not None and e["p99_ms"] is not None and e["p99_ms"] > args.slo_p99_ms:
+            failures.append(f"{name}: p99 {e['p99_ms']}ms > {args.slo_p99_ms}ms")
+        if args.slo_error_rate is not None and e["error_rate"] > args.slo_error_rate:
+            failures.append(f"{name}: error rate {e['error_rate']} > {args.slo_error_rate}")
+        hp99 = e["health_probe"]["p99_ms"]
+        if args.slo_health_p99_ms is not None and hp99 is not None and hp99 > args.slo_health_p99_ms:
+            failures.append(f"{name}: /health p99 {hp99}ms > {args.slo_health_p99_ms}ms (event loop blocked?)")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description="Drive the API with concurrent clients and report latency percentiles.")
+    p.add_argument("--scenario", action="append", choices=SCENARIOS,
+                   help="Endpoint(s) to load, run one after another (default: all)")
+    p.add_argument("--url", default=None, help="Target an already running server instead of starting one")
+    p.add_argument("--server-pid", dest="server_pid", type=int, default=None, help="PID to sample RSS from with --url")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn workers for the server started here")
+    p.add_argument("--prefork", action="store_true",
+                   help="Start the server with app.cli.serve (preloaded app, forked workers) instead of uvicorn")
+    p.add_argument("--no-admission", dest="no_admission", action="store_true",
+                   help="Start the server with ADMISSION_ENABLED=false")
+    p.add_argument("--concurrency", type=int, default=8, help="Max requests in flight")
+    p.add_argument("--rate", type=float, default=0.0, help="Offered requests/s (open loop); 0 = closed loop")
+    p.add_argument("--duration", type=float, default=15.0, help="Seconds per scenario")
+    p.add_argument("--requests", type=int, default=0, help="Stop a scenario after this many requests (0 = no cap)")
+    p.add_argument("--warmup", type=int, default=1, help="Untimed requests per scenario before measuring")
+    p.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (seconds)")
+    p.add_argument("--startup-timeout", dest="startup_timeout", type=float, default=60.0)
+    p.add_argument("--probe-hz", dest="probe_hz", type=float, default=10.0, help="/health probe rate during a scenario")
+    p.add_argument("--pdf", default="Office Lease Agreement.pdf", help="PDF for /pymupdf")
+    p.add_argument("--json", default="raw_min.json", help="Extraction JSON for /structure, /rawjson and the KG store")
+    p.add_argument("--kg-mode", dest="kg_mode", default="full", choices=["full", "delta"])
+    p.add_argument("--slo-p95-ms", dest="slo_p95_ms", type=float, default=None)
+    p.add_argument("--slo-p99-ms", dest="slo_p99_ms", type=float, default=None)
+    p.add_argument("--slo-error-rate", dest="slo_error_rate", type=float, default=None)
+    p.add_argument("--slo-health-p99-ms", dest="slo_health_p99_ms", type=float, default=None)
+    p.add_argument("--out", default=None, help="Write the full JSON report here")
+    args = p.parse_args(argv)
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    report = asyncio.run(run(args))
+    failures = check_slos(report, args)
+    report["slo_failures"] = failures
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report → {args.out}")
+    for msg in failures:
+        print(f"SLO violated: {msg}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
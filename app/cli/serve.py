@@ -0,0 +1,191 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+log = logging.getLogger("app.serve")
+
+
+def _shared_cache_env(cache_dir: Optional[str], workers: int = 1) -> None:
+    """
+    Point the page and build caches, the spatial indexes and the similarity index at one
+    directory tree all workers read and write. Must run before the app (and its settings)
+    is imported.
+    """
+    if cache_dir:
+        os.environ.setdefault("PAGE_CACHE_DIR", os.path.join(cache_dir, "pages"))
+        os.environ.setdefault("BUILD_CACHE_DIR", os.path.join(cache_dir, "builds"))
+        os.environ.setdefault("SPATIAL_INDEX_DIR", os.path.join(cache_dir, "spatial"))
+        os.environ.setdefault("SIMILARITY_INDEX_PATH", os.path.join(cache_dir, "similarity", "index.npz"))
+    if workers > 1 and os.getenv("SIMILARITY_INDEX_PATH"):
+        os.environ.setdefault("SIMILARITY_SHARED", "1")
+
+
+def _warn_per_worker_state(workers: int) -> None:
+    """/api/spatial and /api/similarity keep state in memory: say so when it isn't shared."""
+    if workers <= 1:
+        return
+    from app.core.config import settings
+
+    unshared = []
+    if not settings.spatial_index_dir:
+        unshared.append("/api/spatial (set SPATIAL_INDEX_DIR or --cache-dir)")
+    if not (settings.similarity_index_path and settings.similarity_shared):
+        unshared.append("/api/similarity (set SIMILARITY_INDEX_PATH and SIMILARITY_SHARED=1, or --cache-dir)")
+    if unshared:
+        log.warning("%d workers: indexes registered through %s live in one worker only; requests landing "
+                    "on another worker will not see them", workers, ", ".join(unshared))
+
+
+def preload(backends: List[str]):
+    """
+    Import the app and warm the named backends in this (parent) process, then freeze
+    the heap so forked workers share it copy-on-write. Returns the ASGI app.
+    """
+    t0 = time.perf_counter()
+    from main import app  # routers, parsers (compiled regexes), models, caches
+    from app.core.warmup import STARTUP_REPORT, warm_up
+
+    if backends:
+        warm_up(backends)
+    # everything allocated so far lives for the whole process: keep the collector from
+    # walking it (and dirtying its pages) in every worker
+    gc.collect()
+    gc.freeze()
+    STARTUP_REPORT["preload_seconds"] = round(time.perf_counter() - t0, 6)
+    STARTUP_REPORT["preloaded_objects"] = gc.get_freeze_count()
+    return app
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, args) -> None:
+    """Child process: serve on the inherited socket until SIGTERM/SIGINT."""
+    import uvicorn
+    from app.core.warmup import STARTUP_REPORT
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    STARTUP_REPORT["worker_pid"] = os.getpid()
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive,
+                            timeout_graceful_shutdown=args.graceful_timeout)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, args)
+        except BaseException:
+            log.exception("worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(args) -> None:
+    _shared_cache_env(args.cache_dir, args.workers)
+    _warn_per_worker_state(args.workers)
+    backends = [b.strip() for b in (args.preload if args.preload is not None
+                                    else os.getenv("WARMUP_BACKENDS", "")).split(",") if b.strip()]
+    app = preload(backends)
+    sock = _bind(args.host, args.port, args.backlog)
+    workers: Dict[int, float] = {}
+    stopping = False
+
+    def _stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for _ in range(args.workers):
+        workers[_spawn(app, sock, args)] = time.monotonic()
+    log.warning("serving on %s:%s with %d workers (pids %s), preloaded %s",
+                args.host, args.port, args.workers, sorted(workers), backends or "app only")
+
+    deadline = None
+    while workers:
+        if stopping and deadline is None:
+            deadline = time.monotonic() + args.graceful_timeout + 5
+        if deadline is not None and time.monotonic() > deadline:
+            log.error("workers %s did not stop in time; killing", sorted(workers))
+            for pid in workers:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            deadline = float("inf")
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        # a worker that dies right after starting would crash-loop: give up instead
+        if time.monotonic() - started < 1.0 and code != 0:
+            log.error("worker %s exited with %s during startup; stopping", pid, code)
+            _stop(signal.SIGTERM, None)
+            continue
+        log.warning("worker %s exited with %s; restarting", pid, code)
+        workers[_spawn(app, sock, args)] = time.monotonic()
+    sock.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(
+        description="Production server: preload the app once, then fork workers that share it copy-on-write "
+                    "and serve one listening socket. Spatial and similarity indexes registered through the API "
+                    "are held per worker unless --cache-dir (or SPATIAL_INDEX_DIR / SIMILARITY_INDEX_PATH with "
+                    "SIMILARITY_SHARED=1) puts them on disk; serve warns when they are not shared.")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count). With more than one, use --cache-dir so "
+                        "/api/spatial and /api/similarity state is shared")
+    p.add_argument("--preload", default=None,
+                   help="Comma-separated backends to warm before forking, e.g. pymupdf,unstructured,structure "
+                        "(default: WARMUP_BACKENDS)")
+    p.add_argument("--cache-dir", dest="cache_dir", default=None,
+                   help="Shared on-disk cache root; sets PAGE_CACHE_DIR, BUILD_CACHE_DIR, SPATIAL_INDEX_DIR and "
+                        "SIMILARITY_INDEX_PATH unless already set (and SIMILARITY_SHARED=1 with several workers)")
+    p.add_argument("--backlog", type=int, default=2048)
+    p.add_argument("--keep-alive", dest="keep_alive", type=int, default=5, help="Keep-alive timeout (seconds)")
+    p.add_argument("--graceful-timeout", dest="graceful_timeout", type=int, default=30,
+                   help="Seconds a worker gets to finish in-flight requests on shutdown")
+    p.add_argument("--log-level", dest="log_level", default="info")
+    args = p.parse_args(argv)
+    if not hasattr(os, "fork"):
+        sys.exit("The prefork server needs os.fork (Linux/macOS); use uvicorn --workers elsewhere.")
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    serve(args)
+
+
+if __name__ == "__main__":
+    main()
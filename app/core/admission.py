@@ -0,0 +1,180 @@
+# app/core/admission.py
+from typing import Any, Dict, Optional
+from collections import deque
+import asyncio
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or waited too long)."""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """Token for one admitted request. release() is idempotent and safe from any thread."""
+
+    def __init__(self, limiter: "AdmissionLimiter", waited: float):
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+        self.waited = waited
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter._release_any_thread()
+
+
+class AdmissionLimiter:
+    """
+    Per-endpoint concurrency limit with a bounded FIFO wait queue.
+
+    Up to max_concurrent requests run; up to max_queue more wait at most
+    queue_timeout seconds for a slot. Anything beyond that is rejected at once,
+    so callers can back off (Retry-After) instead of piling onto a saturated worker.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # gauges / counters
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.timed_out_total = 0
+        self.wait_seconds_last = 0.0
+        self.wait_seconds_max = 0.0
+        self._wait_seconds_sum = 0.0
+
+    async def acquire(self) -> AdmissionSlot:
+        self._loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return self._admitted(start)
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_total += 1
+            raise AdmissionRejected(self.name, "queue full", self.retry_after)
+
+        fut = self._loop.create_future()
+        self._waiters.append(fut)
+        try:
+            # release() hands the slot over by resolving the future; _active stays the same
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # slot arrived just as we timed out: give it back
+                self._release()
+            else:
+                fut.cancel()
+            self._discard(fut)
+            self.timed_out_total += 1
+            raise AdmissionRejected(self.name, "timed out waiting for a slot", self.retry_after)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            else:
+                fut.cancel()
+            self._discard(fut)
+            raise
+        return self._admitted(start)
+
+    def _admitted(self, start: float) -> AdmissionSlot:
+        waited = time.perf_counter() - start
+        self.admitted_total += 1
+        self.wait_seconds_last = waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self._wait_seconds_sum += waited
+        return AdmissionSlot(self, waited)
+
+    def _discard(self, fut: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+    def _release_any_thread(self) -> None:
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or running is loop or loop.is_closed():
+            self._release()
+        else:
+            loop.call_soon_threadsafe(self._release)
+
+    def gauges(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "queued": sum(1 for f in self._waiters if not f.done()),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "timed_out_total": self.timed_out_total,
+            "wait_seconds_last": round(self.wait_seconds_last, 6),
+            "wait_seconds_avg": round(self._wait_seconds_sum / self.admitted_total, 6) if self.admitted_total else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+def _limiter_from_settings(name: str) -> AdmissionLimiter:
+    return AdmissionLimiter(
+        name,
+        max_concurrent=getattr(settings, f"admission_{name}_concurrency"),
+        max_queue=getattr(settings, f"admission_{name}_queue"),
+        queue_timeout=settings.admission_queue_timeout,
+        retry_after=settings.admission_retry_after,
+    )
+
+
+LIMITERS: Dict[str, AdmissionLimiter] = {
+    name: _limiter_from_settings(name) for name in ("unstructured", "structure", "rawjson", "compare")
+}
+
+
+async def admit(name: str) -> Optional[AdmissionSlot]:
+    """
+    Acquire a slot on the named limiter, or raise an HTTPException with Retry-After.
+    Returns None when admission control is disabled.
+    """
+    if not settings.admission_enabled:
+        return None
+    try:
+        return await LIMITERS[name].acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            settings.admission_reject_status,
+            f"Server busy ({e.reason}); retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def admission_gauges() -> Dict[str, Any]:
+    return {"enabled": settings.admission_enabled, "endpoints": {n: lim.gauges() for n, lim in LIMITERS.items()}}
@@ -20,10 +20,90 @@ class Settings(BaseModel):
     neo4j_user: str = os.getenv("NEO4J_USER", "")
     neo4j_password: str = os.getenv("NEO4J_PASSWORD", "")
     neo4j_database: str = os.getenv("NEO4J_DATABASE", "neo4j")
+    # "neo4j" (default) or "memory" for the in-process stand-in graph
+    kg_backend: str = os.getenv("KG_BACKEND", "neo4j").strip().lower()
+
+    # /api/kg/search result cache
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+    search_cache_ttl: float = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+
+    # build_dynamic_schema cache (entries keyed by store shape)
+    schema_cache_size: int = int(os.getenv("SCHEMA_CACHE_SIZE", "256"))
+
+    # response compression for /structure and /rawjson
+    compress_min_bytes: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    compress_gzip_level: int = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    compress_zstd_level: int = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+    # bodies at least this large are compressed on a worker thread, off the event loop
+    compress_threadpool_bytes: int = int(os.getenv("COMPRESS_THREADPOOL_BYTES", "262144"))
+
+    # admission control for CPU-heavy endpoints: <n> running + <queue> waiting per endpoint
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() in {"1", "true", "yes", "y"}
+    admission_unstructured_concurrency: int = int(os.getenv("ADMISSION_UNSTRUCTURED_CONCURRENCY", "2"))
+    admission_unstructured_queue: int = int(os.getenv("ADMISSION_UNSTRUCTURED_QUEUE", "8"))
+    admission_structure_concurrency: int = int(os.getenv("ADMISSION_STRUCTURE_CONCURRENCY", "4"))
+    admission_structure_queue: int = int(os.getenv("ADMISSION_STRUCTURE_QUEUE", "16"))
+    admission_rawjson_concurrency: int = int(os.getenv("ADMISSION_RAWJSON_CONCURRENCY", "4"))
+    admission_rawjson_queue: int = int(os.getenv("ADMISSION_RAWJSON_QUEUE", "16"))
+    admission_compare_concurrency: int = int(os.getenv("ADMISSION_COMPARE_CONCURRENCY", "1"))
+    admission_compare_queue: int = int(os.getenv("ADMISSION_COMPARE_QUEUE", "4"))
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+    admission_retry_after: int = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+    admission_reject_status: int = int(os.getenv("ADMISSION_REJECT_STATUS", "503"))
+
+    # /api/extraction/compare: per-extractor worker timeout (seconds)
+    compare_timeout: float = float(os.getenv("COMPARE_TIMEOUT", "600"))
+
+    # hybrid extractor: pages with little text and mostly images go to Unstructured
+    hybrid_min_text_chars: int = int(os.getenv("HYBRID_MIN_TEXT_CHARS", "50"))
+    hybrid_min_image_coverage: float = float(os.getenv("HYBRID_MIN_IMAGE_COVERAGE", "0.5"))
+    hybrid_ocr_strategy: str = os.getenv("HYBRID_OCR_STRATEGY", "hi_res")
+
+    # page-level extraction cache for Unstructured/OCR pages; empty dir disables it
+    page_cache_dir: str = os.getenv("PAGE_CACHE_DIR", "")
+    page_cache_memory_items: int = int(os.getenv("PAGE_CACHE_MEMORY_ITEMS", "256"))
+
+    # built-store cache for /structure and /rawjson; BUILD_CACHE_DIR adds a disk tier shared by workers
+    build_cache_size: int = int(os.getenv("BUILD_CACHE_SIZE", "64"))
+    build_cache_dir: str = os.getenv("BUILD_CACHE_DIR", "")
+
+    # /api/spatial: number of per-document spatial indexes kept in memory; SPATIAL_INDEX_DIR adds
+    # a disk tier shared by workers
+    spatial_index_cache_size: int = int(os.getenv("SPATIAL_INDEX_CACHE_SIZE", "32"))
+    spatial_index_dir: str = os.getenv("SPATIAL_INDEX_DIR", "")
+
+    # ?profile=true on extraction/structure endpoints (cProfile + tracemalloc); off unless enabled here
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() in {"1", "true", "yes", "y"}
+    profile_dir: str = os.getenv("PROFILE_DIR", "")
+    profile_top: int = int(os.getenv("PROFILE_TOP", "25"))
+    profile_traceback_frames: int = int(os.getenv("PROFILE_TRACEBACK_FRAMES", "1"))
+
+    # /api/similarity: MinHash/LSH near-duplicate clause index (needs numpy); loaded from / saved to this path
+    similarity_index_path: str = os.getenv("SIMILARITY_INDEX_PATH", "")
+    similarity_num_perm: int = int(os.getenv("SIMILARITY_NUM_PERM", "128"))
+    similarity_bands: int = int(os.getenv("SIMILARITY_BANDS", "32"))
+    similarity_shingle_size: int = int(os.getenv("SIMILARITY_SHINGLE_SIZE", "5"))
+    similarity_min_tokens: int = int(os.getenv("SIMILARITY_MIN_TOKENS", "8"))
+    # several workers on one SIMILARITY_INDEX_PATH: save every change under a file lock, reload when it changes
+    similarity_shared: bool = os.getenv("SIMILARITY_SHARED", "false").lower() in {"1", "true", "yes", "y"}
+
+    # /api/extraction/pipeline: sections per graph write, pages buffered between stages
+    pipeline_batch_size: int = int(os.getenv("PIPELINE_BATCH_SIZE", "200"))
+    pipeline_queue_pages: int = int(os.getenv("PIPELINE_QUEUE_PAGES", "4"))
+
+    # KG_BACKEND=sqlite: embedded store (WAL + FTS5) at this path
+    sqlite_path: str = os.getenv("SQLITE_PATH", "store.db")
+
+    # comma-separated backends to preload + prime before serving, e.g. "pymupdf,unstructured,neo4j,structure"
+    warmup_backends: str = os.getenv("WARMUP_BACKENDS", "")
 
     @property
     def neo4j_enabled(self) -> bool:
         return bool(self.neo4j_uri.strip())
 
+    @property
+    def kg_enabled(self) -> bool:
+        return self.kg_backend in ("memory", "sqlite") or self.neo4j_enabled
+
 
 settings = Settings()
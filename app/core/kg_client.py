@@ -0,0 +1,39 @@
+# app/core/kg_client.py
+from typing import Any, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+from app.core.config import settings
+
+
+async def open_kg_client(app: FastAPI) -> None:
+    """
+    Create the process's one async KG client (lifespan startup). Requests share it, so
+    the Neo4j driver keeps its connection pool across requests instead of handshaking
+    per call. Runs in each prefork worker, after the fork.
+    """
+    app.state.kg = None
+    if settings.kg_enabled:
+        from app.services.kg_async import get_async_kg_client
+
+        app.state.kg = get_async_kg_client()
+
+
+async def close_kg_client(app: FastAPI) -> None:
+    """Lifespan shutdown: close the shared client and its pool."""
+    kg, app.state.kg = getattr(app.state, "kg", None), None
+    if kg is not None:
+        await kg.close()
+
+
+def optional_kg_client(request: Request) -> Optional[Any]:
+    """Dependency: the shared client, or None when no KG backend is configured."""
+    return getattr(request.app.state, "kg", None)
+
+
+def kg_client(request: Request) -> Any:
+    """Dependency: the shared client; 503 when no KG backend is configured."""
+    kg = optional_kg_client(request)
+    if kg is None:
+        raise HTTPException(503, "No KG backend is configured (set NEO4J_URI or KG_BACKEND).")
+    return kg
@@ -0,0 +1,180 @@
+# app/core/profiling.py
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+import weakref
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.utils.ids import now_iso, sha256_str
+
+# cProfile and tracemalloc are process-wide in practice: one profiled request at a time.
+# An asyncio.Lock, so a queued ?profile request waits on the event loop, not in a threadpool
+# slot the extraction endpoints need. Created per loop: an asyncio primitive belongs to the
+# loop it is used on, and TestClient or a re-run asyncio.run gets a new one (a server
+# process runs a single loop, so this still serializes its requests).
+_PROFILE_LOCKS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _profile_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _PROFILE_LOCKS.get(loop)
+    if lock is None:
+        lock = _PROFILE_LOCKS[loop] = asyncio.Lock()
+    return lock
+
+
+class NullProfiler:
+    """Stand-in when ?profile is off: call() is plain run_in_threadpool."""
+
+    enabled = False
+
+    async def __aenter__(self) -> "NullProfiler":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+    def note_sections(self, items: Iterable[Dict[str, Any]]) -> None:
+        pass
+
+    def finish(self) -> None:
+        return None
+
+
+class RequestProfiler:
+    """
+    Profiles the blocking work of one request. Every call() runs its function on a
+    worker thread under its own cProfile.Profile (merged into one pstats at the end)
+    while tracemalloc tracks allocations for the whole request.
+    """
+
+    enabled = True
+
+    def __init__(self, label: str):
+        self.label = label
+        self._stats: Optional[pstats.Stats] = None
+        self._sections: List[Dict[str, Any]] = []
+        self._t0 = 0.0
+        self._started_tracemalloc = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "RequestProfiler":
+        self._lock = _profile_lock()
+        await self._lock.acquire()
+        self._t0 = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.profile_traceback_frames)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        try:
+            if self._started_tracemalloc and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        finally:
+            self._lock.release()
+
+    def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            if self._stats is None:
+                self._stats = pstats.Stats(prof)
+            else:
+                self._stats.add(prof)
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(self._run, fn, *args, **kwargs)
+
+    def note_sections(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Remember the largest sections/elements by text length for the report."""
+        sized = []
+        for it in items:
+            text = it.get("text") or ""
+            sized.append({
+                "id": it.get("section_id") or it.get("element_id"),
+                "label": it.get("label"),
+                "page": it.get("page_start") or it.get("page_number") or (it.get("metadata") or {}).get("page_number"),
+                "text_length": len(text) if isinstance(text, str) else 0,
+            })
+        sized.sort(key=lambda r: r["text_length"], reverse=True)
+        self._sections = sized[: settings.profile_top]
+
+    def _top_functions(self, sort: str) -> List[Dict[str, Any]]:
+        if self._stats is None:
+            return []
+        self._stats.sort_stats(sort)
+        rows = []
+        for func in self._stats.fcn_list[: settings.profile_top]:
+            cc, ncalls, tottime, cumtime, _callers = self._stats.stats[func]
+            filename, line, name = func
+            rows.append({"function": f"{filename}:{line}({name})", "ncalls": ncalls,
+                         "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)})
+        return rows
+
+    def report(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        allocations = []
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            for stat in snapshot.statistics("lineno")[: settings.profile_top]:
+                frame = stat.traceback[0]
+                allocations.append({"location": f"{frame.filename}:{frame.lineno}",
+                                    "size_kb": round(stat.size / 1024, 1), "count": stat.count})
+        return {
+            "label": self.label,
+            "wall_seconds": round(time.perf_counter() - self._t0, 6),
+            "memory_current_mb": round(current / (1024 * 1024), 3),
+            "memory_peak_mb": round(peak / (1024 * 1024), 3),
+            "top_by_cumtime": self._top_functions("cumulative"),
+            "top_by_tottime": self._top_functions("tottime"),
+            "top_allocations": allocations,
+            "largest_sections": self._sections,
+        }
+
+    def save(self, report: Dict[str, Any]) -> Optional[str]:
+        """Write <PROFILE_DIR>/<label>-<ts>-<id>.json (+ .prof for snakeviz/pstats). Returns the json path."""
+        if not settings.profile_dir:
+            return None
+        os.makedirs(settings.profile_dir, exist_ok=True)
+        stem = f"{self.label}-{now_iso().replace(':', '')}-{sha256_str(repr(time.perf_counter()))[:8]}"
+        path = os.path.join(settings.profile_dir, stem + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        if self._stats is not None:
+            self._stats.dump_stats(os.path.join(settings.profile_dir, stem + ".prof"))
+        return path
+
+    def finish(self) -> Dict[str, Any]:
+        report = self.report()
+        saved = self.save(report)
+        if saved:
+            report["saved_to"] = saved
+        return report
+
+
+def request_profiler(profile: bool, label: str):
+    """RequestProfiler when ?profile=true is allowed by PROFILING_ENABLED; 403 when it is not."""
+    if not profile:
+        return NullProfiler()
+    if not settings.profiling_enabled:
+        raise HTTPException(403, "Profiling is disabled on this server (set PROFILING_ENABLED=true).")
+    return RequestProfiler(label)
@@ -0,0 +1,69 @@
+# app/core/responses.py
+from typing import Any, Optional
+import gzip
+import json
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# zstd is optional: pip install zstandard (or the package's [zstd] extra)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick zstd (if installed) > gzip > identity from an Accept-Encoding header, honouring q=0."""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name] = q
+    star = offered.get("*", 0.0)
+    candidates = (["zstd"] if zstandard is not None else []) + ["gzip"]
+    for enc in candidates:
+        if offered.get(enc, star) > 0:
+            return enc
+    return None
+
+
+def compress_body(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.compress_zstd_level).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.compress_gzip_level)
+    return body
+
+
+async def json_response(payload: Any, request: Request, status_code: int = 200) -> Response:
+    """
+    Serialize payload once and compress it according to the request's Accept-Encoding.
+    Bodies smaller than settings.compress_min_bytes go out uncompressed; bodies of
+    settings.compress_threadpool_bytes or more are compressed on a worker thread so a
+    multi-MB store doesn't stall the event loop.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if len(body) >= settings.compress_min_bytes:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        if len(body) >= settings.compress_threadpool_bytes:
+            body = await run_in_threadpool(compress_body, body, encoding)
+        else:
+            body = compress_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
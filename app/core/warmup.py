@@ -0,0 +1,82 @@
+# app/core/warmup.py
+from typing import Any, Dict, List
+import logging
+import time
+
+from app.core.config import settings
+from app.services.registry import BACKEND_LIBRARIES, EXTRACTORS, IMPORT_TIMES, get_extractor, get_kg_backend, timed_import
+
+log = logging.getLogger(__name__)
+
+# Filled in by main.py / warm_up and served at /health/startup
+STARTUP_REPORT: Dict[str, Any] = {"app_import_seconds": None, "warmup": {}, "import_times": IMPORT_TIMES}
+
+
+def _tiny_pdf() -> bytes:
+    """One-page PDF with a heading and a paragraph, generated with PyMuPDF."""
+    fitz = timed_import("fitz")
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "ARTICLE I Warm-up", fontsize=14)
+    page.insert_text((72, 100), "1.1 Definitions. The \"Company\" means the warm-up company.", fontsize=10)
+    return doc.tobytes()
+
+
+_WARMUP_ELEMENTS = [
+    {"type": "Title", "element_id": "w1", "text": "ARTICLE I Warm-up", "metadata": {"page_number": 1}},
+    {"type": "NarrativeText", "element_id": "w2", "metadata": {"page_number": 1, "parent_id": "w1"},
+     "text": "1.1 Definitions. The \"Company\" means the warm-up company. See Section 1.1."},
+]
+
+
+def _prime(name: str) -> None:
+    """Run one representative call so lazy model/library loading happens now, not in a request."""
+    if name in EXTRACTORS:
+        get_extractor(name)(_tiny_pdf(), "warmup.pdf")
+    elif name in ("neo4j", "memory", "sqlite"):
+        get_kg_backend(name)
+    elif name == "structure":
+        # parser regexes, pydantic models and the re module cache used while building
+        from app.services.builder import StoreBuilder
+
+        StoreBuilder(_WARMUP_ELEMENTS, filename="warmup.json").build()
+    else:
+        raise KeyError(f"Unknown warm-up backend {name!r}")
+
+
+def warm_up(names: List[str]) -> Dict[str, Any]:
+    """
+    Preload the libraries behind each named backend and prime it once.
+    Failures are logged and reported, never raised: a worker should still come up.
+    """
+    report: Dict[str, Any] = {}
+    for name in names:
+        t0 = time.perf_counter()
+        entry: Dict[str, Any] = {}
+        try:
+            for module in BACKEND_LIBRARIES.get(name, []):
+                timed_import(module)
+            entry["import_seconds"] = round(time.perf_counter() - t0, 6)
+            t1 = time.perf_counter()
+            _prime(name)
+            entry["prime_seconds"] = round(time.perf_counter() - t1, 6)
+            entry["status"] = "ok"
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e)
+            log.warning("warm-up of %s failed: %s", name, e)
+        entry["total_seconds"] = round(time.perf_counter() - t0, 6)
+        report[name] = entry
+        log.info("warm-up %s: %s", name, entry)
+    STARTUP_REPORT["warmup"].update(report)
+    return report
+
+
+def configured_backends() -> List[str]:
+    return [n.strip() for n in settings.warmup_backends.split(",") if n.strip()]
+
+
+def pending_backends() -> List[str]:
+    """Configured backends not yet warmed in this process (prefork workers inherit the parent's warm-up)."""
+    done = STARTUP_REPORT["warmup"]
+    return [n for n in configured_backends() if (done.get(n) or {}).get("status") != "ok"]
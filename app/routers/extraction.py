@@ -1,42 +1,127 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from typing import Any, Dict
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict, Iterator, List, Optional
 import json
 
-from app.services import pdf_processor
+# every module below is cheap to import (stdlib and app code only): PyMuPDF, Unstructured,
+# NumPy and the neo4j driver load on first use, through the registry or a local import
+from app.services.registry import EXTRACTORS, get_extractor
+from app.services.compare import compare_extractors
 from app.services.loaders import load_any_shape
 from app.services.builder import StoreBuilder
+from app.services.build_cache import BUILD_CACHE, build_cache_key, payload_hash
 from app.schemas.json_schema import build_dynamic_schema
 from app.core.config import settings
-# NEW:
-from app.services.kg import KGClient
+from app.core.responses import json_response
+from app.core.admission import admit
+from app.core.profiling import NullProfiler, request_profiler
+from app.core.kg_client import optional_kg_client
+from app.services.projection import parse_fields, dump_store, project_dict
+from app.services.spatial import register_spatial_index
+from app.services.similarity import register_similarity
+from app.services.pipeline import ingest_pdf
 
 router = APIRouter(
     prefix="/api/extraction",
     tags=["PDF Extraction", "structure"],
 )
 
+_PROFILE_DESCRIPTION = "Profile this request (cProfile + tracemalloc) and return the report; needs PROFILING_ENABLED"
+
+
 @router.post("/pymupdf", summary="Extract text with PyMuPDF")
-async def extract_pymupdf_endpoint(file: UploadFile = File(...)):
+async def extract_pymupdf_endpoint(
+    file: UploadFile = File(...),
+    profile: bool = Query(False, description=_PROFILE_DESCRIPTION),
+):
     if file.content_type != "application/pdf":
         raise HTTPException(400, "File must be a PDF.")
+    prof = request_profiler(profile, "pymupdf")
     try:
         contents = await file.read()
-        data = await pdf_processor.process_with_pymupdf(contents)
-        return {"filename": file.filename, "library": "PyMuPDF", "data": data}
+        async with prof:
+            data = await prof.call(get_extractor("pymupdf"), contents, file.filename)
+            prof.note_sections(data)
+            resp = {"filename": file.filename, "library": "PyMuPDF", "data": data}
+            if prof.enabled:
+                resp["profile"] = prof.finish()
+        return resp
     except Exception as e:
         raise HTTPException(500, f"PyMuPDF processing error: {e}")
 
 @router.post("/unstructured", summary="Extract elements with Unstructured")
-async def extract_unstructured_endpoint(file: UploadFile = File(...)):
+async def extract_unstructured_endpoint(
+    file: UploadFile = File(...),
+    profile: bool = Query(False, description=_PROFILE_DESCRIPTION),
+):
     if file.content_type != "application/pdf":
         raise HTTPException(400, "File must be a PDF.")
+    prof = request_profiler(profile, "unstructured")
+    slot = await admit("unstructured")
     try:
         contents = await file.read()
-        data = await pdf_processor.process_with_unstructured(contents, file.filename)
-        return {"filename": file.filename, "library": "unstructured", "data": data}
+        async with prof:
+            # the extractor consults the page cache itself when PAGE_CACHE_DIR is set
+            data = await prof.call(get_extractor("unstructured"), contents, file.filename)
+            prof.note_sections(data)
+            resp: Dict[str, Any] = {"filename": file.filename, "library": "unstructured", "data": data}
+            if prof.enabled:
+                resp["profile"] = prof.finish()
+        return resp
     except Exception as e:
         raise HTTPException(500, f"Unstructured processing error: {e}")
+    finally:
+        if slot:
+            slot.release()
     
+@router.post("/hybrid", summary="PyMuPDF for born-digital pages, Unstructured only for scanned pages")
+async def extract_hybrid_endpoint(
+    file: UploadFile = File(...),
+    profile: bool = Query(False, description=_PROFILE_DESCRIPTION),
+):
+    if file.content_type != "application/pdf":
+        raise HTTPException(400, "File must be a PDF.")
+    prof = request_profiler(profile, "hybrid")
+    slot = await admit("unstructured")
+    try:
+        from app.services.hybrid_extractor import extract_hybrid
+
+        contents = await file.read()
+        async with prof:
+            data, pages = await prof.call(extract_hybrid, contents, file.filename)
+            prof.note_sections(data)
+            resp = {"filename": file.filename, "library": "hybrid", "pages": pages, "data": data}
+            if prof.enabled:
+                resp["profile"] = prof.finish()
+        return resp
+    except Exception as e:
+        raise HTTPException(500, f"Hybrid processing error: {e}")
+    finally:
+        if slot:
+            slot.release()
+
+@router.post("/compare", summary="Run several extractors on one PDF concurrently and compare cost and quality")
+async def compare_endpoint(
+    file: UploadFile = File(...),
+    extractors: str = Query("pymupdf,unstructured", description="Comma-separated extractor names"),
+):
+    if file.content_type != "application/pdf":
+        raise HTTPException(400, "File must be a PDF.")
+    names = list(dict.fromkeys(n.strip() for n in extractors.split(",") if n.strip()))
+    unknown = [n for n in names if n not in EXTRACTORS]
+    if not names or unknown:
+        raise HTTPException(400, f"Unknown extractors {unknown}; available: {sorted(EXTRACTORS)}")
+    slot = await admit("compare")
+    try:
+        contents = await file.read()
+        return await compare_extractors(contents, file.filename, names, settings.compare_timeout)
+    except Exception as e:
+        raise HTTPException(500, f"Comparison error: {e}")
+    finally:
+        if slot:
+            slot.release()
+
 _SAMPLE_INPUT = [
     {"type":"Title","text":"ARTICLE I Merger","metadata":{"page_number":1}},
     {"type":"NarrativeText","text":"At the Effective Time, the Merger...","metadata":{"page_number":2}}
@@ -50,75 +135,251 @@ _SAMPLE_INPUT = [
 
 
 
+_FIELDS_DESCRIPTION = (
+    "Comma-separated projection, e.g. document,sections.section_id,sections.text,cross_references. "
+    "Top-level names keep a whole part, dotted names keep sub-fields. Default: everything."
+)
+_SPATIAL_DESCRIPTION = "If true, register a per-page spatial index of section boxes for /api/spatial queries"
+_SIMILARITY_DESCRIPTION = "If true, add the sections to the clause similarity index for /api/similarity queries"
+
+
+async def _structure_response(
+    load_elements: Callable[[], List[Dict[str, Any]]],
+    raw_hash: str,
+    filename: str,
+    extracted_with: str,
+    include_schema: bool,
+    index_text: bool,
+    snippet_chars: int,
+    auto_load_to_kg: bool,
+    kg_mode: str,
+    fields: Optional[str],
+    spatial_index: bool = False,
+    similarity_index: bool = False,
+    prof=None,
+    kg=None,
+) -> Dict[str, Any]:
+    """
+    Build (or fetch from BUILD_CACHE) the store for one submission. load_elements
+    is only called on a cache miss, so a hit skips parsing as well as building.
+    Blocking steps run through prof.call, so ?profile=true covers them.
+    """
+    prof = prof or NullProfiler()
+    include = parse_fields(fields)
+    key = build_cache_key(raw_hash, filename, extracted_with, settings.default_schema_version, index_text, snippet_chars)
+    # a profiled request always builds: a cache hit would hide what is being profiled
+    entry = await prof.call(BUILD_CACHE.get, key) if BUILD_CACHE.enabled and not prof.enabled else None
+    cached = entry is not None
+    if entry is None:
+        builder = StoreBuilder(
+            await prof.call(load_elements),
+            filename=filename,
+            schema_version=settings.default_schema_version,
+            extracted_with=extracted_with,
+            include_text_in_index=index_text,
+            snippet_chars=snippet_chars,
+        )
+        # building / dumping / schema inference are CPU-bound: keep them off the event loop
+        model = await prof.call(builder.build)
+        if BUILD_CACHE.enabled or auto_load_to_kg or spatial_index or similarity_index:
+            # the cache, the graph and the indexes get the full store; the response gets the projection
+            full = await prof.call(dump_store, model)
+            if BUILD_CACHE.enabled:
+                schema = await prof.call(build_dynamic_schema, full)
+                entry = await prof.call(BUILD_CACHE.put, key, full, schema)
+            store = project_dict(full, include)
+        else:
+            full = None
+            store = await prof.call(dump_store, model, include)
+    else:
+        full = entry["store"]
+        store = project_dict(full, include)
+
+    prof.note_sections((full or store).get("sections") or [])
+    resp: Dict[str, Any] = {"store": store, "cached": cached}
+    if include_schema:
+        # the cached schema describes the full store; a projection gets its own
+        cached_schema = entry.get("schema") if entry is not None and include is None else None
+        resp["schema"] = cached_schema if cached_schema is not None else await prof.call(build_dynamic_schema, store)
+    if spatial_index:
+        resp["spatial_index"] = (await prof.call(register_spatial_index, full)).summary()
+    if similarity_index:
+        resp["similarity_index"] = await prof.call(register_similarity, full)
+
+    if auto_load_to_kg:
+        if kg is None:
+            raise HTTPException(400, "auto_load_to_kg=True but Neo4j is not configured.")
+        await kg.ensure_constraints()
+        resp["kg_result"] = await kg.import_store(full, mode=kg_mode)
+
+    if prof.enabled:
+        resp["profile"] = prof.finish()
+    return resp
+
+
+# record kind -> store key used by the `fields=` projection
+_RECORD_FIELDS = {
+    "document": "document",
+    "section": "sections",
+    "cross_reference": "cross_references",
+    "definition": "definitions",
+    "topology": "topology",
+    "provenance": "provenance",
+}
+
+
+def _iter_ndjson(builder: StoreBuilder, include: Optional[Dict[str, Any]], slot=None) -> Iterator[bytes]:
+    """
+    One JSON object per line: header first, then sections as they are built (see
+    StoreBuilder.iter_records for their order), trailing records last.
+    Holds the admission slot (if any) until the stream finishes or is closed.
+    """
+    counts: Dict[str, int] = {}
+    try:
+        for rec in builder.iter_records():
+            kind = rec["record"]
+            counts[kind] = counts.get(kind, 0) + 1
+            key = _RECORD_FIELDS[kind]
+            if include is not None and key not in include:
+                continue
+            sel = include.get(key) if include is not None else True
+            if isinstance(sel, dict):
+                sel = sel.get("__all__", sel)
+            data = rec["data"]
+            if hasattr(data, "model_dump"):
+                data = data.model_dump(exclude_none=False, include=None if sel is True else sel)
+            elif sel is not True:
+                data = {k: data[k] for k in sel if k in data}
+            yield (json.dumps({"record": kind, "data": data}, ensure_ascii=False) + "\n").encode("utf-8")
+        yield (json.dumps({"record": "end", "data": {"counts": counts}}) + "\n").encode("utf-8")
+    except Exception as e:
+        yield (json.dumps({"record": "error", "data": {"detail": str(e)}}) + "\n").encode("utf-8")
+    finally:
+        if slot:
+            slot.release()
+
+
 @router.post("/structure", summary="Normalize an uploaded JSON file to the M&A store format")
 async def structure_file(
+    request: Request,
     file: UploadFile = File(...),
     include_schema: bool = True,
     index_text: bool = Query(False, description="Include full text in topology.section_index"),
     snippet_chars: int = Query(280, ge=0, le=10000),
     auto_load_to_kg: bool = Query(False, description="If true, load the structured store into Neo4j Aura"),
+    kg_mode: str = Query("full", description="KG import mode when auto_load_to_kg: full | delta"),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    spatial_index: bool = Query(False, description=_SPATIAL_DESCRIPTION),
+    similarity_index: bool = Query(False, description=_SIMILARITY_DESCRIPTION),
+    stream: bool = Query(False, description="Stream NDJSON records: document, then sections grouped by parent "
+                                            "(groups in order of first appearance, `sequence` order within a "
+                                            "group), then cross-refs, definitions, topology, provenance and an "
+                                            "end record. Sort sections by (parent_element_id, sequence) for the "
+                                            "non-streamed order. include_schema is ignored."),
+    profile: bool = Query(False, description=_PROFILE_DESCRIPTION),
+    kg=Depends(optional_kg_client),
 ):
+    if stream and profile:
+        raise HTTPException(400, "profile=true cannot be combined with stream=true.")
+    prof = request_profiler(profile, "structure")
+    slot = await admit("structure")
+    streaming = False
     try:
         contents = await file.read()
-        raw = json.loads(contents.decode("utf-8", errors="ignore"))
-        elements = load_any_shape(raw)
-        builder = StoreBuilder(
-            elements,
-            filename=file.filename,
-            schema_version=settings.default_schema_version,
-            extracted_with="unstructured.io",
-            include_text_in_index=index_text,
-            snippet_chars=snippet_chars,
-        )
-        store = builder.build().model_dump(exclude_none=False)
-        resp: Dict[str, Any] = {"store": store}
-        if include_schema:
-            resp["schema"] = build_dynamic_schema(store)
-
-        if auto_load_to_kg:
-            if not settings.neo4j_enabled:
-                raise HTTPException(400, "auto_load_to_kg=True but Neo4j is not configured.")
-            kg = KGClient()
-            kg.ensure_constraints()
-            resp["kg_result"] = kg.import_store(store)
-            kg.close()
 
-        return resp
+        def _load() -> List[Dict[str, Any]]:
+            return load_any_shape(json.loads(contents.decode("utf-8", errors="ignore")))
+
+        if stream:
+            if auto_load_to_kg:
+                raise ValueError("stream=true cannot be combined with auto_load_to_kg.")
+            # parsing and StoreBuilder's doc hash walk every element: keep them off the event loop
+            builder = await run_in_threadpool(lambda: StoreBuilder(
+                _load(),
+                filename=file.filename,
+                schema_version=settings.default_schema_version,
+                extracted_with="unstructured.io",
+                include_text_in_index=index_text,
+                snippet_chars=snippet_chars,
+            ))
+            response = StreamingResponse(_iter_ndjson(builder, parse_fields(fields), slot), media_type="application/x-ndjson")
+            streaming = True
+            return response
+        async with prof:
+            resp = await _structure_response(
+                _load, payload_hash(contents), file.filename, "unstructured.io",
+                include_schema, index_text, snippet_chars, auto_load_to_kg, kg_mode, fields, spatial_index,
+                similarity_index, prof, kg,
+            )
+        return await json_response(resp, request)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # a streaming response releases its slot when the stream ends
+        if slot and not streaming:
+            slot.release()
 
 
 @router.post("/rawjson", summary="Normalize an inline JSON payload to the M&A store format")
 async def structure_rawjson(
+    request: Request,
     raw: Dict[str, Any],
     include_schema: bool = True,
     index_text: bool = Query(False, description="Include full text in topology.section_index"),
     snippet_chars: int = Query(280, ge=0, le=10000),
     auto_load_to_kg: bool = Query(False, description="If true, load the structured store into Neo4j Aura"),
+    kg_mode: str = Query("full", description="KG import mode when auto_load_to_kg: full | delta"),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    spatial_index: bool = Query(False, description=_SPATIAL_DESCRIPTION),
+    similarity_index: bool = Query(False, description=_SIMILARITY_DESCRIPTION),
+    profile: bool = Query(False, description=_PROFILE_DESCRIPTION),
+    kg=Depends(optional_kg_client),
 ):
+    prof = request_profiler(profile, "rawjson")
+    slot = await admit("rawjson")
     try:
-        elements = load_any_shape(raw)
-        builder = StoreBuilder(
-            elements,
-            filename="payload.json",
-            schema_version=settings.default_schema_version,
-            extracted_with="unknown",
-            include_text_in_index=index_text,
-            snippet_chars=snippet_chars,
-        )
-        store = builder.build().model_dump(exclude_none=False)
-        resp: Dict[str, Any] = {"store": store}
-        if include_schema:
-            resp["schema"] = build_dynamic_schema(store)
-
-        if auto_load_to_kg:
-            if not settings.neo4j_enabled:
-                raise HTTPException(400, "auto_load_to_kg=True but Neo4j is not configured.")
-            kg = KGClient()
-            kg.ensure_constraints()
-            resp["kg_result"] = kg.import_store(store)
-            kg.close()
+        async with prof:
+            resp = await _structure_response(
+                lambda: load_any_shape(raw), payload_hash(raw), "payload.json", "unknown",
+                include_schema, index_text, snippet_chars, auto_load_to_kg, kg_mode, fields, spatial_index,
+                similarity_index, prof, kg,
+            )
+        return await json_response(resp, request)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if slot:
+            slot.release()
 
-        return resp
+
+@router.post("/pipeline", summary="PDF to graph in one upload: extraction, store building and KG writes overlap")
+async def pipeline_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    batch_size: Optional[int] = Query(None, ge=1, le=5000, description="Sections per KG write (default PIPELINE_BATCH_SIZE)"),
+    queue_pages: Optional[int] = Query(None, ge=1, le=256, description="Pages buffered between stages (default PIPELINE_QUEUE_PAGES)"),
+    index_text: bool = Query(False, description="Include full text in topology.section_index"),
+    snippet_chars: int = Query(280, ge=0, le=10000),
+    include_store: bool = Query(False, description="Also return the built store"),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    kg=Depends(optional_kg_client),
+):
+    if file.content_type != "application/pdf":
+        raise HTTPException(400, "File must be a PDF.")
+    if kg is None:
+        raise HTTPException(400, "The pipeline writes to the KG, but no KG backend is configured.")
+    slot = await admit("unstructured")
+    try:
+        contents = await file.read()
+        await kg.ensure_constraints()
+        result = await ingest_pdf(contents, file.filename, kg, batch_size, queue_pages, index_text, snippet_chars)
+        store = result.pop("store")
+        resp = {"filename": file.filename, **result}
+        if include_store:
+            resp["store"] = project_dict(store, parse_fields(fields))
+        return await json_response(resp, request)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(500, f"Pipeline error: {e}")
+    finally:
+        if slot:
+            slot.release()
@@ -1,27 +1,84 @@
-from fastapi import APIRouter, HTTPException
-from app.services.kg import KGClient
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.kg_client import kg_client
+from app.services.search import search_sections
+from app.schemas.json_schema import validate_store_for_import
 
 router = APIRouter(prefix="/api/kg", tags=["Knowledge Graph"])
 
 @router.post("/ensure-constraints", summary="Create Neo4j constraints (idempotent)")
-def ensure_constraints():
+async def ensure_constraints(kg=Depends(kg_client)):
     try:
-        KGClient().ensure_constraints()
+        await kg.ensure_constraints()
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(500, str(e))
 
 @router.post("/setup-search", summary="Create a full-text index for Section text/title/label (idempotent)")
-def setup_search():
+async def setup_search(kg=Depends(kg_client)):
     try:
-        KGClient().ensure_fulltext_index()
+        await kg.ensure_fulltext_index()
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(500, str(e))
 
 @router.post("/import", summary="Import a structured store into Neo4j")
-def import_store(store: dict):
+async def import_store(
+    store: dict,
+    mode: str = Query("full", description="full: MERGE everything; delta: write only new/changed sections and prune removed ones"),
+    doc_key: Optional[str] = Query(None, description="Delta: identity shared by versions of this document. Without "
+                                                     "it, versions are never matched (filenames are not unique)"),
+    prune_versions: bool = Query(False, description="Delta with doc_key: also delete older versions with that doc_key "
+                                                    "other than the one adopted"),
+    kg=Depends(kg_client),
+):
+    errors = validate_store_for_import(store)
+    if errors:
+        raise HTTPException(422, {"message": "Store failed validation", "errors": errors})
     try:
-        return KGClient().import_store(store)
+        return await kg.import_store(store, mode=mode, doc_key=doc_key, prune_versions=prune_versions)
     except Exception as e:
         raise HTTPException(400, str(e))
+
+@router.get("/search", summary="Full-text search over Section text/title/label (cached)")
+async def search(
+    q: str = Query(..., min_length=1, description="Search text"),
+    doc_id: Optional[List[str]] = Query(None, description="Restrict to one or more doc_ids"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=200),
+    snippet_chars: int = Query(200, ge=0, le=2000),
+    raw_query: bool = Query(False, description="Pass q through as Lucene syntax instead of escaping it"),
+    kg=Depends(kg_client),
+):
+    try:
+        return await search_sections(kg, q, doc_id, page, page_size, snippet_chars, raw_query)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+@router.get("/sections/{section_id}/subtree", summary="A section and all its descendants in document order, in one call")
+async def section_subtree(
+    section_id: str,
+    max_depth: Optional[int] = Query(None, ge=0, description="Levels below the section to include (default: all)"),
+    kg=Depends(kg_client),
+):
+    try:
+        rows = await kg.subtree(section_id, max_depth)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    if not rows:
+        raise HTTPException(404, f"Section {section_id!r} not found or imported without tree intervals.")
+    return {"section_id": section_id, "count": len(rows), "sections": rows}
+
+@router.get("/texts/{text_hash}", summary="Documents and sections sharing one section text (by text_hash)")
+async def text_documents(text_hash: str, kg=Depends(kg_client)):
+    try:
+        return await kg.text_documents(text_hash)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+@router.post("/texts/gc", summary="Delete Text nodes no Section references any more")
+async def gc_texts(kg=Depends(kg_client)):
+    try:
+        return {"status": "ok", "removed": await kg.gc_texts()}
+    except Exception as e:
+        raise HTTPException(500, str(e))
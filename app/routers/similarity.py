@@ -0,0 +1,64 @@
+from typing import Optional
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.similarity import get_clause_index, update_clause_index
+
+router = APIRouter(prefix="/api/similarity", tags=["Similarity"])
+
+@router.post("/index", summary="Add (or replace) a store's sections in the clause similarity index")
+async def index_store(store: dict):
+    try:
+        return await run_in_threadpool(lambda: update_clause_index(lambda index: index.add_store(store)))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+@router.delete("/documents/{doc_id}", summary="Remove a document's sections from the index")
+async def remove_document(doc_id: str):
+    removed = await run_in_threadpool(lambda: update_clause_index(lambda index: index.remove_document(doc_id)))
+    if not removed:
+        raise HTTPException(404, f"Document {doc_id!r} is not in the similarity index")
+    return {"doc_id": doc_id, "sections_removed": removed}
+
+@router.post("/query", summary="Top-k indexed sections most similar to a clause text")
+async def query_text(
+    text: str = Body(..., embed=True, min_length=1),
+    k: int = Query(10, ge=1, le=200),
+    min_similarity: float = Query(0.5, ge=0.0, le=1.0, description="Estimated Jaccard similarity of word shingles"),
+    exclude_doc_id: Optional[str] = Query(None, description="Leave out sections of this document"),
+):
+    try:
+        hits = await run_in_threadpool(lambda: get_clause_index().query_text(text, k, min_similarity, exclude_doc_id))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    return {"k": k, "min_similarity": min_similarity, "hits": hits}
+
+@router.get("/sections/{section_id}", summary="Near-duplicates of an indexed section across the corpus")
+async def similar_sections(
+    section_id: str,
+    k: int = Query(10, ge=1, le=200),
+    min_similarity: float = Query(0.5, ge=0.0, le=1.0),
+    other_documents_only: bool = Query(True, description="Skip matches from the section's own document"),
+):
+    hits = await run_in_threadpool(
+        lambda: get_clause_index().query_section(section_id, k, min_similarity, other_documents_only))
+    if hits is None:
+        raise HTTPException(404, f"Section {section_id!r} is not in the similarity index")
+    return {"section_id": section_id, "k": k, "min_similarity": min_similarity, "hits": hits}
+
+@router.get("/stats", summary="Index size and LSH parameters")
+async def stats():
+    return get_clause_index().stats()
+
+@router.post("/save", summary="Write the index to SIMILARITY_INDEX_PATH")
+async def save():
+    if not settings.similarity_index_path:
+        raise HTTPException(400, "SIMILARITY_INDEX_PATH is not set.")
+    try:
+        path = await run_in_threadpool(
+            lambda: update_clause_index(lambda index: index.save(settings.similarity_index_path)))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    return {"saved_to": path, **get_clause_index().stats()}
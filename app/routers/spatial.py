@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services.spatial import QUERY_MODES, get_spatial_index, register_spatial_index
+
+router = APIRouter(prefix="/api/spatial", tags=["Spatial"])
+
+
+def _index_or_404(doc_id: str):
+    index = get_spatial_index(doc_id)
+    if index is None:
+        raise HTTPException(404, f"No spatial index for {doc_id!r}; POST the store to /api/spatial/index first.")
+    return index
+
+@router.post("/index", summary="Build and register the per-page spatial index for a store")
+async def build_index(store: dict):
+    try:
+        return register_spatial_index(store).summary()
+    except Exception as e:
+        raise HTTPException(400, str(e))
+
+@router.get("/{doc_id}/point", summary="Sections under a point on a page (innermost first)")
+async def query_point(doc_id: str, page: int = Query(..., ge=1), x: float = Query(...), y: float = Query(...)):
+    index = _index_or_404(doc_id)
+    return {"doc_id": doc_id, "page": page, "hits": index.query_point(page, x, y)}
+
+@router.get("/{doc_id}/rect", summary="Sections overlapping / inside a region of a page (reading order)")
+async def query_rect(
+    doc_id: str,
+    page: int = Query(..., ge=1),
+    x0: float = Query(...),
+    y0: float = Query(...),
+    x1: float = Query(...),
+    y1: float = Query(...),
+    mode: str = Query("intersects", description=f"One of {', '.join(QUERY_MODES)}: section overlaps the region, "
+                                                "lies inside it, or contains it"),
+):
+    index = _index_or_404(doc_id)
+    try:
+        hits = index.query_rect(page, x0, y0, x1, y1, mode)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"doc_id": doc_id, "page": page, "mode": mode, "hits": hits}
@@ -0,0 +1,55 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+
+router = APIRouter(prefix="/api/sqlite", tags=["SQLite store"])
+
+
+async def _call(method: str, *args):
+    """Run one SQLiteStore lookup on a worker thread with its own connection."""
+    if settings.kg_backend != "sqlite":
+        raise HTTPException(503, "The SQLite store is not enabled (set KG_BACKEND=sqlite).")
+    from app.services.kg_sqlite import SQLiteStore
+
+    def run():
+        store = SQLiteStore()
+        try:
+            return getattr(store, method)(*args)
+        finally:
+            store.close()
+
+    try:
+        return await run_in_threadpool(run)
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+@router.get("/documents/{doc_id}", summary="Document header and row counts")
+async def get_document(doc_id: str):
+    doc = await _call("get_document", doc_id)
+    if doc is None:
+        raise HTTPException(404, f"Unknown document {doc_id!r}")
+    return doc
+
+@router.get("/sections/{section_id}", summary="One section with its definitions and cross-references")
+async def get_section(section_id: str):
+    sec = await _call("get_section", section_id)
+    if sec is None:
+        raise HTTPException(404, f"Unknown section {section_id!r}")
+    return sec
+
+@router.get("/labels/{label}", summary="Sections by label (e.g. \"1.1\"), case-insensitive")
+async def sections_by_label(
+    label: str,
+    doc_id: Optional[List[str]] = Query(None, description="Restrict to one or more doc_ids"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    return {"label": label, "sections": await _call("sections_by_label", label, doc_id, limit)}
+
+@router.get("/definitions", summary="Definitions of a term across documents, case-insensitive")
+async def definitions_by_term(
+    term: str = Query(..., min_length=1),
+    doc_id: Optional[List[str]] = Query(None, description="Restrict to one or more doc_ids"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    return {"term": term, "definitions": await _call("definitions_by_term", term, doc_id, limit)}
@@ -1,5 +1,9 @@
-from typing import Any, Dict
-from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import json
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.utils.ids import sha256_str
 
 BASIC_TYPES = {
     str: "string",
@@ -9,46 +13,107 @@ BASIC_TYPES = {
     type(None): "null",
 }
 
+# Inferred schemas as JSON text, keyed by structural fingerprint (never expire; LRU-bounded)
+SCHEMA_CACHE = TTLCache(maxsize=settings.schema_cache_size, ttl=0)
+
 def _infer_type(value: Any):
     if isinstance(value, list):
-        if not value:
-            return {"type": "array", "items": {}}
-        first = next((x for x in value if x is not None), None)
-        if first is None:
-            return {"type": "array", "items": {}}
-        return {"type": "array", "items": _infer_type(first)}
+        items: Dict[str, Any] = {}
+        for x in value:
+            if x is not None:
+                items = _merge_types(items, _infer_type(x))
+        return {"type": "array", "items": items}
     if isinstance(value, dict):
         return {"type": "object"}
     return {"type": BASIC_TYPES.get(type(value), "string")}
 
-def build_dynamic_schema(store: Dict[str, Any]) -> Dict[str, Any]:
+def _type_names(t: Dict[str, Any]) -> List[str]:
+    names = t.get("type")
+    if names is None:
+        return []
+    return list(names) if isinstance(names, list) else [names]
+
+def _merge_types(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Union two inferred type schemas: {"type": "string"} + {"type": "null"}
+    -> {"type": ["null", "string"]}. integer widens into number; array items merge.
+    """
+    if not a:
+        return b
+    if not b or a == b:
+        return a
+    names = set(_type_names(a)) | set(_type_names(b))
+    if "number" in names:
+        names.discard("integer")
+    out: Dict[str, Any] = {"type": sorted(names) if len(names) > 1 else next(iter(names))}
+    if "array" in names:
+        out["items"] = _merge_types(a.get("items") or {}, b.get("items") or {})
+    return out
+
+def _infer_props(samples: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """One pass over samples; every key's type is the union of all values seen."""
+    props: Dict[str, Any] = {}
+    for sample in samples:
+        for k, v in sample.items():
+            props[k] = _merge_types(props.get(k) or {}, _infer_type(v))
+    return props
+
+def _store_props(store: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Inferred per-key types of the document header and of each record list."""
+    return {
+        "document": _infer_props([store.get("document") or {}]),
+        "sections": _infer_props(x for x in store.get("sections") or [] if isinstance(x, dict)),
+        "definitions": _infer_props(x for x in store.get("definitions") or [] if isinstance(x, dict)),
+        "cross_references": _infer_props(x for x in store.get("cross_references") or [] if isinstance(x, dict)),
+    }
+
+def _key_set(records: Iterable[Any]) -> List[List[str]]:
+    """Sorted (key, Python type name) pairs over records; no recursion, no type merging."""
+    # records of one kind share a handful of shapes: dedupe those first, then expand
+    shapes = {(tuple(r), tuple(map(type, r.values()))) for r in records if isinstance(r, dict)}
+    return sorted({(k, t.__name__) for keys, types in shapes for k, t in zip(keys, types)})
+
+def schema_fingerprint(store: Dict[str, Any]) -> str:
+    """
+    Structural fingerprint: the key set of the document header and the union of
+    the section / definition / cross-reference key sets, each key paired with the
+    types of its values (so a label that is always null and one that is a string
+    don't share a schema). Item types inside lists are not part of it.
+    """
+    return sha256_str(json.dumps([
+        _key_set([store.get("document") or {}]),
+        _key_set(store.get("sections") or []),
+        _key_set(store.get("definitions") or []),
+        _key_set(store.get("cross_references") or []),
+    ]))
+
+def build_dynamic_schema(store: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Infer a JSON Schema for a store. With use_cache, the schema for an already
+    seen schema_fingerprint is served from SCHEMA_CACHE without inferring any
+    types; callers always get their own copy.
+    """
+    key = None
+    if use_cache:
+        key = schema_fingerprint(store)
+        cached = SCHEMA_CACHE.get(key)
+        if cached is not None:
+            return json.loads(cached)
+    props = _store_props(store)
+
     root_required = ["schema_version", "document"]
 
-    doc_props = {}
     doc_required = ["doc_id", "filename", "hash", "extracted_with", "extracted_at", "version"]
-    for k, v in (store.get("document") or {}).items():
-        doc_props[k] = _infer_type(v)
+    doc_props = props["document"]
 
-    section_samples = store.get("sections") or []
-    sec_props: Dict[str, Any] = defaultdict(dict)
+    sec_props = props["sections"]
     sec_required = {"section_id", "text"}
-    for s in section_samples:
-        for k, v in s.items():
-            sec_props[k] = _infer_type(v)
 
-    def_samples = store.get("definitions") or []
-    def_props: Dict[str, Any] = defaultdict(dict)
+    def_props = props["definitions"]
     def_required = {"def_id", "term", "text", "section_id"}
-    for d in def_samples:
-        for k, v in d.items():
-            def_props[k] = _infer_type(v)
 
-    xref_samples = store.get("cross_references") or []
-    xref_props: Dict[str, Any] = defaultdict(dict)
+    xref_props = props["cross_references"]
     xref_required = {"xref_id", "source_section_id", "target_label", "offset"}
-    for x in xref_samples:
-        for k, v in x.items():
-            xref_props[k] = _infer_type(v)
 
     schema = {
         "$schema": "http://json-schema.org/draft-07/schema#",
@@ -95,4 +160,132 @@ def build_dynamic_schema(store: Dict[str, Any]) -> Dict[str, Any]:
             "provenance": {"type": "object"}
         }
     }
+    if key is not None:
+        SCHEMA_CACHE.set(key, json.dumps(schema))
     return schema
+
+# ---------- compiled validation ----------
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+Validator = Callable[[Any, str, List[str]], None]
+
+def _compile(schema: Dict[str, Any]) -> Validator:
+    checks: List[Validator] = []
+
+    names = _type_names(schema)
+    if names:
+        type_fns = [_TYPE_CHECKS[n] for n in names]
+        expected = " or ".join(names)
+
+        def _check_type(v, path, errors):
+            if not any(fn(v) for fn in type_fns):
+                errors.append(f"{path}: expected {expected}, got {type(v).__name__}")
+        checks.append(_check_type)
+
+    required = list(schema.get("required") or [])
+    props = {k: _compile(s) for k, s in (schema.get("properties") or {}).items()}
+    closed = schema.get("additionalProperties") is False
+    if required or props or closed:
+        allowed = set(props)
+
+        def _check_object(v, path, errors):
+            if not isinstance(v, dict):
+                return
+            for k in required:
+                if k not in v:
+                    errors.append(f"{path}: missing required property {k!r}")
+            for k, fn in props.items():
+                if k in v:
+                    fn(v[k], f"{path}.{k}", errors)
+            if closed:
+                for k in v:
+                    if k not in allowed:
+                        errors.append(f"{path}: unexpected property {k!r}")
+        checks.append(_check_object)
+
+    if schema.get("items"):
+        item_fn = _compile(schema["items"])
+
+        def _check_items(v, path, errors):
+            if not isinstance(v, list):
+                return
+            for i, x in enumerate(v):
+                item_fn(x, f"{path}[{i}]", errors)
+        checks.append(_check_items)
+
+    def _validate(v, path, errors):
+        for fn in checks:
+            fn(v, path, errors)
+    return _validate
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """
+    Compile a (type / required / properties / additionalProperties / items) JSON
+    Schema subset into nested closures once; the returned callable gives a list of
+    error strings (empty when valid).
+    """
+    fn = _compile(schema)
+
+    def validate(value: Any, max_errors: Optional[int] = 50) -> List[str]:
+        errors: List[str] = []
+        fn(value, "$", errors)
+        return errors[:max_errors] if max_errors else errors
+    return validate
+
+# What KGClient.import_store relies on; extra keys are allowed everywhere
+STORE_IMPORT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["document"],
+    "properties": {
+        "document": {
+            "type": "object",
+            "required": ["doc_id"],
+            "properties": {"doc_id": {"type": "string"}},
+        },
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["section_id"],
+                "properties": {
+                    "section_id": {"type": "string"},
+                    "text": {"type": ["null", "string"]},
+                    "level": {"type": ["integer", "null"]},
+                    "page_start": {"type": ["integer", "null"]},
+                    "page_end": {"type": ["integer", "null"]},
+                },
+            },
+        },
+        "definitions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["def_id", "section_id"],
+                "properties": {"def_id": {"type": "string"}, "section_id": {"type": "string"}},
+            },
+        },
+        "cross_references": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["source_section_id"],
+                "properties": {
+                    "source_section_id": {"type": "string"},
+                    "resolved_section_id": {"type": ["null", "string"]},
+                },
+            },
+        },
+        "topology": {"type": "object"},
+    },
+}
+
+validate_store_for_import = compile_validator(STORE_IMPORT_SCHEMA)
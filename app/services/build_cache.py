@@ -0,0 +1,88 @@
+# app/services/build_cache.py
+from typing import Any, Dict, Optional
+import gzip
+import hashlib
+import json
+import os
+
+from app.core.config import settings
+from app.services.builder import BUILDER_VERSION
+from app.services.cache import TTLCache
+from app.utils.ids import sha256_str
+
+
+def payload_hash(data: Any) -> str:
+    """Hash of a raw submission: bytes as uploaded, or a parsed JSON body in canonical form."""
+    if isinstance(data, (bytes, bytearray)):
+        return hashlib.sha256(data).hexdigest()
+    return sha256_str(json.dumps(data, sort_keys=True, ensure_ascii=False))
+
+
+def build_cache_key(
+    raw_hash: str,
+    filename: str,
+    extracted_with: str,
+    schema_version: str,
+    index_text: bool,
+    snippet_chars: int,
+) -> str:
+    """
+    Everything StoreBuilder output depends on. filename / extracted_with land in the
+    document header, so they are part of the key alongside the build options.
+    """
+    return sha256_str(json.dumps(
+        [raw_hash, filename, extracted_with, schema_version, bool(index_text), int(snippet_chars), BUILDER_VERSION]
+    ))
+
+
+class BuildCache:
+    """
+    Built stores by build_cache_key: in-process LRU, optionally backed by gzipped
+    JSON files under <directory>/<key[:2]>/<key>.json.gz shared by every worker.
+    Entries are {"store": full store dict, "schema": build_dynamic_schema of it} and
+    must be treated as read-only by callers. The schema is for the full store: a
+    response with a ?fields projection infers its own.
+    """
+
+    def __init__(self, maxsize: int, directory: Optional[str] = None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=0)
+        self.directory = directory or None
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.maxsize > 0 or bool(self.directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json.gz")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(key)
+        if entry is not None or not self.directory:
+            return entry
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.memory.set(key, entry)
+        return entry
+
+    def put(self, key: str, store: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {"store": store, "schema": schema}
+        self.memory.set(key, entry)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        out = self.memory.stats()
+        out["directory"] = self.directory
+        return out
+
+
+BUILD_CACHE = BuildCache(settings.build_cache_size, settings.build_cache_dir)
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import json
 import re
 from collections import defaultdict
@@ -7,6 +7,10 @@ from app.models.store import Store, DocumentHeader, Section, CrossRef, Definitio
 from app.utils.ids import sha256_str, urn, now_iso
 from app.services.parsers import parse_label_title_level, iter_cross_refs, iter_def_terms
 from app.services.text import extract_best_text
+from app.services.tree import euler_intervals
+
+# Bump whenever build() output changes for the same input, so cached stores are not reused
+BUILDER_VERSION = "2"
 
 def _get(obj: Dict[str, Any], path: List[str], default=None):
     cur = obj
@@ -25,6 +29,9 @@ def _bbox_from_points(points: List[List[float]]) -> List[float]:
         return []
     return [min(xs), min(ys), max(xs), max(ys)]
 
+def _element_order(el: Dict[str, Any]):
+    return (_get(el, ["metadata", "page_number"], 10**7), el.get("element_id") or "")
+
 class StoreBuilder:
     """
     Non-graph, production-ready store builder.
@@ -32,6 +39,8 @@ class StoreBuilder:
     include_text_in_index: when True, puts full text into topology.section_index[*].text.
       Otherwise (default) stores text_snippet + text_len + text_hash.
     snippet_chars: length of text_snippet.
+    doc_hash: document hash to use instead of hashing `elements` (needed when elements
+      arrive incrementally through add_elements and the full list is not known up front).
     """
 
     def __init__(
@@ -42,6 +51,7 @@ class StoreBuilder:
         extracted_with: str = "unknown",
         include_text_in_index: bool = False,
         snippet_chars: int = 280,
+        doc_hash: Optional[str] = None,
     ):
         self.elements = elements
         self.filename = filename
@@ -51,8 +61,7 @@ class StoreBuilder:
         self.snippet_chars = snippet_chars
         self.created_at = now_iso()
 
-        raw_json = json.dumps(elements, sort_keys=True)
-        self.doc_hash = sha256_str(raw_json)
+        self.doc_hash = doc_hash or sha256_str(json.dumps(elements, sort_keys=True))
         self.doc_id = urn("doc", self.doc_hash)
 
         self.sections: List[Section] = []
@@ -62,15 +71,99 @@ class StoreBuilder:
 
     def build(self) -> Store:
         self._pass_sections()
+        return self.finish()
+
+    def add_elements(self, elements: List[Dict[str, Any]]) -> List[Section]:
+        """
+        Incremental build: turn one batch of elements (e.g. one page) into sections now.
+        Batches must arrive in page order; sequences then match what build() assigns
+        to the same elements. Call finish() after the last batch.
+        """
+        by_parent: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for el in elements:
+            by_parent[_get(el, ["metadata", "parent_id"])].append(el)
+        self.elements.extend(elements)
+        out: List[Section] = []
+        for parent_id, group in by_parent.items():
+            start = len(self._children_by_parent_element_id[parent_id])
+            for seq, el in enumerate(sorted(group, key=_element_order), start=start + 1):
+                out.append(self._add_section(el, parent_id, seq))
+        return out
+
+    def finish(self) -> Store:
+        """Cross-refs, definitions and topology over the sections built so far."""
+        # build() order: parent groups by first appearance in the elements, then sequence
+        parent_rank: Dict[Optional[str], int] = {}
+        for el in self.elements:
+            parent_rank.setdefault(_get(el, ["metadata", "parent_id"]), len(parent_rank))
+        self.sections.sort(key=lambda s: (parent_rank[s.parent_element_id], s.sequence))
+        self._pass_crossrefs()
+        self._pass_definitions()
+
+        store = Store(
+            schema_version=self.schema_version,
+            document=self._document_header(),
+            sections=sorted(self.sections, key=lambda s: (s.parent_element_id or "", s.sequence)),
+            definitions=self.definitions,
+            cross_references=self.cross_refs,
+            topology=self._topology(),
+            provenance=self._provenance(),
+        )
+        return store
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming build. Yields {"record": kind, "data": model} in this order:
+          document, section (one per section, as _pass_sections produces them),
+          cross_reference*, definition*, topology, provenance.
+        Sections come grouped by parent, groups in order of their first element and
+        `sequence` order within a group; `sequence` counts per parent, so there is no
+        single document-wide sequence to stream by. build() sorts the same sections by
+        (parent_element_id, sequence).
+        Consumers can start on sections before cross-refs/definitions are computed.
+        """
+        yield {"record": "document", "data": self._document_header()}
+        for sec in self._iter_sections():
+            yield {"record": "section", "data": sec}
         self._pass_crossrefs()
+        for x in self.cross_refs:
+            yield {"record": "cross_reference", "data": x}
         self._pass_definitions()
+        for d in self.definitions:
+            yield {"record": "definition", "data": d}
+        yield {"record": "topology", "data": self._topology()}
+        yield {"record": "provenance", "data": self._provenance()}
+
+    def _document_header(self) -> DocumentHeader:
+        return DocumentHeader(
+            doc_id=self.doc_id,
+            title=None,
+            filename=self.filename,
+            filetype="application/json",
+            hash=self.doc_hash,
+            extracted_with=self.extracted_with,
+            extracted_at=self.created_at,
+            version=1,
+        )
+
+    def _provenance(self) -> Dict[str, Any]:
+        return {
+            "source": self.extracted_with,
+            "built_at": self.created_at,
+            "elements_count": len(self.elements),
+            "notes": "Non-graph store. Full text lives in `sections[*].text`. Index carries snippet/hash/len (or full text if enabled)."
+        }
 
+    def _topology(self) -> Dict[str, Any]:
         # children_by_parent map
         children_map = {
             self._sec_id_or_none(pid): [s.section_id for s in sorted(lst, key=lambda x: x.sequence)]
             for pid, lst in self._children_by_parent_element_id.items()
         }
 
+        # pre/post intervals make subtree and ancestry checks range comparisons
+        intervals = euler_intervals(children_map)
+
         # section_index map with optional text
         section_index: Dict[str, Dict[str, Any]] = {}
         for s in self.sections:
@@ -93,118 +186,105 @@ class StoreBuilder:
                 entry["text"] = txt
             else:
                 entry["text_snippet"] = (txt[: self.snippet_chars] if txt else None)
+            tree = intervals.get(s.section_id) or {}
+            entry["pre"] = tree.get("pre")
+            entry["post"] = tree.get("post")
+            entry["depth"] = tree.get("depth")
+            entry["ancestors"] = tree.get("ancestors", [])
             section_index[s.section_id] = entry
 
-        store = Store(
-            schema_version=self.schema_version,
-            document=DocumentHeader(
-                doc_id=self.doc_id,
-                title=None,
-                filename=self.filename,
-                filetype="application/json",
-                hash=self.doc_hash,
-                extracted_with=self.extracted_with,
-                extracted_at=self.created_at,
-                version=1,
-            ),
-            sections=sorted(self.sections, key=lambda s: (s.parent_element_id or "", s.sequence)),
-            definitions=self.definitions,
-            cross_references=self.cross_refs,
-            topology={"children_by_parent": children_map, "section_index": section_index},
-            provenance={
-                "source": self.extracted_with,
-                "built_at": self.created_at,
-                "elements_count": len(self.elements),
-                "notes": "Non-graph store. Full text lives in `sections[*].text`. Index carries snippet/hash/len (or full text if enabled)."
-            }
-        )
-        return store
+        return {"children_by_parent": children_map, "section_index": section_index}
 
     # ---------- passes ----------
 
     def _pass_sections(self) -> None:
+        for _sec in self._iter_sections():
+            pass
+
+    def _iter_sections(self) -> Iterator[Section]:
         by_parent: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
         for el in self.elements:
             pid = _get(el, ["metadata", "parent_id"])
             by_parent[pid].append(el)
 
         for parent_id, group in by_parent.items():
-            def keyfn(e):
-                pnum = _get(e, ["metadata", "page_number"], 10**7)
-                return (pnum, e.get("element_id") or "")
-            for seq, el in enumerate(sorted(group, key=keyfn), start=1):
-                md = el.get("metadata") or {}
-                element_id = el.get("element_id") or sha256_str(json.dumps(el, sort_keys=True)[:160])
-                section_id = urn("sec", self.doc_id, element_id)
-
-                # robust text
-                best_text, text_source, all_texts = extract_best_text(el)
-                text = best_text
-
-                # labels/titles/level (best-effort)
-                label, title, level = None, None, None
-                t_lower = (el.get("type") or "").lower()
-
-                # Prefer a provided structural level from metadata, if any
-                md_level_raw = md.get("level")
-
-                def _as_int(x):
-                    try:
-                        return int(x)
-                    except (TypeError, ValueError):
-                        return None
-
-                md_level = _as_int(md_level_raw)
-
-                # If the element looks like a header/title, parse with explicit level
-                if "title" in t_lower or "header" in t_lower:
-                    label, title, level = parse_label_title_level(text, explicit_level=md_level)
-
-                # If still no label (or not a header), try parsing anyway from text, but keep explicit level if present
-                if not label:
-                    l2, t2, lvl2 = parse_label_title_level(text, explicit_level=md_level)
-                    label = label or l2
-                    title = title or t2
-                    level = md_level if md_level is not None else lvl2
-
-                # pages & spans (support dict coordinates with polygon points)
-                pnum = md.get("page_number")
-                spans: List[Span] = []
-                coords = md.get("coordinates")
-                polygon = None
-                bbox = None
-                if isinstance(coords, dict) and isinstance(coords.get("points"), list):
-                    polygon = coords["points"]
-                    bb = _bbox_from_points(polygon)
-                    bbox = bb if bb else None
-                elif isinstance(coords, list):
-                    # some extractors give bbox directly
-                    bbox = coords
-                if pnum is not None:
-                    spans.append(Span(page=pnum, bbox=bbox, polygon=polygon))
-
-                sec = Section(
-                    section_id=section_id,
-                    element_id=element_id,
-                    parent_element_id=parent_id,
-                    sequence=seq,
-                    label=label,
-                    title=title,
-                    level=level,
-                    text=text,
-                    page_start=pnum,
-                    page_end=pnum,
-                    spans=spans,
-                    element_type=el.get("type"),
-                    confidence=md.get("detection_class_prob"),
-                    raw_element=el,
-                    text_source=text_source,
-                    text_candidates=all_texts,
-                    text_length=len(text) if text else 0,
-                    missing_text=not bool(text),
-                )
-                self.sections.append(sec)
-                self._children_by_parent_element_id[parent_id].append(sec)
+            for seq, el in enumerate(sorted(group, key=_element_order), start=1):
+                yield self._add_section(el, parent_id, seq)
+
+    def _add_section(self, el: Dict[str, Any], parent_id: Optional[str], seq: int) -> Section:
+        md = el.get("metadata") or {}
+        element_id = el.get("element_id") or sha256_str(json.dumps(el, sort_keys=True)[:160])
+        section_id = urn("sec", self.doc_id, element_id)
+
+        # robust text
+        best_text, text_source, all_texts = extract_best_text(el)
+        text = best_text
+
+        # labels/titles/level (best-effort)
+        label, title, level = None, None, None
+        t_lower = (el.get("type") or "").lower()
+
+        # Prefer a provided structural level from metadata, if any
+        md_level_raw = md.get("level")
+
+        def _as_int(x):
+            try:
+                return int(x)
+            except (TypeError, ValueError):
+                return None
+
+        md_level = _as_int(md_level_raw)
+
+        # If the element looks like a header/title, parse with explicit level
+        if "title" in t_lower or "header" in t_lower:
+            label, title, level = parse_label_title_level(text, explicit_level=md_level)
+
+        # If still no label (or not a header), try parsing anyway from text, but keep explicit level if present
+        if not label:
+            l2, t2, lvl2 = parse_label_title_level(text, explicit_level=md_level)
+            label = label or l2
+            title = title or t2
+            level = md_level if md_level is not None else lvl2
+
+        # pages & spans (support dict coordinates with polygon points)
+        pnum = md.get("page_number")
+        spans: List[Span] = []
+        coords = md.get("coordinates")
+        polygon = None
+        bbox = None
+        if isinstance(coords, dict) and isinstance(coords.get("points"), list):
+            polygon = coords["points"]
+            bb = _bbox_from_points(polygon)
+            bbox = bb if bb else None
+        elif isinstance(coords, list):
+            # some extractors give bbox directly
+            bbox = coords
+        if pnum is not None:
+            spans.append(Span(page=pnum, bbox=bbox, polygon=polygon))
+
+        sec = Section(
+            section_id=section_id,
+            element_id=element_id,
+            parent_element_id=parent_id,
+            sequence=seq,
+            label=label,
+            title=title,
+            level=level,
+            text=text,
+            page_start=pnum,
+            page_end=pnum,
+            spans=spans,
+            element_type=el.get("type"),
+            confidence=md.get("detection_class_prob"),
+            raw_element=el,
+            text_source=text_source,
+            text_candidates=all_texts,
+            text_length=len(text) if text else 0,
+            missing_text=not bool(text),
+        )
+        self.sections.append(sec)
+        self._children_by_parent_element_id[parent_id].append(sec)
+        return sec
 
     def _pass_crossrefs(self) -> None:
         label_to_section_id = { (s.label or "").lower(): s.section_id for s in self.sections if s.label }
@@ -0,0 +1,84 @@
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries may carry tags so a group can be dropped at once
+    (e.g. every cached search that could include a given doc_id).
+    maxsize <= 0 disables caching; ttl <= 0 means entries never expire.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._by_tag: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires, value, _tags = item
+            if expires and expires < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        if self.maxsize <= 0:
+            return
+        tags = tuple(tags)
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (expires, value, tags)
+            for t in tags:
+                self._by_tag.setdefault(t, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        with self._lock:
+            for t in tags:
+                for key in list(self._by_tag.get(t, ())):
+                    if key in self._data:
+                        self._drop(key)
+                        dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+    def _drop(self, key: Hashable) -> Optional[Any]:
+        _expires, value, tags = self._data.pop(key)
+        for t in tags:
+            keys = self._by_tag.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[t]
+        return value
@@ -0,0 +1,190 @@
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import itertools
+import multiprocessing
+import re
+import sys
+import time
+
+from app.services.loaders import load_any_shape
+from app.services.builder import StoreBuilder
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _with_page_numbers(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-page extractors (PyMuPDF) put page_number at the top level; StoreBuilder reads metadata."""
+    out = []
+    for i, el in enumerate(elements):
+        if isinstance(el, dict) and "page_number" in el and not (el.get("metadata") or {}).get("page_number"):
+            el = {**el, "metadata": {**(el.get("metadata") or {}), "page_number": el["page_number"]}}
+            el.setdefault("element_id", f"page-{el['page_number']}-{i}")
+        out.append(el)
+    return out
+
+
+def store_metrics(store: Dict[str, Any]) -> Dict[str, Any]:
+    sections = store.get("sections") or []
+    xrefs = store.get("cross_references") or []
+    n = len(sections) or 1
+    pages = {s.get("page_start") for s in sections if s.get("page_start") is not None}
+    labelled = sum(1 for s in sections if s.get("label"))
+    titles = sum(1 for s in sections if "title" in (s.get("element_type") or "").lower())
+    return {
+        "pages": len(pages),
+        "sections": len(sections),
+        "text_chars": sum(s.get("text_length") or 0 for s in sections),
+        "empty_sections": sum(1 for s in sections if s.get("missing_text")),
+        "title_elements": titles,
+        "headings_detected": labelled,
+        "heading_rate": round(labelled / n, 4),
+        "cross_refs_detected": len(xrefs),
+        "cross_refs_per_section": round(len(xrefs) / n, 4),
+        "cross_refs_resolved_rate": round(sum(1 for x in xrefs if x.get("resolved_section_id")) / len(xrefs), 4) if xrefs else 0.0,
+        "definitions": len(store.get("definitions") or []),
+    }
+
+
+def run_extractor_job(name: str, contents: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Process-pool entry point: extract with one backend, normalize through
+    load_any_shape -> StoreBuilder, and report cost + quality numbers.
+    """
+    from app.services.registry import BACKEND_LIBRARIES, get_extractor, timed_import
+
+    t_import = time.perf_counter()
+    for module in BACKEND_LIBRARIES.get(name, []):
+        timed_import(module)
+    extractor = get_extractor(name)
+    import_seconds = time.perf_counter() - t_import
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    raw = extractor(contents, filename)
+    extract_wall = time.perf_counter() - wall0
+
+    elements = _with_page_numbers(load_any_shape(raw))
+    store = StoreBuilder(elements, filename=filename, extracted_with=name).build().model_dump(exclude_none=False)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    metrics = {
+        "status": "ok",
+        "import_seconds": round(import_seconds, 4),
+        "wall_seconds": round(wall, 4),
+        "extract_seconds": round(extract_wall, 4),
+        "build_seconds": round(wall - extract_wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "elements": len(elements),
+    }
+    metrics.update(store_metrics(store))
+    # ordered by page so texts from different extractors line up
+    text = " ".join(s.get("text") or "" for s in sorted(
+        store["sections"], key=lambda s: (s.get("page_start") or 0, s.get("sequence") or 0)))
+    return {"metrics": metrics, "text": text}
+
+
+def _job_entry(conn, name: str, contents: bytes, filename: str) -> None:
+    """Worker process body: run_extractor_job, result or error message back over the pipe."""
+    try:
+        conn.send(("ok", run_extractor_job(name, contents, filename)))
+    except BaseException as e:
+        conn.send(("error", str(e) or type(e).__name__))
+    finally:
+        conn.close()
+
+
+def _receive(conn, timeout: float):
+    if not conn.poll(timeout):
+        raise asyncio.TimeoutError()
+    try:
+        return conn.recv()
+    except EOFError:
+        return None
+
+
+async def _run_isolated(ctx, name: str, contents: bytes, filename: str, timeout: float) -> Dict[str, Any]:
+    """
+    One extractor in its own process. The process is killed on timeout (or if the
+    request is cancelled) instead of being left to finish work nobody will read.
+    """
+    recv_end, send_end = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_job_entry, args=(send_end, name, contents, filename), daemon=True)
+    proc.start()
+    send_end.close()  # the child now holds the only write end: EOF if it dies
+    try:
+        # poll() bounds the thread by the timeout, so it never outlives the worker
+        msg = await asyncio.to_thread(_receive, recv_end, timeout)
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        await asyncio.to_thread(proc.join)
+    if msg is None:
+        raise RuntimeError(f"worker exited with code {proc.exitcode}")
+    status, payload = msg
+    if status != "ok":
+        raise RuntimeError(payload)
+    return payload
+
+
+def _shingles(text: str, k: int = 3) -> Set[str]:
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i: i + k]) for i in range(len(words) - k + 1)}
+
+
+def text_overlap(texts: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """Pairwise Jaccard similarity and containment over word 3-shingles."""
+    sh = {name: _shingles(t) for name, t in texts.items()}
+    out: Dict[str, Dict[str, float]] = {}
+    for a, b in itertools.combinations(sorted(sh), 2):
+        sa, sb = sh[a], sh[b]
+        inter = len(sa & sb)
+        union = len(sa | sb) or 1
+        out[f"{a}|{b}"] = {
+            "jaccard": round(inter / union, 4),
+            f"{a}_in_{b}": round(inter / (len(sa) or 1), 4),
+            f"{b}_in_{a}": round(inter / (len(sb) or 1), 4),
+        }
+    return out
+
+
+async def compare_extractors(contents: bytes, filename: str, names: List[str], timeout: float) -> Dict[str, Any]:
+    """
+    Run each extractor in its own fresh worker process concurrently (so CPU time and
+    peak RSS are per extractor), then compare their normalized stores.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(_run_isolated(ctx, name, contents, filename, timeout) for name in names), return_exceptions=True)
+    total = time.perf_counter() - t0
+
+    extractors: Dict[str, Any] = {}
+    texts: Dict[str, str] = {}
+    for name, res in zip(names, results):
+        if isinstance(res, BaseException):
+            extractors[name] = {"status": "error", "error": str(res) or type(res).__name__}
+            continue
+        extractors[name] = res["metrics"]
+        texts[name] = res["text"]
+
+    ok = [n for n in names if extractors[n].get("status") == "ok"]
+    return {
+        "filename": filename,
+        "total_wall_seconds": round(total, 4),
+        "extractors": extractors,
+        "text_overlap": text_overlap(texts),
+        "by_cpu_seconds": sorted(ok, key=lambda n: extractors[n]["cpu_seconds"]),
+    }
@@ -0,0 +1,151 @@
+# app/services/hybrid_extractor.py
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import io
+
+from app.core.config import settings
+from app.services.parsers import parse_label_title_level
+from app.services.pdf_processor import _fitz
+from app.utils.ids import sha256_str
+
+# headings are short; longer numbered blocks are body text ("1.1 Definitions. The ...")
+_TITLE_MAX_CHARS = 120
+
+
+def classify_page(page) -> Dict[str, Any]:
+    """
+    Cheap PyMuPDF profile of one page: text-layer size and how much of the page
+    is covered by images. needs_ocr marks image-only (scanned) pages.
+    """
+    fitz = _fitz()
+    text_chars = len(page.get_text("text").strip())
+    area = abs(page.rect) or 1.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    image_coverage = min(1.0, covered / area)
+    needs_ocr = text_chars < settings.hybrid_min_text_chars and image_coverage >= settings.hybrid_min_image_coverage
+    return {
+        "page_number": page.number + 1,
+        "text_chars": text_chars,
+        "image_coverage": round(image_coverage, 4),
+        "route": "ocr" if needs_ocr else "digital",
+    }
+
+
+def extract_digital_page(page) -> List[Dict[str, Any]]:
+    """
+    Text blocks of a born-digital page as Unstructured-shaped elements
+    (type / text / element_id / metadata.page_number / metadata.coordinates.points).
+    """
+    page_number = page.number + 1
+    out: List[Dict[str, Any]] = []
+    for x0, y0, x1, y1, text, block_no, block_type in page.get_text("blocks", sort=True):
+        if block_type != 0:  # image block
+            continue
+        text = " ".join(text.split())
+        if not text:
+            continue
+        label, _title, _level = parse_label_title_level(text)
+        etype = "Title" if label and len(text) <= _TITLE_MAX_CHARS else "NarrativeText"
+        out.append({
+            "type": etype,
+            "text": text,
+            "element_id": sha256_str(f"{page_number}:{block_no}:{text}")[:32],
+            "metadata": {
+                "page_number": page_number,
+                "coordinates": {"points": [[x0, y0], [x0, y1], [x1, y1], [x1, y0]], "system": "PDFSpace"},
+                "filetype": "application/pdf",
+                "extracted_by": "pymupdf",
+            },
+        })
+    return out
+
+
+def _subset_pdf(doc, page_numbers: List[int]) -> bytes:
+    """New PDF holding only the given 1-based pages, in order."""
+    fitz = _fitz()
+    sub = fitz.open()
+    for n in page_numbers:
+        sub.insert_pdf(doc, from_page=n - 1, to_page=n - 1)
+    return sub.tobytes()
+
+
+def extract_ocr_pages(doc, page_numbers: List[int], filename: str, strategy: Optional[str] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Run Unstructured on just these pages (one partition call over a sub-PDF) and map
+    its page numbers back to the original document. strategy defaults to HYBRID_OCR_STRATEGY.
+    """
+    strategy = strategy or settings.hybrid_ocr_strategy
+    if not page_numbers:
+        return {}
+    try:
+        from unstructured.partition.pdf import partition_pdf
+    except ImportError as e:
+        raise RuntimeError(
+            "Unstructured PDF support is required for scanned pages. "
+            "Install with: pip install \"unstructured[pdf]\""
+        ) from e
+
+    pdf_file_like = io.BytesIO(_subset_pdf(doc, page_numbers))
+    setattr(pdf_file_like, "name", filename)
+    elements = partition_pdf(file=pdf_file_like, strategy=strategy)
+
+    by_page: Dict[int, List[Dict[str, Any]]] = {n: [] for n in page_numbers}
+    for el in (e.to_dict() for e in elements):
+        md = el.setdefault("metadata", {})
+        sub_page = md.get("page_number") or 1
+        original = page_numbers[min(max(sub_page, 1), len(page_numbers)) - 1]
+        md["page_number"] = original
+        md["extracted_by"] = f"unstructured:{strategy}"
+        by_page[original].append(el)
+    return by_page
+
+
+def _ocr_pages(doc, page_numbers: List[int], filename: str) -> Dict[int, List[Dict[str, Any]]]:
+    """extract_ocr_pages, served from the page cache when PAGE_CACHE_DIR is set."""
+    from app.services import page_cache
+
+    if not page_numbers or not page_cache.page_cache_enabled():
+        return extract_ocr_pages(doc, page_numbers, filename)
+    strategy = settings.hybrid_ocr_strategy
+    by_page, _stats = page_cache.extract_pages_cached(
+        doc, page_numbers, filename, f"unstructured:{strategy}", extract_ocr_pages)
+    return by_page
+
+
+def extract_hybrid(contents: bytes, filename: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Route each page by its profile: born-digital pages go through PyMuPDF,
+    image-only pages through Unstructured. Returns (elements in page order, page profiles).
+    """
+    fitz = _fitz()
+    doc = fitz.open(stream=contents, filetype="pdf")
+    profiles = [classify_page(page) for page in doc]
+    ocr_pages = [p["page_number"] for p in profiles if p["route"] == "ocr"]
+    ocr_elements = _ocr_pages(doc, ocr_pages, filename)
+
+    elements: List[Dict[str, Any]] = []
+    for prof in profiles:
+        n = prof["page_number"]
+        page_elements = ocr_elements[n] if prof["route"] == "ocr" else extract_digital_page(doc[n - 1])
+        prof["elements"] = len(page_elements)
+        elements.extend(page_elements)
+    return elements, profiles
+
+
+def iter_hybrid_pages(contents: bytes, filename: str) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Page-at-a-time variant of extract_hybrid: yields (profile, elements) in page order."""
+    fitz = _fitz()
+    doc = fitz.open(stream=contents, filetype="pdf")
+    for page in doc:
+        prof = classify_page(page)
+        if prof["route"] == "ocr":
+            page_elements = _ocr_pages(doc, [prof["page_number"]], filename)[prof["page_number"]]
+        else:
+            page_elements = extract_digital_page(page)
+        prof["elements"] = len(page_elements)
+        yield prof, page_elements
+
+
+def extract_hybrid_elements(contents: bytes, filename: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Registry entry point (blocking): hybrid elements only."""
+    elements, _profiles = extract_hybrid(contents, filename or "document.pdf")
+    return elements
@@ -1,11 +1,568 @@
-from typing import Any, Dict, List
-from neo4j import GraphDatabase, basic_auth
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
 from app.core.config import settings
+from app.utils.ids import sha256_str
+from app.services.search import invalidate_doc
+
+CONSTRAINT_STATEMENTS = [
+    "CREATE CONSTRAINT doc_id_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.doc_id IS UNIQUE",
+    "CREATE CONSTRAINT sec_id_unique IF NOT EXISTS FOR (s:Section) REQUIRE s.section_id IS UNIQUE",
+    "CREATE CONSTRAINT def_id_unique IF NOT EXISTS FOR (d:Definition) REQUIRE d.def_id IS UNIQUE",
+    "CREATE CONSTRAINT text_hash_unique IF NOT EXISTS FOR (t:Text) REQUIRE t.text_hash IS UNIQUE",
+    "CREATE INDEX sec_tree_pre IF NOT EXISTS FOR (s:Section) ON (s.tree_pre)",
+    "CREATE INDEX doc_key IF NOT EXISTS FOR (d:Document) ON (d.doc_key)",
+]
+
+# NEW: full-text index for search
+FULLTEXT_INDEX_QUERY = """
+CREATE FULLTEXT INDEX sectionTextIdx IF NOT EXISTS
+FOR (s:Section) ON EACH [s.text, s.title, s.label]
+"""
+
+IMPORT_QUERY = """
+MERGE (d:Document {doc_id: $doc.doc_id})
+SET d += $doc.props
+WITH d, $sections AS sections, $parent_rels AS parent_rels, $next_rels AS next_rels,
+     $definitions AS definitions, $xrefs AS xrefs
+
+// Sections + HAS_SECTION (batched)
+CALL {
+  WITH d, sections
+  UNWIND sections AS s
+  MERGE (sec:Section {section_id: s.section_id})
+  SET sec += s.props
+  MERGE (d)-[:HAS_SECTION]->(sec)
+  RETURN count(*) AS _
+}
+
+WITH d, parent_rels, next_rels, definitions, xrefs
+
+// Parent relationships
+UNWIND parent_rels AS relP
+MATCH (child:Section {section_id: relP.child}), (parent:Section {section_id: relP.parent})
+MERGE (child)-[:PARENT_SECTION]->(parent)
+
+WITH d, next_rels, definitions, xrefs
+
+// NEXT relationships
+UNWIND next_rels AS relN
+MATCH (a:Section {section_id: relN.a}), (b:Section {section_id: relN.b})
+MERGE (a)-[:NEXT_SECTION]->(b)
+
+WITH d, definitions, xrefs
+
+// Definitions (nodes) + DEFINES
+UNWIND definitions AS def
+MERGE (df:Definition {def_id: def.def_id})
+SET df.term = def.term, df.text = def.text
+WITH d, xrefs, def
+MATCH (sec:Section {section_id: def.section_id})
+MERGE (sec)-[:DEFINES]->(:Definition {def_id: def.def_id})
+
+WITH d, xrefs
+
+// Cross-refs (resolved only)
+UNWIND xrefs AS xr
+MATCH (s:Section {section_id: xr.source}), (t:Section {section_id: xr.target})
+MERGE (s)-[:REFERS_TO]->(t)
+RETURN d.doc_id AS doc_id
+"""
+
+SEARCH_QUERY = """
+CALL db.index.fulltext.queryNodes('sectionTextIdx', $q) YIELD node, score
+MATCH (d:Document)-[:HAS_SECTION]->(node)
+WHERE $doc_ids IS NULL OR d.doc_id IN $doc_ids
+RETURN d.doc_id AS doc_id, node.section_id AS section_id, node.label AS label, node.title AS title,
+       node.text AS text, node.page_start AS page_start, score
+ORDER BY score DESC, section_id
+SKIP $skip LIMIT $limit
+"""
+
+# ---------- delta sync ----------
+
+# One round trip: every Section of the document with its stored hash and outgoing edges
+DELTA_FETCH_QUERY = """
+MATCH (d:Document {doc_id: $doc_id})-[:HAS_SECTION]->(s:Section)
+OPTIONAL MATCH (s)-[r:PARENT_SECTION|NEXT_SECTION|REFERS_TO]->(t:Section)
+WITH s, collect(CASE WHEN t IS NULL THEN NULL ELSE [type(r), t.section_id] END) AS edges
+OPTIONAL MATCH (s)-[:DEFINES]->(df:Definition)
+RETURN s.section_id AS section_id, s.element_id AS element_id, s.sync_hash AS sync_hash,
+       s.text_hash AS text_hash, edges, collect(df.def_id) AS def_ids
+"""
+
+# Other versions of the same document (same caller-supplied doc_key), newest first
+PREVIOUS_VERSIONS_QUERY = """
+MATCH (d:Document {doc_key: $doc_key})
+WHERE d.doc_id <> $doc_id
+RETURN d.doc_id AS doc_id
+ORDER BY d.extracted_at DESC
+"""
+
+# Drops whole superseded versions; returns the Text hashes they linked to, for GC
+PRUNE_DOCUMENTS_QUERY = """
+UNWIND $superseded_doc_ids AS old
+MATCH (d:Document {doc_id: old})
+OPTIONAL MATCH (d)-[:HAS_SECTION]->(s:Section)
+OPTIONAL MATCH (s)-[:HAS_TEXT]->(t:Text)
+OPTIONAL MATCH (s)-[:DEFINES]->(df:Definition)
+WITH collect(DISTINCT d) AS docs, collect(DISTINCT s) AS secs, collect(DISTINCT df) AS defs,
+     collect(DISTINCT t.text_hash) AS text_hashes
+FOREACH (n IN defs + secs + docs | DETACH DELETE n)
+RETURN text_hashes
+"""
+
+# Edges and definitions; shared by the delta and batch imports
+_EDGE_STATEMENTS = [
+    """
+    UNWIND $parent_rels AS relP
+    MATCH (child:Section {section_id: relP.child}), (parent:Section {section_id: relP.parent})
+    MERGE (child)-[:PARENT_SECTION]->(parent)
+    """,
+    """
+    UNWIND $next_rels AS relN
+    MATCH (a:Section {section_id: relN.a}), (b:Section {section_id: relN.b})
+    MERGE (a)-[:NEXT_SECTION]->(b)
+    """,
+    """
+    UNWIND $definitions AS def
+    MERGE (df:Definition {def_id: def.def_id})
+    SET df.term = def.term, df.text = def.text
+    WITH df, def
+    MATCH (sec:Section {section_id: def.section_id})
+    MERGE (sec)-[:DEFINES]->(df)
+    """,
+    """
+    UNWIND $xrefs AS xr
+    MATCH (s:Section {section_id: xr.source}), (t:Section {section_id: xr.target})
+    MERGE (s)-[:REFERS_TO]->(t)
+    """,
+]
+
+# Run in order inside a single write transaction; each reads its own key from the plan
+DELTA_APPLY_STATEMENTS = [
+    # adopt the previous version: its Document and matched Sections take the new ids
+    """
+    MATCH (d:Document {doc_id: $previous_doc_id})
+    OPTIONAL MATCH (empty:Document {doc_id: $doc.doc_id})
+    DETACH DELETE empty
+    WITH d
+    SET d.doc_id = $doc.doc_id
+    """,
+    """
+    UNWIND $renamed_sections AS r
+    MATCH (s:Section {section_id: r.old})
+    SET s.section_id = r.new, s.ancestor_ids = r.ancestor_ids
+    """,
+    """
+    MERGE (d:Document {doc_id: $doc.doc_id})
+    SET d += $doc.props
+    """,
+    """
+    UNWIND $removed_sections AS sid
+    MATCH (s:Section {section_id: sid})
+    DETACH DELETE s
+    """,
+    """
+    UNWIND $removed_definitions AS did
+    MATCH (df:Definition {def_id: did})
+    DETACH DELETE df
+    """,
+    """
+    UNWIND $removed_edges AS e
+    MATCH (a:Section {section_id: e.a})-[r]->(b:Section {section_id: e.b})
+    WHERE type(r) = e.type
+    DELETE r
+    """,
+    """
+    UNWIND $removed_defines AS e
+    MATCH (:Section {section_id: e.a})-[r:DEFINES]->(:Definition {def_id: e.b})
+    DELETE r
+    """,
+    """
+    MATCH (d:Document {doc_id: $doc.doc_id})
+    UNWIND $sections AS s
+    MERGE (sec:Section {section_id: s.section_id})
+    SET sec += s.props
+    MERGE (d)-[:HAS_SECTION]->(sec)
+    """,
+] + _EDGE_STATEMENTS
+
+# Full import of several stores in one write transaction (see batch_import_params)
+IMPORT_BATCH_STATEMENTS = [
+    """
+    UNWIND $docs AS doc
+    MERGE (d:Document {doc_id: doc.doc_id})
+    SET d += doc.props
+    """,
+    """
+    UNWIND $sections AS s
+    MATCH (d:Document {doc_id: s.doc_id})
+    MERGE (sec:Section {section_id: s.section_id})
+    SET sec += s.props
+    MERGE (d)-[:HAS_SECTION]->(sec)
+    """,
+] + _EDGE_STATEMENTS
+
+IMPORT_MODES = ("full", "delta")
+
+# ---------- pipelined ingestion ----------
+# Sections are upserted in batches while the document is still being extracted; the
+# final delta import then adds edges, definitions and the tree interval, which needs
+# the whole document.
+SECTION_BATCH_QUERY = """
+MERGE (d:Document {doc_id: $doc.doc_id})
+SET d += $doc.props
+WITH d
+UNWIND $sections AS s
+MERGE (sec:Section {section_id: s.section_id})
+SET sec += s.props
+MERGE (d)-[:HAS_SECTION]->(sec)
+"""
+
+# Section props only known once the whole tree is built
+TREE_PROPS = ("tree_pre", "tree_post", "tree_depth", "ancestor_ids")
+
+# Whole subtree of one section in pre-order via its tree_pre/tree_post interval (no variable-length paths)
+SUBTREE_QUERY = """
+MATCH (d:Document)-[:HAS_SECTION]->(root:Section {section_id: $section_id})
+MATCH (d)-[:HAS_SECTION]->(s:Section)
+WHERE s.tree_pre >= root.tree_pre AND s.tree_post <= root.tree_post
+  AND ($max_depth IS NULL OR s.tree_depth <= root.tree_depth + $max_depth)
+RETURN d.doc_id AS doc_id, s.section_id AS section_id, s.label AS label, s.title AS title, s.text AS text,
+       s.page_start AS page_start, s.tree_pre AS tree_pre, s.tree_post AS tree_post, s.tree_depth AS tree_depth,
+       s.ancestor_ids AS ancestor_ids
+ORDER BY s.tree_pre
+"""
+
+# ---------- shared section text ----------
+# One (:Text {text_hash}) node per distinct section text, linked by HAS_TEXT from every
+# Section carrying it. A Text node's reference count is its HAS_TEXT in-degree; GC drops
+# nodes that reach zero. The text body stays on Section: sectionTextIdx indexes it there.
+
+# Drops HAS_TEXT edges whose target no longer matches the section's text; returns their hashes
+TEXT_UNLINK_QUERY = """
+UNWIND $sections AS s
+MATCH (sec:Section {section_id: s.section_id})-[old:HAS_TEXT]->(t:Text)
+WHERE s.props.text_hash IS NULL OR t.text_hash <> s.props.text_hash
+DELETE old
+RETURN collect(DISTINCT t.text_hash) AS detached
+"""
+
+TEXT_LINK_QUERY = """
+UNWIND $sections AS s
+WITH s WHERE s.props.text_hash IS NOT NULL
+MATCH (sec:Section {section_id: s.section_id})
+MERGE (t:Text {text_hash: s.props.text_hash})
+ON CREATE SET t.length = s.props.text_length
+MERGE (sec)-[:HAS_TEXT]->(t)
+"""
+
+TEXT_GC_QUERY = """
+UNWIND $text_hashes AS h
+MATCH (t:Text {text_hash: h})
+WHERE NOT (t)<-[:HAS_TEXT]-()
+DELETE t
+RETURN count(t) AS removed
+"""
+
+TEXT_GC_ALL_QUERY = """
+MATCH (t:Text)
+WHERE NOT (t)<-[:HAS_TEXT]-()
+DELETE t
+RETURN count(t) AS removed
+"""
+
+TEXT_DOCUMENTS_QUERY = """
+MATCH (t:Text {text_hash: $text_hash})<-[:HAS_TEXT]-(s:Section)<-[:HAS_SECTION]-(d:Document)
+RETURN d.doc_id AS doc_id, collect(s.section_id) AS section_ids
+ORDER BY doc_id
+"""
+
+
+def text_usage(text_hash: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response shape for "which documents share this text" from TEXT_DOCUMENTS_QUERY rows."""
+    documents = [{"doc_id": r["doc_id"], "section_ids": sorted(r["section_ids"])} for r in rows]
+    return {
+        "text_hash": text_hash,
+        "refcount": sum(len(d["section_ids"]) for d in documents),
+        "documents": documents,
+    }
+
+
+def _section_sync_hash(props: Dict[str, Any]) -> str:
+    return sha256_str(json.dumps(props, sort_keys=True, default=str))
+
+
+def build_import_params(store: Dict[str, Any], doc_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Flatten a store dict into the parameter map used by IMPORT_QUERY.
+    Shared by the sync, async and in-memory clients so they write the same graph.
+
+    doc_key is the caller's identity for a document across versions (doc_id hashes the
+    content, so every edit gives a new one). Only an explicit key is stored: filenames
+    like "payload.json" or "contract.pdf" are shared by unrelated documents.
+    """
+    doc = store.get("document") or {}
+    doc_props = {k: v for k, v in doc.items() if k != "doc_id"}
+    if doc_key:
+        doc_props["doc_key"] = doc_key
+    sections = store.get("sections") or []
+    definitions = store.get("definitions") or []
+    xrefs = store.get("cross_references") or []
+    topo = (store.get("topology") or {})
+    children_by_parent = topo.get("children_by_parent") or {}
+    section_index = topo.get("section_index") or {}
+    element_of = {s["section_id"]: s.get("element_id") for s in sections}
+    # Build NEXT relationships by sequence per parent
+    next_rels: List[Dict[str, str]] = []
+    by_parent_to_secs = {k: v for k, v in children_by_parent.items()}
+    for _parent, sec_ids in by_parent_to_secs.items():
+        for a, b in zip(sec_ids, sec_ids[1:]):
+            next_rels.append({"a": a, "b": b})
+
+    return {
+        "doc": {
+            "doc_id": doc.get("doc_id"),
+            "props": doc_props,
+        },
+        "sections": [
+            {"section_id": s["section_id"],
+             "props": _section_props(s, section_index.get(s["section_id"]), element_of)}
+            for s in sections
+        ],
+        "parent_rels": [
+            {"child": cid, "parent": pid}
+            for pid, child_list in children_by_parent.items()
+            if isinstance(child_list, list) and pid is not None
+            for cid in child_list
+        ],
+        "next_rels": next_rels,
+        "definitions": [
+            {"def_id": d["def_id"], "term": d.get("term"), "text": d.get("text"), "section_id": d.get("section_id")}
+            for d in definitions
+        ],
+        "xrefs": [
+            {"source": x.get("source_section_id"), "target": x.get("resolved_section_id")}
+            for x in xrefs if x.get("resolved_section_id")
+        ],
+    }
+
+
+def batch_import_params(stores: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    build_import_params of several stores concatenated for IMPORT_BATCH_STATEMENTS:
+    every list is UNWOUND once for the whole batch; sections carry their doc_id.
+    """
+    out: Dict[str, Any] = {"docs": [], "sections": [], "parent_rels": [], "next_rels": [], "definitions": [], "xrefs": []}
+    for store in stores:
+        params = build_import_params(store)
+        doc_id = params["doc"]["doc_id"]
+        out["docs"].append(params["doc"])
+        out["sections"].extend({**sec, "doc_id": doc_id} for sec in params["sections"])
+        for key in ("parent_rels", "next_rels", "definitions", "xrefs"):
+            out[key].extend(params[key])
+    return out
+
+
+def _section_props(s: Dict[str, Any], index_entry: Optional[Dict[str, Any]] = None,
+                   element_of: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    text = s.get("text")
+    tree = index_entry or {}
+    props = {
+        "element_id": s.get("element_id"),
+        "title": s.get("title"),
+        "label": s.get("label"),
+        "level": s.get("level"),
+        "text": text,
+        "page_start": s.get("page_start"),
+        "page_end": s.get("page_end"),
+        "element_type": s.get("element_type"),
+        "text_length": s.get("text_length"),
+        "missing_text": s.get("missing_text"),
+        "text_hash": sha256_str(text) if text else None,
+        # Euler-tour interval from topology.section_index: subtree = tree_pre/tree_post range
+        "tree_pre": tree.get("pre"),
+        "tree_post": tree.get("post"),
+        "tree_depth": tree.get("depth"),
+        "ancestor_ids": tree.get("ancestors") or None,
+    }
+    # sync_hash covers every written property, so delta mode can skip untouched sections.
+    # Ancestors go in by element_id: a new doc_id renames every section, not its content.
+    hashed = props
+    if props["ancestor_ids"] and element_of:
+        hashed = {**props, "ancestor_ids": [element_of.get(a) or a for a in props["ancestor_ids"]]}
+    props["sync_hash"] = _section_sync_hash(hashed)
+    return props
+
+
+def section_batch_params(doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Params for SECTION_BATCH_QUERY (and the in-memory import) from a store document header and sections."""
+    return {
+        "doc": {"doc_id": doc.get("doc_id"), "props": {k: v for k, v in doc.items() if k != "doc_id"}},
+        "sections": [{"section_id": s["section_id"], "props": _section_props(s)} for s in sections],
+        "parent_rels": [],
+        "next_rels": [],
+        "definitions": [],
+        "xrefs": [],
+    }
+
+
+def narrow_streamed(plan: Dict[str, Any], streamed: Set[str]) -> Dict[str, Any]:
+    """
+    Delta plan for a store whose sections in `streamed` were already written by section
+    batches this run: for those, only the tree fields and sync_hash are still missing.
+    text_hash/text_length ride along so HAS_TEXT bookkeeping sees no change.
+    """
+    keep = TREE_PROPS + ("sync_hash", "text_hash", "text_length")
+    out = dict(plan)
+    out["sections"] = [
+        {"section_id": s["section_id"], "props": {k: s["props"].get(k) for k in keep}}
+        if s["section_id"] in streamed else s
+        for s in plan["sections"]
+    ]
+    return out
+
+
+def _edge_set(rels: Iterable[Dict[str, str]], a: str, b: str) -> Set[Tuple[str, str]]:
+    return {(r[a], r[b]) for r in rels}
+
+
+def adopt_rows(params: Dict[str, Any], previous: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Match DELTA_FETCH_QUERY rows of a previous version to the incoming sections by
+    element_id. Returns the renames ({old, new, ancestor_ids}) and the rows re-keyed to
+    the new section ids, ready for the normal diff.
+    """
+    by_element = {s["props"].get("element_id"): s for s in params["sections"] if s["props"].get("element_id")}
+    rename: Dict[str, str] = {}
+    renamed: List[Dict[str, Any]] = []
+    for r in previous:
+        s = by_element.get(r.get("element_id"))
+        if s is None or s["section_id"] in rename.values():
+            continue
+        rename[r["section_id"]] = s["section_id"]
+        renamed.append({"old": r["section_id"], "new": s["section_id"], "ancestor_ids": s["props"].get("ancestor_ids")})
+    rows = [
+        {**r, "section_id": rename.get(r["section_id"], r["section_id"]),
+         "edges": [[e[0], rename.get(e[1], e[1])] for e in r.get("edges") or [] if e and len(e) == 2]}
+        for r in previous
+    ]
+    return renamed, rows
+
+
+def plan_delta(
+    params: Dict[str, Any],
+    existing: List[Dict[str, Any]],
+    previous_doc_id: Optional[str] = None,
+    previous: Optional[List[Dict[str, Any]]] = None,
+    superseded: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """
+    Diff full import params against rows from DELTA_FETCH_QUERY.
+
+    Returns a params map for DELTA_APPLY_STATEMENTS holding only new/changed sections,
+    definitions of those sections, edges to add, and sections/definitions/edges to drop.
+
+    When the doc_id has nothing stored yet, `previous` (rows of previous_doc_id, an older
+    version with the same doc_key) is adopted instead: matching sections are renamed in
+    place and diffed as if they already carried the new ids. `superseded` versions are
+    dropped whole; callers only pass them when asked to prune (prune_versions).
+    """
+    renamed: List[Dict[str, Any]] = []
+    if previous_doc_id and not existing:
+        renamed, existing = adopt_rows(params, previous or [])
+    else:
+        previous_doc_id = None
+    stored_hash = {r["section_id"]: r.get("sync_hash") for r in existing}
+    stored_text = {r["section_id"]: r.get("text_hash") for r in existing}
+    stored_edges: Set[Tuple[str, str, str]] = set()
+    stored_defines: Set[Tuple[str, str]] = set()
+    for r in existing:
+        for edge in r.get("edges") or []:
+            if edge and len(edge) == 2:
+                stored_edges.add((edge[0], r["section_id"], edge[1]))
+        for did in r.get("def_ids") or []:
+            stored_defines.add((r["section_id"], did))
+
+    wanted_ids = {s["section_id"] for s in params["sections"]}
+    changed = [s for s in params["sections"] if stored_hash.get(s["section_id"]) != s["props"]["sync_hash"]]
+    changed_ids = {s["section_id"] for s in changed}
+    removed_sections = sorted(set(stored_hash) - wanted_ids)
+
+    wanted_edges = (
+        {("PARENT_SECTION", a, b) for a, b in _edge_set(params["parent_rels"], "child", "parent")}
+        | {("NEXT_SECTION", a, b) for a, b in _edge_set(params["next_rels"], "a", "b")}
+        | {("REFERS_TO", a, b) for a, b in _edge_set(params["xrefs"], "source", "target")}
+    )
+    wanted_defines = {(d["section_id"], d["def_id"]) for d in params["definitions"]}
+    stored_def_ids = {did for _sid, did in stored_defines}
+    wanted_def_ids = {d["def_id"] for d in params["definitions"]}
+
+    added_edges = wanted_edges - stored_edges
+    return {
+        "doc": params["doc"],
+        "previous_doc_id": previous_doc_id,
+        "renamed_sections": renamed,
+        "superseded_doc_ids": sorted(set(superseded) - {previous_doc_id, params["doc"]["doc_id"]}),
+        "sections": changed,
+        "definitions": [
+            d for d in params["definitions"]
+            if d["section_id"] in changed_ids or (d["section_id"], d["def_id"]) not in stored_defines
+        ],
+        "parent_rels": [{"child": a, "parent": b} for t, a, b in sorted(added_edges) if t == "PARENT_SECTION"],
+        "next_rels": [{"a": a, "b": b} for t, a, b in sorted(added_edges) if t == "NEXT_SECTION"],
+        "xrefs": [{"source": a, "target": b} for t, a, b in sorted(added_edges) if t == "REFERS_TO"],
+        "removed_sections": removed_sections,
+        "removed_definitions": sorted(stored_def_ids - wanted_def_ids),
+        # Text nodes that may lose their last reference when removed sections are detach-deleted
+        "removed_text_hashes": sorted({stored_text[sid] for sid in removed_sections if stored_text.get(sid)}),
+        # edges touching removed sections go away with DETACH DELETE
+        "removed_edges": [
+            {"type": t, "a": a, "b": b} for t, a, b in sorted(stored_edges - wanted_edges)
+            if a in wanted_ids and b in wanted_ids
+        ],
+        "removed_defines": [
+            {"a": a, "b": b} for a, b in sorted(stored_defines - wanted_defines)
+            if a in wanted_ids and b in wanted_def_ids
+        ],
+    }
+
+
+def replaced_doc_ids(plan: Dict[str, Any]) -> List[str]:
+    """Versions a delta plan adopts or prunes: their cached searches go stale too."""
+    return [d for d in (plan["previous_doc_id"], *plan["superseded_doc_ids"]) if d]
+
+
+def delta_summary(plan: Dict[str, Any], total_sections: int) -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "doc_id": plan["doc"]["doc_id"],
+        "mode": "delta",
+        "sections_written": len(plan["sections"]),
+        "sections_unchanged": total_sections - len(plan["sections"]),
+        "sections_removed": len(plan["removed_sections"]),
+        "sections_renamed": len(plan["renamed_sections"]),
+        "previous_doc_id": plan["previous_doc_id"],
+        "superseded_doc_ids": plan["superseded_doc_ids"],
+        "definitions_written": len(plan["definitions"]),
+        "definitions_removed": len(plan["removed_definitions"]),
+        "edges_added": len(plan["parent_rels"]) + len(plan["next_rels"]) + len(plan["xrefs"]),
+        "edges_removed": len(plan["removed_edges"]) + len(plan["removed_defines"]),
+    }
+
+
+def check_import_mode(mode: str) -> None:
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode {mode!r}; expected one of {IMPORT_MODES}.")
+
 
 class KGClient:
     def __init__(self):
         if not settings.neo4j_uri:
             raise RuntimeError("Neo4j is not configured.")
+        # imported here so importing this module (queries, params) doesn't load the driver
+        from neo4j import GraphDatabase, basic_auth
+
         self.database = settings.neo4j_database
         self._driver = GraphDatabase.driver(
             settings.neo4j_uri,
@@ -20,123 +577,110 @@ class KGClient:
         self._driver.close()
 
     def ensure_constraints(self):
-        stmts = [
-            "CREATE CONSTRAINT doc_id_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.doc_id IS UNIQUE",
-            "CREATE CONSTRAINT sec_id_unique IF NOT EXISTS FOR (s:Section) REQUIRE s.section_id IS UNIQUE",
-            "CREATE CONSTRAINT def_id_unique IF NOT EXISTS FOR (d:Definition) REQUIRE d.def_id IS UNIQUE",
-        ]
         with self._driver.session(database=self.database) as s:
-            for q in stmts:
+            for q in CONSTRAINT_STATEMENTS:
                 s.run(q).consume()
 
-    # NEW: full-text index for search
     def ensure_fulltext_index(self):
-        q = """
-        CREATE FULLTEXT INDEX sectionTextIdx IF NOT EXISTS
-        FOR (s:Section) ON EACH [s.text, s.title, s.label]
-        """
         with self._driver.session(database=self.database) as s:
-            s.run(q).consume()
-
-    def import_store(self, store: Dict[str, Any]) -> Dict[str, Any]:
-        doc = store.get("document") or {}
-        sections = store.get("sections") or []
-        definitions = store.get("definitions") or []
-        xrefs = store.get("cross_references") or []
-        topo = (store.get("topology") or {})
-        children_by_parent = topo.get("children_by_parent") or {}
-        # Build NEXT relationships by sequence per parent
-        next_rels: List[Dict[str, str]] = []
-        by_parent_to_secs = {k: v for k, v in children_by_parent.items()}
-        for _parent, sec_ids in by_parent_to_secs.items():
-            for a, b in zip(sec_ids, sec_ids[1:]):
-                next_rels.append({"a": a, "b": b})
-
-        params = {
-            "doc": {
-                "doc_id": doc.get("doc_id"),
-                "props": {k: v for k, v in doc.items() if k != "doc_id"},
-            },
-            "sections": [
-                {"section_id": s["section_id"], "props": {
-                    "element_id": s.get("element_id"),
-                    "title": s.get("title"),
-                    "label": s.get("label"),
-                    "level": s.get("level"),
-                    "text": s.get("text"),
-                    "page_start": s.get("page_start"),
-                    "page_end": s.get("page_end"),
-                    "element_type": s.get("element_type"),
-                    "text_length": s.get("text_length"),
-                    "missing_text": s.get("missing_text"),
-                }} for s in sections
-            ],
-            "parent_rels": [
-                {"child": cid, "parent": pid}
-                for pid, child_list in children_by_parent.items()
-                if isinstance(child_list, list) and pid is not None
-                for cid in child_list
-            ],
-            "next_rels": next_rels,
-            "definitions": [
-                {"def_id": d["def_id"], "term": d.get("term"), "text": d.get("text"), "section_id": d.get("section_id")}
-                for d in definitions
-            ],
-            "xrefs": [
-                {"source": x.get("source_section_id"), "target": x.get("resolved_section_id")}
-                for x in xrefs if x.get("resolved_section_id")
-            ],
-        }
-
-        query = """
-        MERGE (d:Document {doc_id: $doc.doc_id})
-        SET d += $doc.props
-        WITH d, $sections AS sections, $parent_rels AS parent_rels, $next_rels AS next_rels,
-             $definitions AS definitions, $xrefs AS xrefs
-
-        // Sections + HAS_SECTION (batched)
-        CALL {
-          WITH d, sections
-          UNWIND sections AS s
-          MERGE (sec:Section {section_id: s.section_id})
-          SET sec += s.props
-          MERGE (d)-[:HAS_SECTION]->(sec)
-          RETURN count(*) AS _
-        }
-
-        WITH d, parent_rels, next_rels, definitions, xrefs
-
-        // Parent relationships
-        UNWIND parent_rels AS relP
-        MATCH (child:Section {section_id: relP.child}), (parent:Section {section_id: relP.parent})
-        MERGE (child)-[:PARENT_SECTION]->(parent)
-
-        WITH d, next_rels, definitions, xrefs
-
-        // NEXT relationships
-        UNWIND next_rels AS relN
-        MATCH (a:Section {section_id: relN.a}), (b:Section {section_id: relN.b})
-        MERGE (a)-[:NEXT_SECTION]->(b)
-
-        WITH d, definitions, xrefs
-
-        // Definitions (nodes) + DEFINES
-        UNWIND definitions AS def
-        MERGE (df:Definition {def_id: def.def_id})
-        SET df.term = def.term, df.text = def.text
-        WITH d, xrefs, def
-        MATCH (sec:Section {section_id: def.section_id})
-        MERGE (sec)-[:DEFINES]->(:Definition {def_id: def.def_id})
-
-        WITH d, xrefs
-
-        // Cross-refs (resolved only)
-        UNWIND xrefs AS xr
-        MATCH (s:Section {section_id: xr.source}), (t:Section {section_id: xr.target})
-        MERGE (s)-[:REFERS_TO]->(t)
-        RETURN d.doc_id AS doc_id
+            s.run(FULLTEXT_INDEX_QUERY).consume()
+
+    def import_store(self, store: Dict[str, Any], mode: str = "full",
+                     streamed: Optional[Set[str]] = None, doc_key: Optional[str] = None,
+                     prune_versions: bool = False) -> Dict[str, Any]:
         """
+        mode="full": MERGE/SET every node and relationship (original behaviour).
+        mode="delta": fetch stored section hashes for the doc_id in one query and
+          write only new/changed sections; detach-delete what no longer exists.
+          An edited document gets a new doc_id: when the caller passes a doc_key and
+          nothing is stored under the doc_id, the newest Document with that doc_key is
+          adopted and renamed. With prune_versions, other versions with the key are deleted.
+        streamed (delta only): section ids already written by write_sections in this run.
+        """
+        check_import_mode(mode)
+        params = build_import_params(store, doc_key)
+        try:
+            if mode == "delta":
+                return self._import_delta(params, streamed, prune_versions)
+            with self._driver.session(database=self.database) as s:
+                s.run(IMPORT_QUERY, params).consume()
+                s.execute_write(self._link_texts, params["sections"], [])
+            return {"status": "ok", "doc_id": params["doc"]["doc_id"]}
+        finally:
+            # after the write, even a failed one (IMPORT_QUERY may have committed)
+            invalidate_doc(params["doc"]["doc_id"])
+
+    def import_stores(self, stores: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Full import of a batch of stores as one transaction: each statement UNWINDs the whole batch."""
+        params = batch_import_params(stores)
+
+        def _write(tx):
+            for q in IMPORT_BATCH_STATEMENTS:
+                tx.run(q, params).consume()
+            self._link_texts(tx, params["sections"], [])
+
+        try:
+            with self._driver.session(database=self.database) as s:
+                s.execute_write(_write)
+        finally:
+            invalidate_doc(*(d["doc_id"] for d in params["docs"]))
+        return {"status": "ok", "doc_ids": [d["doc_id"] for d in params["docs"]], "sections": len(params["sections"])}
+
+    @staticmethod
+    def _link_texts(tx, sections: List[Dict[str, Any]], gc_candidates: List[str]) -> None:
+        detached = tx.run(TEXT_UNLINK_QUERY, sections=sections).single()["detached"]
+        tx.run(TEXT_LINK_QUERY, sections=sections).consume()
+        tx.run(TEXT_GC_QUERY, text_hashes=sorted(set(detached) | set(gc_candidates))).consume()
+
+    def _import_delta(self, params: Dict[str, Any], streamed: Optional[Set[str]] = None,
+                      prune_versions: bool = False) -> Dict[str, Any]:
+        def _apply(tx, plan):
+            pruned = tx.run(PRUNE_DOCUMENTS_QUERY, plan).single()["text_hashes"]
+            for q in DELTA_APPLY_STATEMENTS:
+                tx.run(q, plan).consume()
+            self._link_texts(tx, plan["sections"], plan["removed_text_hashes"] + pruned)
+
+        doc_id, doc_key = params["doc"]["doc_id"], params["doc"]["props"].get("doc_key")
+        with self._driver.session(database=self.database) as s:
+            rows = [r.data() for r in s.run(DELTA_FETCH_QUERY, doc_id=doc_id)]
+            versions = [r["doc_id"] for r in s.run(PREVIOUS_VERSIONS_QUERY, doc_id=doc_id, doc_key=doc_key)] if doc_key else []
+            previous = None
+            if versions and not rows:
+                previous = [r.data() for r in s.run(DELTA_FETCH_QUERY, doc_id=versions[0])]
+            plan = plan_delta(params, rows, versions[0] if versions else None, previous,
+                              versions if prune_versions else ())
+            if streamed:
+                plan = narrow_streamed(plan, streamed)
+            s.execute_write(_apply, plan)
+        invalidate_doc(*replaced_doc_ids(plan))
+        return delta_summary(plan, len(params["sections"]))
+
+    def write_sections(self, doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> int:
+        """Upsert one batch of store sections (no edges yet); finish with import_store(mode="delta", streamed=...)."""
+        params = section_batch_params(doc, sections)
+
+        def _write(tx):
+            tx.run(SECTION_BATCH_QUERY, params).consume()
+            self._link_texts(tx, params["sections"], [])
+
+        with self._driver.session(database=self.database) as s:
+            s.execute_write(_write)
+        return len(params["sections"])
+
+    def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        with self._driver.session(database=self.database) as s:
+            result = s.run(SEARCH_QUERY, q=q, doc_ids=doc_ids, skip=skip, limit=limit)
+            return [r.data() for r in result]
+
+    def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._driver.session(database=self.database) as s:
+            return [r.data() for r in s.run(SUBTREE_QUERY, section_id=section_id, max_depth=max_depth)]
+
+    def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        with self._driver.session(database=self.database) as s:
+            rows = [r.data() for r in s.run(TEXT_DOCUMENTS_QUERY, text_hash=text_hash)]
+        return text_usage(text_hash, rows)
 
+    def gc_texts(self) -> int:
         with self._driver.session(database=self.database) as s:
-            summary = s.run(query, params).consume()
-        return {"status": "ok", "doc_id": params["doc"]["doc_id"]}
+            return s.run(TEXT_GC_ALL_QUERY).single()["removed"]
@@ -0,0 +1,148 @@
+from typing import Any, Dict, List, Optional, Set
+from app.core.config import settings
+from app.services.search import invalidate_doc
+from app.services.kg import (
+    CONSTRAINT_STATEMENTS, FULLTEXT_INDEX_QUERY, IMPORT_QUERY, DELTA_FETCH_QUERY, DELTA_APPLY_STATEMENTS, SEARCH_QUERY,
+    SUBTREE_QUERY, TEXT_UNLINK_QUERY, TEXT_LINK_QUERY, TEXT_GC_QUERY, TEXT_GC_ALL_QUERY, TEXT_DOCUMENTS_QUERY,
+    SECTION_BATCH_QUERY, PREVIOUS_VERSIONS_QUERY, PRUNE_DOCUMENTS_QUERY, build_import_params, plan_delta, delta_summary, check_import_mode, text_usage,
+    section_batch_params, narrow_streamed, replaced_doc_ids,
+)
+
+
+class AsyncKGClient:
+    """
+    Async twin of KGClient, built on the Neo4j async driver.
+    Same surface (ensure_constraints / ensure_fulltext_index / import_store / close),
+    but every call is awaitable so graph writes don't stall the event loop.
+    """
+
+    def __init__(self):
+        if not settings.neo4j_uri:
+            raise RuntimeError("Neo4j is not configured.")
+        # imported here so routers can load without the driver until a KG call is made
+        from neo4j import AsyncGraphDatabase, basic_auth
+
+        self.database = settings.neo4j_database
+        self._driver = AsyncGraphDatabase.driver(
+            settings.neo4j_uri,
+            auth=basic_auth(settings.neo4j_user, settings.neo4j_password),
+            connection_timeout=30,
+            max_connection_lifetime=600,
+            connection_acquisition_timeout=60,
+            max_transaction_retry_time=60,
+        )
+
+    async def close(self):
+        await self._driver.close()
+
+    async def ensure_constraints(self):
+        async with self._driver.session(database=self.database) as s:
+            for q in CONSTRAINT_STATEMENTS:
+                result = await s.run(q)
+                await result.consume()
+
+    async def ensure_fulltext_index(self):
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(FULLTEXT_INDEX_QUERY)
+            await result.consume()
+
+    async def import_store(self, store: Dict[str, Any], mode: str = "full",
+                           streamed: Optional[Set[str]] = None, doc_key: Optional[str] = None,
+                           prune_versions: bool = False) -> Dict[str, Any]:
+        check_import_mode(mode)
+        params = build_import_params(store, doc_key)
+        try:
+            if mode == "delta":
+                return await self._import_delta(params, streamed, prune_versions)
+            async with self._driver.session(database=self.database) as s:
+                result = await s.run(IMPORT_QUERY, params)
+                await result.consume()
+                await s.execute_write(self._link_texts, params["sections"], [])
+            return {"status": "ok", "doc_id": params["doc"]["doc_id"]}
+        finally:
+            # after the write, even a failed one (IMPORT_QUERY may have committed)
+            invalidate_doc(params["doc"]["doc_id"])
+
+    @staticmethod
+    async def _link_texts(tx, sections: List[Dict[str, Any]], gc_candidates: List[str]) -> None:
+        result = await tx.run(TEXT_UNLINK_QUERY, sections=sections)
+        detached = (await result.single())["detached"]
+        result = await tx.run(TEXT_LINK_QUERY, sections=sections)
+        await result.consume()
+        result = await tx.run(TEXT_GC_QUERY, text_hashes=sorted(set(detached) | set(gc_candidates)))
+        await result.consume()
+
+    async def _import_delta(self, params: Dict[str, Any], streamed: Optional[Set[str]] = None,
+                            prune_versions: bool = False) -> Dict[str, Any]:
+        async def _apply(tx, plan):
+            result = await tx.run(PRUNE_DOCUMENTS_QUERY, plan)
+            pruned = (await result.single())["text_hashes"]
+            for q in DELTA_APPLY_STATEMENTS:
+                result = await tx.run(q, plan)
+                await result.consume()
+            await self._link_texts(tx, plan["sections"], plan["removed_text_hashes"] + pruned)
+
+        doc_id, doc_key = params["doc"]["doc_id"], params["doc"]["props"].get("doc_key")
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(DELTA_FETCH_QUERY, doc_id=doc_id)
+            rows = [r.data() async for r in result]
+            versions: List[str] = []
+            if doc_key:
+                result = await s.run(PREVIOUS_VERSIONS_QUERY, doc_id=doc_id, doc_key=doc_key)
+                versions = [r["doc_id"] async for r in result]
+            previous = None
+            if versions and not rows:
+                result = await s.run(DELTA_FETCH_QUERY, doc_id=versions[0])
+                previous = [r.data() async for r in result]
+            plan = plan_delta(params, rows, versions[0] if versions else None, previous,
+                              versions if prune_versions else ())
+            if streamed:
+                plan = narrow_streamed(plan, streamed)
+            await s.execute_write(_apply, plan)
+        invalidate_doc(*replaced_doc_ids(plan))
+        return delta_summary(plan, len(params["sections"]))
+
+    async def write_sections(self, doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> int:
+        params = section_batch_params(doc, sections)
+
+        async def _write(tx):
+            result = await tx.run(SECTION_BATCH_QUERY, params)
+            await result.consume()
+            await self._link_texts(tx, params["sections"], [])
+
+        async with self._driver.session(database=self.database) as s:
+            await s.execute_write(_write)
+        return len(params["sections"])
+
+    async def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(SEARCH_QUERY, q=q, doc_ids=doc_ids, skip=skip, limit=limit)
+            return [r.data() async for r in result]
+
+    async def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(SUBTREE_QUERY, section_id=section_id, max_depth=max_depth)
+            return [r.data() async for r in result]
+
+    async def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(TEXT_DOCUMENTS_QUERY, text_hash=text_hash)
+            rows = [r.data() async for r in result]
+        return text_usage(text_hash, rows)
+
+    async def gc_texts(self) -> int:
+        async with self._driver.session(database=self.database) as s:
+            result = await s.run(TEXT_GC_ALL_QUERY)
+            return (await result.single())["removed"]
+
+
+def get_async_kg_client():
+    """
+    Pick the async KG backend named by settings.kg_backend from registry.KG_BACKENDS:
+      "neo4j"  -> AsyncKGClient (default)
+      "memory" -> AsyncMemoryKGClient, a process-local stand-in graph for tests/dev
+      "sqlite" -> AsyncSQLiteKGClient, an embedded store at SQLITE_PATH
+    """
+    from app.services.registry import get_kg_backend
+
+    return get_kg_backend(settings.kg_backend)()
@@ -0,0 +1,301 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import re
+import threading
+
+from app.services.kg import (
+    build_import_params, plan_delta, delta_summary, check_import_mode, text_usage, section_batch_params, narrow_streamed,
+    replaced_doc_ids,
+)
+from app.services.search import invalidate_doc
+
+_QUERY_TERM_RE = re.compile(r"\w+")
+
+_SECTION_EDGE_TYPES = ("PARENT_SECTION", "NEXT_SECTION", "REFERS_TO")
+
+
+class MemoryGraph:
+    """
+    Process-local stand-in for the Neo4j graph.
+
+    Holds the same nodes (Document / Section / Definition / Text) and relationship types
+    (HAS_SECTION / PARENT_SECTION / NEXT_SECTION / DEFINES / REFERS_TO / HAS_TEXT) that
+    IMPORT_QUERY and the TEXT_* statements create, so routers and tools can run without
+    a graph server. text_refs holds each Text node's HAS_TEXT in-degree.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.nodes: Dict[str, Dict[str, Dict[str, Any]]] = {"Document": {}, "Section": {}, "Definition": {}, "Text": {}}
+        self.rels: Set[Tuple[str, str, str]] = set()  # (type, start_id, end_id)
+        self.text_refs: Dict[str, int] = {}
+        self.constraints: Set[str] = set()
+        self.indexes: Set[str] = set()
+
+    def _merge_node(self, label: str, node_id: str, props: Dict[str, Any]) -> None:
+        node = self.nodes[label].setdefault(node_id, {})
+        for k, v in props.items():
+            # mirror Cypher `SET n += map`: null removes the property
+            if v is None:
+                node.pop(k, None)
+            else:
+                node[k] = v
+
+    def import_params(self, params: Dict[str, Any]) -> None:
+        with self._lock:
+            doc_id = params["doc"]["doc_id"]
+            self._merge_node("Document", doc_id, params["doc"]["props"])
+            sections = self.nodes["Section"]
+            detached: Set[str] = set()
+            for s in params["sections"]:
+                sid = s["section_id"]
+                old_hash = sections.get(sid, {}).get("text_hash")
+                self._merge_node("Section", sid, s["props"])
+                self.rels.add(("HAS_SECTION", doc_id, sid))
+                new_hash = s["props"].get("text_hash")
+                if old_hash != new_hash:
+                    if old_hash and ("HAS_TEXT", sid, old_hash) in self.rels:
+                        self.rels.discard(("HAS_TEXT", sid, old_hash))
+                        self.text_refs[old_hash] -= 1
+                        detached.add(old_hash)
+                if new_hash and ("HAS_TEXT", sid, new_hash) not in self.rels:
+                    self.nodes["Text"].setdefault(new_hash, {"length": s["props"].get("text_length")})
+                    self.rels.add(("HAS_TEXT", sid, new_hash))
+                    self.text_refs[new_hash] = self.text_refs.get(new_hash, 0) + 1
+            self._gc_texts(detached)
+            for r in params["parent_rels"]:
+                if r["child"] in sections and r["parent"] in sections:
+                    self.rels.add(("PARENT_SECTION", r["child"], r["parent"]))
+            for r in params["next_rels"]:
+                if r["a"] in sections and r["b"] in sections:
+                    self.rels.add(("NEXT_SECTION", r["a"], r["b"]))
+            for d in params["definitions"]:
+                self._merge_node("Definition", d["def_id"], {"term": d["term"], "text": d["text"]})
+                if d["section_id"] in sections:
+                    self.rels.add(("DEFINES", d["section_id"], d["def_id"]))
+            for x in params["xrefs"]:
+                if x["source"] in sections and x["target"] in sections:
+                    self.rels.add(("REFERS_TO", x["source"], x["target"]))
+
+    def _gc_texts(self, candidates) -> int:
+        """TEXT_GC_QUERY: drop candidate Text nodes nothing links to any more. Caller holds the lock."""
+        removed = 0
+        for h in candidates:
+            if self.text_refs.get(h, 0) <= 0 and h in self.nodes["Text"]:
+                del self.nodes["Text"][h]
+                self.text_refs.pop(h, None)
+                removed += 1
+        return removed
+
+    def fetch_delta_rows(self, doc_id: str) -> List[Dict[str, Any]]:
+        """Same row shape as DELTA_FETCH_QUERY."""
+        with self._lock:
+            sec_ids = [b for t, a, b in self.rels if t == "HAS_SECTION" and a == doc_id]
+            rows = {}
+            for sid in sec_ids:
+                props = self.nodes["Section"].get(sid, {})
+                rows[sid] = {"section_id": sid, "element_id": props.get("element_id"), "sync_hash": props.get("sync_hash"),
+                             "text_hash": props.get("text_hash"), "edges": [], "def_ids": []}
+            for t, a, b in self.rels:
+                if a not in rows:
+                    continue
+                if t in _SECTION_EDGE_TYPES:
+                    rows[a]["edges"].append([t, b])
+                elif t == "DEFINES":
+                    rows[a]["def_ids"].append(b)
+            return list(rows.values())
+
+    def document_versions(self, doc_key: str, doc_id: str) -> List[str]:
+        """PREVIOUS_VERSIONS_QUERY: other Documents with this doc_key, newest first."""
+        with self._lock:
+            docs = [(props.get("extracted_at") or "", did) for did, props in self.nodes["Document"].items()
+                    if did != doc_id and props.get("doc_key") == doc_key]
+        return [did for _at, did in sorted(docs, reverse=True)]
+
+    def _prune_documents(self, doc_ids: List[str]) -> None:
+        """PRUNE_DOCUMENTS_QUERY. Caller holds the lock."""
+        if not doc_ids:
+            return
+        docs = set(doc_ids)
+        secs = {b for t, a, b in self.rels if t == "HAS_SECTION" and a in docs}
+        defs = {b for t, a, b in self.rels if t == "DEFINES" and a in secs}
+        texts = {b for t, a, b in self.rels if t == "HAS_TEXT" and a in secs}
+        for t, a, b in self.rels:
+            if t == "HAS_TEXT" and a in secs:
+                self.text_refs[b] -= 1
+        for label, ids in (("Document", docs), ("Section", secs), ("Definition", defs)):
+            for node_id in ids:
+                self.nodes[label].pop(node_id, None)
+        gone = docs | secs | defs
+        self.rels = {r for r in self.rels if r[1] not in gone and r[2] not in gone}
+        self._gc_texts(texts)
+
+    def _adopt(self, plan: Dict[str, Any]) -> None:
+        """The first two DELTA_APPLY_STATEMENTS: rename the previous version in place. Caller holds the lock."""
+        old_doc = plan["previous_doc_id"]
+        if not old_doc or old_doc not in self.nodes["Document"]:
+            return
+        new_doc = plan["doc"]["doc_id"]
+        ids = {old_doc: new_doc}
+        self.nodes["Document"][new_doc] = self.nodes["Document"].pop(old_doc)
+        for r in plan["renamed_sections"]:
+            node = self.nodes["Section"].pop(r["old"], None)
+            if node is None:
+                continue
+            ids[r["old"]] = r["new"]
+            self.nodes["Section"][r["new"]] = node
+            self._merge_node("Section", r["new"], {"ancestor_ids": r["ancestor_ids"]})
+        self.rels = {(t, ids.get(a, a), ids.get(b, b)) for t, a, b in self.rels}
+
+    def apply_delta(self, plan: Dict[str, Any]) -> None:
+        """Python rendition of PRUNE_DOCUMENTS_QUERY + DELTA_APPLY_STATEMENTS."""
+        with self._lock:
+            self._prune_documents(plan["superseded_doc_ids"])
+            self._adopt(plan)
+            gone = set(plan["removed_sections"]) | set(plan["removed_definitions"])
+            for sid in plan["removed_sections"]:
+                h = self.nodes["Section"].pop(sid, {}).get("text_hash")
+                if h and ("HAS_TEXT", sid, h) in self.rels:
+                    self.text_refs[h] -= 1
+            for did in plan["removed_definitions"]:
+                self.nodes["Definition"].pop(did, None)
+            if gone:
+                # DETACH DELETE
+                self.rels = {r for r in self.rels if r[1] not in gone and r[2] not in gone}
+            for e in plan["removed_edges"]:
+                self.rels.discard((e["type"], e["a"], e["b"]))
+            for e in plan["removed_defines"]:
+                self.rels.discard(("DEFINES", e["a"], e["b"]))
+            self._gc_texts(plan["removed_text_hashes"])
+        self.import_params(plan)
+
+    def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        """Crude stand-in for sectionTextIdx: score = term hits across text/title/label."""
+        terms = [t.lower() for t in _QUERY_TERM_RE.findall(q)]
+        if not terms:
+            return []
+        wanted = set(doc_ids) if doc_ids else None
+        with self._lock:
+            owner = {b: a for t, a, b in self.rels if t == "HAS_SECTION"}
+            rows = []
+            for sid, props in self.nodes["Section"].items():
+                doc_id = owner.get(sid)
+                if doc_id is None or (wanted is not None and doc_id not in wanted):
+                    continue
+                hay = " ".join(str(props.get(k) or "") for k in ("text", "title", "label")).lower()
+                score = sum(hay.count(t) for t in terms)
+                if score:
+                    rows.append({"doc_id": doc_id, "section_id": sid, "label": props.get("label"),
+                                 "title": props.get("title"), "text": props.get("text"),
+                                 "page_start": props.get("page_start"), "score": float(score)})
+        rows.sort(key=lambda r: (-r["score"], r["section_id"]))
+        return rows[skip: skip + limit]
+
+    def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """SUBTREE_QUERY: sections of the same document inside the root's tree_pre/tree_post range."""
+        with self._lock:
+            owner = {b: a for t, a, b in self.rels if t == "HAS_SECTION"}
+            root = self.nodes["Section"].get(section_id)
+            doc_id = owner.get(section_id)
+            if root is None or doc_id is None or root.get("tree_pre") is None:
+                return []
+            lo, hi, depth = root["tree_pre"], root["tree_post"], root.get("tree_depth") or 0
+            rows = []
+            for sid, props in self.nodes["Section"].items():
+                if owner.get(sid) != doc_id or props.get("tree_pre") is None:
+                    continue
+                if not (lo <= props["tree_pre"] and props["tree_post"] <= hi):
+                    continue
+                if max_depth is not None and (props.get("tree_depth") or 0) > depth + max_depth:
+                    continue
+                rows.append({"doc_id": doc_id, "section_id": sid, "label": props.get("label"),
+                             "title": props.get("title"), "text": props.get("text"),
+                             "page_start": props.get("page_start"), "tree_pre": props["tree_pre"],
+                             "tree_post": props["tree_post"], "tree_depth": props.get("tree_depth"),
+                             "ancestor_ids": props.get("ancestor_ids")})
+        rows.sort(key=lambda r: r["tree_pre"])
+        return rows
+
+    def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        with self._lock:
+            owner = {b: a for t, a, b in self.rels if t == "HAS_SECTION"}
+            by_doc: Dict[str, List[str]] = {}
+            for t, a, b in self.rels:
+                if t == "HAS_TEXT" and b == text_hash and a in owner:
+                    by_doc.setdefault(owner[a], []).append(a)
+        rows = [{"doc_id": d, "section_ids": sids} for d, sids in sorted(by_doc.items())]
+        return text_usage(text_hash, rows)
+
+    def gc_texts(self) -> int:
+        with self._lock:
+            return self._gc_texts(list(self.nodes["Text"]))
+
+    def counts(self) -> Dict[str, int]:
+        out = {label: len(nodes) for label, nodes in self.nodes.items()}
+        out["relationships"] = len(self.rels)
+        return out
+
+
+GRAPH = MemoryGraph()
+
+
+class AsyncMemoryKGClient:
+    """Async KG client surface backed by the module-level MemoryGraph."""
+
+    def __init__(self, graph: MemoryGraph = GRAPH):
+        self.graph = graph
+
+    async def close(self):
+        pass
+
+    async def ensure_constraints(self):
+        self.graph.constraints.update({"doc_id_unique", "sec_id_unique", "def_id_unique", "text_hash_unique"})
+
+    async def ensure_fulltext_index(self):
+        self.graph.indexes.add("sectionTextIdx")
+
+    async def import_store(self, store: Dict[str, Any], mode: str = "full",
+                           streamed: Optional[Set[str]] = None, doc_key: Optional[str] = None,
+                           prune_versions: bool = False) -> Dict[str, Any]:
+        check_import_mode(mode)
+        params = build_import_params(store, doc_key)
+        try:
+            return self._import(params, mode, streamed, prune_versions)
+        finally:
+            invalidate_doc(params["doc"]["doc_id"])
+
+    def _import(self, params: Dict[str, Any], mode: str, streamed: Optional[Set[str]],
+                prune_versions: bool = False) -> Dict[str, Any]:
+        if mode == "delta":
+            doc_id, doc_key = params["doc"]["doc_id"], params["doc"]["props"].get("doc_key")
+            rows = self.graph.fetch_delta_rows(doc_id)
+            versions = self.graph.document_versions(doc_key, doc_id) if doc_key else []
+            previous = self.graph.fetch_delta_rows(versions[0]) if versions and not rows else None
+            plan = plan_delta(params, rows, versions[0] if versions else None, previous,
+                              versions if prune_versions else ())
+            if streamed:
+                plan = narrow_streamed(plan, streamed)
+            self.graph.apply_delta(plan)
+            invalidate_doc(*replaced_doc_ids(plan))
+            return delta_summary(plan, len(params["sections"]))
+        self.graph.import_params(params)
+        return {"status": "ok", "doc_id": params["doc"]["doc_id"]}
+
+    async def write_sections(self, doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> int:
+        params = section_batch_params(doc, sections)
+        self.graph.import_params(params)
+        return len(params["sections"])
+
+    async def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        return self.graph.search_sections(q, doc_ids, skip, limit)
+
+    async def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.graph.subtree(section_id, max_depth)
+
+    async def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        return self.graph.text_documents(text_hash)
+
+    async def gc_texts(self) -> int:
+        return self.graph.gc_texts()
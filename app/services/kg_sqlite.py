@@ -0,0 +1,428 @@
+# app/services/kg_sqlite.py
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from app.core.config import settings
+from app.services.kg import adopt_rows, build_import_params, check_import_mode, section_batch_params, text_usage
+from app.utils.ids import urn
+from app.services.search import invalidate_doc
+
+_QUERY_TERM_RE = re.compile(r"\w+")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id          TEXT PRIMARY KEY,
+    filename        TEXT,
+    title           TEXT,
+    hash            TEXT,
+    extracted_with  TEXT,
+    extracted_at    TEXT,
+    version         INTEGER,
+    props           TEXT            -- every header field, as JSON
+);
+
+CREATE TABLE IF NOT EXISTS sections (
+    rowid             INTEGER PRIMARY KEY,
+    section_id        TEXT NOT NULL UNIQUE,
+    doc_id            TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    element_id        TEXT,
+    parent_section_id TEXT,
+    sequence          INTEGER,
+    label             TEXT,
+    title             TEXT,
+    level             INTEGER,
+    text              TEXT,
+    page_start        INTEGER,
+    page_end          INTEGER,
+    element_type      TEXT,
+    text_length       INTEGER,
+    missing_text      INTEGER,
+    text_hash         TEXT,
+    sync_hash         TEXT,
+    tree_pre          INTEGER,
+    tree_post         INTEGER,
+    tree_depth        INTEGER,
+    ancestor_ids      TEXT            -- JSON list
+);
+CREATE INDEX IF NOT EXISTS sections_doc_seq ON sections(doc_id, sequence);
+CREATE INDEX IF NOT EXISTS sections_doc_pre ON sections(doc_id, tree_pre);
+CREATE INDEX IF NOT EXISTS sections_parent ON sections(parent_section_id);
+CREATE INDEX IF NOT EXISTS sections_label ON sections(label COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS sections_text_hash ON sections(text_hash);
+
+CREATE TABLE IF NOT EXISTS definitions (
+    def_id      TEXT PRIMARY KEY,
+    doc_id      TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    section_id  TEXT,
+    term        TEXT,
+    text        TEXT
+);
+CREATE INDEX IF NOT EXISTS definitions_term ON definitions(term COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS definitions_doc ON definitions(doc_id);
+
+CREATE TABLE IF NOT EXISTS cross_refs (
+    xref_id             TEXT PRIMARY KEY,
+    doc_id              TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    source_section_id   TEXT,
+    target_label        TEXT,
+    "offset"            INTEGER,
+    resolved_section_id TEXT
+);
+CREATE INDEX IF NOT EXISTS cross_refs_source ON cross_refs(source_section_id);
+CREATE INDEX IF NOT EXISTS cross_refs_target ON cross_refs(resolved_section_id);
+CREATE INDEX IF NOT EXISTS cross_refs_doc ON cross_refs(doc_id);
+
+-- external-content FTS5 index over sections, kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    text, title, label, content='sections', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts(rowid, text, title, label) VALUES (new.rowid, new.text, new.title, new.label);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts(sections_fts, rowid, text, title, label) VALUES ('delete', old.rowid, old.text, old.title, old.label);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_au AFTER UPDATE OF text, title, label ON sections BEGIN
+    INSERT INTO sections_fts(sections_fts, rowid, text, title, label) VALUES ('delete', old.rowid, old.text, old.title, old.label);
+    INSERT INTO sections_fts(rowid, text, title, label) VALUES (new.rowid, new.text, new.title, new.label);
+END;
+"""
+
+_SECTION_COLUMNS = [
+    "section_id", "doc_id", "element_id", "parent_section_id", "sequence", "label", "title", "level", "text",
+    "page_start", "page_end", "element_type", "text_length", "missing_text", "text_hash", "sync_hash",
+    "tree_pre", "tree_post", "tree_depth", "ancestor_ids",
+]
+UPSERT_SECTION_SQL = (
+    f"INSERT INTO sections ({', '.join(_SECTION_COLUMNS)}) VALUES ({', '.join('?' * len(_SECTION_COLUMNS))}) "
+    f"ON CONFLICT(section_id) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in _SECTION_COLUMNS if c != "section_id")
+)
+
+# streamed sections only lack what needs the whole document (see kg.TREE_PROPS)
+UPDATE_TREE_SQL = """
+UPDATE sections SET parent_section_id = ?, sequence = ?, sync_hash = ?, tree_pre = ?, tree_post = ?,
+                    tree_depth = ?, ancestor_ids = ?
+WHERE section_id = ?
+"""
+
+PREVIOUS_VERSIONS_SQL = """
+SELECT doc_id FROM documents
+WHERE json_extract(props, '$.doc_key') = ? AND doc_id <> ?
+ORDER BY extracted_at DESC
+"""
+
+SEARCH_SQL = """
+SELECT s.doc_id, s.section_id, s.label, s.title, s.text, s.page_start, -bm25(sections_fts) AS score
+FROM sections_fts JOIN sections s ON s.rowid = sections_fts.rowid
+WHERE sections_fts MATCH ? {doc_filter}
+ORDER BY bm25(sections_fts), s.section_id
+LIMIT ? OFFSET ?
+"""
+
+SUBTREE_SQL = """
+SELECT s.doc_id, s.section_id, s.label, s.title, s.text, s.page_start,
+       s.tree_pre, s.tree_post, s.tree_depth, s.ancestor_ids
+FROM sections r JOIN sections s ON s.doc_id = r.doc_id
+WHERE r.section_id = ? AND s.tree_pre >= r.tree_pre AND s.tree_post <= r.tree_post
+  AND (? IS NULL OR s.tree_depth <= r.tree_depth + ?)
+ORDER BY s.tree_pre
+"""
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def to_fts_query(q: str) -> Optional[str]:
+    """
+    Lucene-style input (escaped or raw) -> FTS5 MATCH expression: every word as a
+    quoted term, OR-ed like Lucene's default operator and ranked by bm25.
+    """
+    terms = _QUERY_TERM_RE.findall(q)
+    return " OR ".join(f'"{t}"' for t in terms) if terms else None
+
+
+def _ancestors_json(props: Dict[str, Any]) -> Optional[str]:
+    return json.dumps(props["ancestor_ids"]) if props.get("ancestor_ids") is not None else None
+
+
+def _in_clause(column: str, values: Optional[List[str]]) -> str:
+    return f"AND {column} IN ({', '.join('?' * len(values))})" if values else ""
+
+
+class SQLiteStore:
+    """
+    Embedded, normalized store: documents / sections / definitions / cross_refs plus an
+    FTS5 index over section text/title/label. WAL mode, so readers don't block the writer.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.sqlite_path
+        if self.path != ":memory:" and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._lock = threading.Lock()
+        with _init_lock:
+            if self.path == ":memory:" or self.path not in _initialized:
+                self.conn.executescript(SCHEMA_SQL)
+                _initialized.add(self.path)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------- ingestion ----------
+
+    def _upsert_document(self, doc: Dict[str, Any]) -> None:
+        props = doc["props"]
+        self.conn.execute(
+            "INSERT INTO documents (doc_id, filename, title, hash, extracted_with, extracted_at, version, props) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(doc_id) DO UPDATE SET filename = excluded.filename, "
+            "title = excluded.title, hash = excluded.hash, extracted_with = excluded.extracted_with, "
+            "extracted_at = excluded.extracted_at, version = excluded.version, props = excluded.props",
+            (doc["doc_id"], props.get("filename"), props.get("title"), props.get("hash"), props.get("extracted_with"),
+             props.get("extracted_at"), props.get("version"), json.dumps(props, default=str)),
+        )
+
+    @staticmethod
+    def _section_row(doc_id: str, s: Dict[str, Any], parent_id: Optional[str], seq: Optional[int]) -> Tuple:
+        p = s["props"]
+        return (s["section_id"], doc_id, p.get("element_id"), parent_id, seq,
+                p.get("label"), p.get("title"), p.get("level"), p.get("text"), p.get("page_start"),
+                p.get("page_end"), p.get("element_type"), p.get("text_length"),
+                None if p.get("missing_text") is None else int(p["missing_text"]), p.get("text_hash"),
+                p.get("sync_hash"), p.get("tree_pre"), p.get("tree_post"), p.get("tree_depth"),
+                _ancestors_json(p))
+
+    def write_sections(self, doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> int:
+        """Upsert one batch of store sections; finish with import_store(mode="delta", streamed=...)."""
+        params = section_batch_params(doc, sections)
+        doc_id = params["doc"]["doc_id"]
+        if not doc_id:
+            raise ValueError("store has no document.doc_id")
+        parents = {s["section_id"]: s.get("parent_element_id") for s in sections}
+        with self._lock, self.conn:
+            self._upsert_document(params["doc"])
+            self.conn.executemany(UPSERT_SECTION_SQL, [
+                self._section_row(doc_id, s, urn("sec", doc_id, parents[s["section_id"]])
+                                  if parents[s["section_id"]] else None, src.get("sequence"))
+                for s, src in zip(params["sections"], sections)
+            ])
+        return len(sections)
+
+    def _adopt(self, old_doc_id: str, doc_id: str, params: Dict[str, Any]) -> int:
+        """Move sections of a previous version that match by element_id onto the new ids (see kg.adopt_rows)."""
+        rows = [dict(r) for r in self.conn.execute(
+            "SELECT section_id, element_id, parent_section_id FROM sections WHERE doc_id = ?", (old_doc_id,))]
+        renamed, _ = adopt_rows(params, rows)
+        rename = {r["old"]: r["new"] for r in renamed}
+        parent = {r["section_id"]: r["parent_section_id"] for r in rows}
+        self.conn.executemany(
+            "UPDATE sections SET doc_id = ?, section_id = ?, parent_section_id = ?, ancestor_ids = ? WHERE section_id = ?",
+            [(doc_id, r["new"], rename.get(parent[r["old"]]), _ancestors_json(r), r["old"]) for r in renamed],
+        )
+        return len(renamed)
+
+    def import_store(self, store: Dict[str, Any], mode: str = "full",
+                     streamed: Optional[Set[str]] = None, doc_key: Optional[str] = None,
+                     prune_versions: bool = False) -> Dict[str, Any]:
+        """
+        mode="full": replace every row of the document.
+        mode="delta": upsert only sections whose sync_hash changed and delete the ones that
+          disappeared; definitions and cross-refs of the document are rewritten either way.
+          Sections in `streamed` (already written by write_sections) only get their tree columns.
+          Like the graph clients, a new doc_id with nothing stored adopts the newest version
+          with the caller's doc_key; with prune_versions every other version is deleted.
+        """
+        check_import_mode(mode)
+        params = build_import_params(store, doc_key)
+        doc_id = params["doc"]["doc_id"]
+        if not doc_id:
+            raise ValueError("store has no document.doc_id")
+        try:
+            return self._import(store, params, mode, streamed, prune_versions)
+        finally:
+            # after the commit, so a search racing the import can't re-cache the old rows
+            invalidate_doc(doc_id)
+
+    def _import(self, store: Dict[str, Any], params: Dict[str, Any], mode: str,
+                streamed: Optional[Set[str]], prune_versions: bool = False) -> Dict[str, Any]:
+        doc = params["doc"]
+        doc_id = doc["doc_id"]
+        # like PARENT_SECTION edges: only parents that are sections of this document
+        section_ids = {s["section_id"] for s in params["sections"]}
+        parent_of = {r["child"]: r["parent"] for r in params["parent_rels"] if r["parent"] in section_ids}
+        section_index = (store.get("topology") or {}).get("section_index") or {}
+        sequence = {sid: e.get("sequence") for sid, e in section_index.items()}
+
+        with self._lock, self.conn:
+            self._upsert_document(doc)
+            versions: List[str] = []
+            dropped: List[str] = []
+            adopted, renamed = None, 0
+            if mode == "delta" and doc["props"].get("doc_key"):
+                versions = [r[0] for r in self.conn.execute(PREVIOUS_VERSIONS_SQL, (doc["props"]["doc_key"], doc_id))]
+                has_rows = self.conn.execute("SELECT 1 FROM sections WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone()
+                if versions and not has_rows:
+                    adopted = versions[0]
+                    renamed = self._adopt(adopted, doc_id, params)
+                dropped = [v for v in versions if v == adopted or prune_versions]
+                # cascades to the sections, definitions and cross-refs left behind
+                self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(v,) for v in dropped])
+            # sync_hash covers the section's own props; parent and sequence are columns here, so compare them too
+            stored = {r[0]: tuple(r[1:]) for r in self.conn.execute(
+                "SELECT section_id, sync_hash, parent_section_id, sequence FROM sections WHERE doc_id = ?", (doc_id,))}
+            rows = [(s, parent_of.get(s["section_id"]), sequence.get(s["section_id"])) for s in params["sections"]]
+            tree_only: Set[str] = set()
+            if mode == "full":
+                changed = rows
+                removed = sorted(stored)
+                self.conn.execute("DELETE FROM sections WHERE doc_id = ?", (doc_id,))
+            else:
+                changed = [r for r in rows if stored.get(r[0]["section_id"]) != (r[0]["props"]["sync_hash"], r[1], r[2])]
+                removed = sorted(set(stored) - {s["section_id"] for s in params["sections"]})
+                self.conn.executemany("DELETE FROM sections WHERE section_id = ?", [(sid,) for sid in removed])
+                tree_only = set(streamed or ())
+                self.conn.executemany(UPDATE_TREE_SQL, [
+                    (parent_id, seq, p["sync_hash"], p.get("tree_pre"), p.get("tree_post"), p.get("tree_depth"),
+                     _ancestors_json(p), s["section_id"])
+                    for s, parent_id, seq in changed if s["section_id"] in tree_only for p in (s["props"],)
+                ])
+            self.conn.executemany(UPSERT_SECTION_SQL, [
+                self._section_row(doc_id, s, parent_id, seq)
+                for s, parent_id, seq in changed if s["section_id"] not in tree_only
+            ])
+
+            self.conn.execute("DELETE FROM definitions WHERE doc_id = ?", (doc_id,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO definitions (def_id, doc_id, section_id, term, text) VALUES (?, ?, ?, ?, ?)",
+                [(d["def_id"], doc_id, d["section_id"], d["term"], d["text"]) for d in params["definitions"]],
+            )
+            self.conn.execute("DELETE FROM cross_refs WHERE doc_id = ?", (doc_id,))
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO cross_refs (xref_id, doc_id, source_section_id, target_label, "offset", '
+                "resolved_section_id) VALUES (?, ?, ?, ?, ?, ?)",
+                [(x.get("xref_id"), doc_id, x.get("source_section_id"), x.get("target_label"), x.get("offset"),
+                  x.get("resolved_section_id")) for x in store.get("cross_references") or [] if x.get("xref_id")],
+            )
+
+        invalidate_doc(*dropped)
+        if mode == "full":
+            return {"status": "ok", "doc_id": doc_id}
+        return {
+            "status": "ok",
+            "doc_id": doc_id,
+            "mode": "delta",
+            "sections_written": len(changed),
+            "sections_unchanged": len(params["sections"]) - len(changed),
+            "sections_removed": len(removed),
+            "sections_renamed": renamed,
+            "previous_doc_id": adopted,
+            "superseded_doc_ids": [v for v in dropped if v != adopted],
+            "definitions_written": len(params["definitions"]),
+        }
+
+    # ---------- queries (same row shapes as the KG clients) ----------
+
+    def _rows(self, sql: str, args) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self.conn.execute(sql, args).fetchall()]
+
+    def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        match = to_fts_query(q)
+        if not match:
+            return []
+        sql = SEARCH_SQL.format(doc_filter=_in_clause("s.doc_id", doc_ids))
+        return self._rows(sql, [match, *(doc_ids or []), limit, skip])
+
+    def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._rows(SUBTREE_SQL, (section_id, max_depth, max_depth))
+        for r in rows:
+            r["ancestor_ids"] = json.loads(r["ancestor_ids"]) if r["ancestor_ids"] else None
+        return rows
+
+    def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        rows = self._rows(
+            "SELECT doc_id, json_group_array(section_id) AS section_ids FROM sections WHERE text_hash = ? "
+            "GROUP BY doc_id ORDER BY doc_id", (text_hash,))
+        return text_usage(text_hash, [{"doc_id": r["doc_id"], "section_ids": json.loads(r["section_ids"])} for r in rows])
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows("SELECT props FROM documents WHERE doc_id = ?", (doc_id,))
+        if not rows:
+            return None
+        counts = self._rows(
+            "SELECT (SELECT count(*) FROM sections WHERE doc_id = ?) AS sections, "
+            "(SELECT count(*) FROM definitions WHERE doc_id = ?) AS definitions, "
+            "(SELECT count(*) FROM cross_refs WHERE doc_id = ?) AS cross_references", (doc_id, doc_id, doc_id))[0]
+        return {"doc_id": doc_id, **json.loads(rows[0]["props"] or "{}"), "counts": counts}
+
+    def get_section(self, section_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows("SELECT * FROM sections WHERE section_id = ?", (section_id,))
+        if not rows:
+            return None
+        sec = rows[0]
+        sec.pop("rowid", None)
+        sec["ancestor_ids"] = json.loads(sec["ancestor_ids"]) if sec["ancestor_ids"] else None
+        sec["definitions"] = self._rows(
+            "SELECT def_id, term, text FROM definitions WHERE section_id = ? ORDER BY term", (section_id,))
+        sec["refers_to"] = self._rows(
+            'SELECT xref_id, target_label, "offset", resolved_section_id FROM cross_refs '
+            'WHERE source_section_id = ? ORDER BY "offset"', (section_id,))
+        sec["referenced_by"] = [r["source_section_id"] for r in self._rows(
+            "SELECT DISTINCT source_section_id FROM cross_refs WHERE resolved_section_id = ?", (section_id,))]
+        return sec
+
+    def sections_by_label(self, label: str, doc_ids: Optional[List[str]], limit: int) -> List[Dict[str, Any]]:
+        sql = ("SELECT doc_id, section_id, label, title, page_start, text_length FROM sections "
+               f"WHERE label = ? COLLATE NOCASE {_in_clause('doc_id', doc_ids)} ORDER BY doc_id, sequence LIMIT ?")
+        return self._rows(sql, [label, *(doc_ids or []), limit])
+
+    def definitions_by_term(self, term: str, doc_ids: Optional[List[str]], limit: int) -> List[Dict[str, Any]]:
+        sql = ("SELECT doc_id, def_id, section_id, term, text FROM definitions "
+               f"WHERE term = ? COLLATE NOCASE {_in_clause('doc_id', doc_ids)} ORDER BY doc_id LIMIT ?")
+        return self._rows(sql, [term, *(doc_ids or []), limit])
+
+
+class AsyncSQLiteKGClient:
+    """Async KG client surface over SQLiteStore; every call runs on a worker thread."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.store = SQLiteStore(path)
+
+    async def close(self):
+        await asyncio.to_thread(self.store.close)
+
+    async def ensure_constraints(self):
+        pass  # schema, keys and indexes are created on connect
+
+    async def ensure_fulltext_index(self):
+        pass  # sections_fts is part of the schema
+
+    async def import_store(self, store: Dict[str, Any], mode: str = "full",
+                           streamed: Optional[Set[str]] = None, doc_key: Optional[str] = None,
+                           prune_versions: bool = False) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.store.import_store, store, mode, streamed, doc_key, prune_versions)
+
+    async def write_sections(self, doc: Dict[str, Any], sections: List[Dict[str, Any]]) -> int:
+        return await asyncio.to_thread(self.store.write_sections, doc, sections)
+
+    async def search_sections(self, q: str, doc_ids: Optional[List[str]], skip: int, limit: int) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.search_sections, q, doc_ids, skip, limit)
+
+    async def subtree(self, section_id: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.subtree, section_id, max_depth)
+
+    async def text_documents(self, text_hash: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.store.text_documents, text_hash)
+
+    async def gc_texts(self) -> int:
+        return 0  # text is stored per section row; nothing to collect
@@ -0,0 +1,194 @@
+# app/services/page_cache.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import copy
+import hashlib
+import json
+import os
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.pdf_processor import _fitz
+from app.utils.ids import sha256_str
+
+# Bump whenever the page-local format changes, so entries written before are not reused
+PAGE_CACHE_VERSION = "2"
+
+# (doc, [1-based page numbers], filename) -> {page_number: [element, ...]}
+PageExtractor = Callable[[Any, List[int], str], Dict[int, List[Dict[str, Any]]]]
+
+
+def page_fingerprint(doc, page, _xref_digests: Optional[Dict[int, str]] = None) -> str:
+    """
+    Hash of what a page renders from: geometry, its content stream(s), and the
+    raw streams of the images and font objects it uses. Identical pages in two
+    revisions of a PDF hash the same even if other pages changed.
+    """
+    digests = _xref_digests if _xref_digests is not None else {}
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents() or b"")
+    xrefs = sorted({img[0] for img in page.get_images(full=True)} | {f[0] for f in page.get_fonts(full=True)})
+    for xref in xrefs:
+        if xref not in digests:
+            raw = doc.xref_stream_raw(xref) if doc.xref_is_stream(xref) else None
+            digests[xref] = hashlib.sha256(raw if raw is not None else doc.xref_object(xref).encode()).hexdigest()
+        h.update(digests[xref].encode())
+    return h.hexdigest()
+
+
+def _to_page_local(
+    elements: List[Dict[str, Any]],
+    page_number: Optional[int] = None,
+    located: Optional[Dict[str, Tuple[int, int]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Strip document-specific ids/page numbers; parent links inside the page become indexes.
+    A parent on another page (found in `located`: element_id -> (page, index) over the
+    whole extraction) is kept as a (page offset, index) reference.
+    """
+    index = {el.get("element_id"): i for i, el in enumerate(elements) if el.get("element_id")}
+    out = []
+    for el in elements:
+        el = copy.deepcopy(el)
+        el.pop("element_id", None)
+        md = el.setdefault("metadata", {})
+        md.pop("page_number", None)
+        parent = md.pop("parent_id", None)
+        if parent in index:
+            md["_parent_index"] = index[parent]
+        elif parent in (located or {}) and page_number is not None:
+            parent_page, parent_index = located[parent]
+            md["_parent_ref"] = [parent_page - page_number, parent_index]
+        out.append(el)
+    return out
+
+
+def _page_ids(page_hash: str, page_number: int, count: int) -> List[str]:
+    """Deterministic element ids derived from (page hash, page number, position)."""
+    return [sha256_str(f"{page_hash}:{page_number}:{i}")[:32] for i in range(count)]
+
+
+def _from_page_local(elements: List[Dict[str, Any]], page_number: int,
+                     ids_by_page: Dict[int, List[str]]) -> List[Dict[str, Any]]:
+    """Inverse of _to_page_local. Cross-page parents resolve against ids_by_page, or to None if that page is not there."""
+    ids = ids_by_page[page_number]
+    out = []
+    for i, el in enumerate(elements):
+        el = copy.deepcopy(el)
+        el["element_id"] = ids[i]
+        md = el.setdefault("metadata", {})
+        md["page_number"] = page_number
+        parent_index = md.pop("_parent_index", None)
+        parent_ref = md.pop("_parent_ref", None)
+        parent_id = ids[parent_index] if parent_index is not None else None
+        if parent_ref is not None:
+            target = ids_by_page.get(page_number + parent_ref[0]) or []
+            parent_id = target[parent_ref[1]] if 0 <= parent_ref[1] < len(target) else None
+        md["parent_id"] = parent_id
+        out.append(el)
+    return out
+
+
+class PageCache:
+    """
+    Page-granular element cache: in-process LRU in front of JSON files under
+    <directory>/v<PAGE_CACHE_VERSION>/<namespace>/<hash[:2]>/<hash>.json. Namespace separates
+    extractors/strategies.
+    """
+
+    def __init__(self, directory: Optional[str], memory_items: int = 256):
+        self.directory = directory
+        self.memory = TTLCache(maxsize=memory_items, ttl=0)
+
+    def _path(self, namespace: str, page_hash: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        safe_ns = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in namespace)
+        return os.path.join(self.directory, f"v{PAGE_CACHE_VERSION}", safe_ns, page_hash[:2], page_hash + ".json")
+
+    def get(self, namespace: str, page_hash: str) -> Optional[List[Dict[str, Any]]]:
+        key = (namespace, page_hash)
+        hit = self.memory.get(key)
+        if hit is not None:
+            return hit
+        path = self._path(namespace, page_hash)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    hit = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self.memory.set(key, hit)
+            return hit
+        return None
+
+    def put(self, namespace: str, page_hash: str, local_elements: List[Dict[str, Any]]) -> None:
+        self.memory.set((namespace, page_hash), local_elements)
+        path = self._path(namespace, page_hash)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(local_elements, f, ensure_ascii=False)
+            os.replace(tmp, path)
+
+
+PAGE_CACHE = PageCache(settings.page_cache_dir or None, settings.page_cache_memory_items)
+
+
+def page_cache_enabled() -> bool:
+    return bool(settings.page_cache_dir)
+
+
+def extract_pages_cached(
+    doc,
+    page_numbers: List[int],
+    filename: str,
+    namespace: str,
+    extract_pages: PageExtractor,
+    cache: PageCache = PAGE_CACHE,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Extract only pages whose fingerprint is not cached, in one extract_pages call,
+    and splice cached element lists back in. Every page - hit or miss - goes through
+    the same page-local normalization, so ids, page numbers and parent links (including
+    ones to another page) come out the same either way. A miss extracted next to hits
+    can only get cross-page parents among the pages extracted with it.
+    """
+    digests: Dict[int, str] = {}
+    hashes = {n: page_fingerprint(doc, doc[n - 1], digests) for n in page_numbers}
+    local: Dict[int, List[Dict[str, Any]]] = {}
+    misses: List[int] = []
+    for n in page_numbers:
+        hit = cache.get(namespace, hashes[n])
+        if hit is None:
+            misses.append(n)
+        else:
+            local[n] = hit
+
+    if misses:
+        fresh = extract_pages(doc, misses, filename)
+        located = {el["element_id"]: (n, i) for n in misses for i, el in enumerate(fresh.get(n, []))
+                   if el.get("element_id")}
+        for n in misses:
+            local[n] = _to_page_local(fresh.get(n, []), n, located)
+            cache.put(namespace, hashes[n], local[n])
+
+    ids_by_page = {n: _page_ids(hashes[n], n, len(local[n])) for n in page_numbers}
+    result = {n: _from_page_local(local[n], n, ids_by_page) for n in page_numbers}
+    stats = {"pages": len(page_numbers), "cache_hits": len(page_numbers) - len(misses), "extracted_pages": misses}
+    return result, stats
+
+
+def extract_unstructured_cached(contents: bytes, filename: str, strategy: str = "auto") -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Unstructured extraction that re-partitions only pages not seen before."""
+    from app.services.hybrid_extractor import extract_ocr_pages
+
+    fitz = _fitz()
+    doc = fitz.open(stream=contents, filetype="pdf")
+    page_numbers = list(range(1, len(doc) + 1))
+    by_page, stats = extract_pages_cached(
+        doc, page_numbers, filename, f"unstructured:{strategy}",
+        lambda d, pages, fn: extract_ocr_pages(d, pages, fn, strategy=strategy),
+    )
+    return [el for n in page_numbers for el in by_page[n]], stats
@@ -1,22 +1,29 @@
 # app/services/pdf_processor.py
-from typing import List, Dict
+from typing import List, Dict, Optional
+import asyncio
 import io
 
-# Try to import PyMuPDF at module load; raise a clear error if missing
-try:
-    import fitz  # PyMuPDF
-except ImportError as e:
-    raise RuntimeError(
-        "PyMuPDF is required for process_with_pymupdf(). "
-        "Install with: pip install PyMuPDF"
-    ) from e
 
+def _fitz():
+    """
+    Import PyMuPDF on first use (keeps it out of app startup); raise a clear error if missing.
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError as e:
+        raise RuntimeError(
+            "PyMuPDF is required for process_with_pymupdf(). "
+            "Install with: pip install PyMuPDF"
+        ) from e
+    return fitz
 
-async def process_with_pymupdf(contents: bytes) -> List[Dict]:
+
+def extract_pymupdf_pages(contents: bytes, filename: Optional[str] = None) -> List[Dict]:
     """
-    Extract plain text per page using PyMuPDF.
+    Extract plain text per page using PyMuPDF (blocking).
     Returns: [{'page_number': int, 'text': str}, ...]
     """
+    fitz = _fitz()
     pdf_document = fitz.open(stream=contents, filetype="pdf")
     pages_content: List[Dict] = []
     for page_num in range(len(pdf_document)):
@@ -28,12 +35,19 @@ async def process_with_pymupdf(contents: bytes) -> List[Dict]:
     return pages_content
 
 
-async def process_with_unstructured(contents: bytes, filename: str) -> List[Dict]:
+def extract_unstructured_elements(contents: bytes, filename: str) -> List[Dict]:
     """
-    Extract structured 'elements' using Unstructured.
+    Extract structured 'elements' using Unstructured (blocking).
     This uses a lazy import so the app can start without unstructured/pdfminer installed.
+    With PAGE_CACHE_DIR set, only pages not seen before are partitioned (see page_cache).
     Returns: [element_dict, ...]
     """
+    from app.services import page_cache
+
+    if page_cache.page_cache_enabled():
+        elements, _stats = page_cache.extract_unstructured_cached(contents, filename)
+        return elements
+
     try:
         # Lazy import avoids crashing the whole app if extras aren't installed
         from unstructured.partition.pdf import partition_pdf
@@ -55,3 +69,13 @@ async def process_with_unstructured(contents: bytes, filename: str) -> List[Dict
     # partition_pdf(..., strategy="auto", multiprocessing=False)
     elements = partition_pdf(file=pdf_file_like, strategy="auto")
     return [el.to_dict() for el in elements]
+
+
+async def process_with_pymupdf(contents: bytes) -> List[Dict]:
+    """extract_pymupdf_pages on a worker thread, so the event loop keeps serving."""
+    return await asyncio.to_thread(extract_pymupdf_pages, contents)
+
+
+async def process_with_unstructured(contents: bytes, filename: str) -> List[Dict]:
+    """extract_unstructured_elements on a worker thread, so the event loop keeps serving."""
+    return await asyncio.to_thread(extract_unstructured_elements, contents, filename)
@@ -0,0 +1,168 @@
+# app/services/pipeline.py
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import threading
+import time
+
+from app.core.config import settings
+from app.services.build_cache import payload_hash
+from app.services.builder import StoreBuilder
+from app.services.loaders import load_any_shape
+from app.services.projection import dump_store
+
+_DONE = object()
+
+
+class _Stage:
+    """Busy time and item count for one pipeline stage (time blocked on a queue is not busy)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy = 0.0
+        self.items = 0
+
+    def report(self) -> Dict[str, Any]:
+        return {"busy_seconds": round(self.busy, 6), "items": self.items}
+
+
+async def ingest_pdf(
+    contents: bytes,
+    filename: str,
+    kg,
+    batch_size: Optional[int] = None,
+    queue_pages: Optional[int] = None,
+    index_text: bool = False,
+    snippet_chars: int = 280,
+) -> Dict[str, Any]:
+    """
+    PDF -> elements -> sections -> graph as three stages joined by bounded queues:
+
+      extract  worker thread, iter_hybrid_pages: one page of elements at a time
+      build    StoreBuilder.add_elements per page, on a worker thread
+      write    kg.write_sections per batch_size sections, as they arrive
+
+    A full queue blocks the stage feeding it, so a slow graph holds back extraction
+    instead of piling pages up in memory. Once the last page is built, finish() adds
+    cross-refs, definitions and the tree, and a delta import with streamed= writes
+    only what the batches could not (edges, definitions, tree fields) and prunes
+    sections left over from an earlier run of the same PDF.
+
+    The doc_id is derived from the PDF bytes: it has to be fixed before the element
+    list is complete, so it differs from the doc_id /structure gives the same elements.
+    """
+    from app.services.hybrid_extractor import iter_hybrid_pages
+
+    batch_size = max(1, batch_size or settings.pipeline_batch_size)
+    loop = asyncio.get_running_loop()
+    page_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_pages or settings.pipeline_queue_pages))
+    section_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_pages or settings.pipeline_queue_pages))
+    stop = threading.Event()
+    stages = {name: _Stage(name) for name in ("extract", "build", "write", "finish")}
+    pages: List[Dict[str, Any]] = []
+    written: Set[str] = set()
+    builder = StoreBuilder(
+        [],
+        filename=filename,
+        schema_version=settings.default_schema_version,
+        extracted_with="hybrid",
+        include_text_in_index=index_text,
+        snippet_chars=snippet_chars,
+        doc_hash=payload_hash(contents),
+    )
+    doc_header = builder._document_header().model_dump()
+    t0 = time.perf_counter()
+
+    def extract() -> None:
+        stage = stages["extract"]
+        try:
+            it = iter_hybrid_pages(contents, filename)
+            while not stop.is_set():
+                t = time.perf_counter()
+                item = next(it, _DONE)
+                stage.busy += time.perf_counter() - t
+                if item is not _DONE:
+                    stage.items += 1
+                # blocks while the build stage is behind
+                asyncio.run_coroutine_threadsafe(page_q.put(item), loop).result()
+                if item is _DONE:
+                    return
+        except BaseException as e:
+            asyncio.run_coroutine_threadsafe(page_q.put(e), loop).result()
+
+    async def build() -> None:
+        stage = stages["build"]
+        try:
+            while True:
+                item = await page_q.get()
+                if isinstance(item, BaseException):
+                    raise item
+                if item is _DONE:
+                    return
+                profile, elements = item
+                pages.append(profile)
+                t = time.perf_counter()
+                sections = await asyncio.to_thread(
+                    lambda els: [s.model_dump() for s in builder.add_elements(load_any_shape(els))], elements)
+                stage.busy += time.perf_counter() - t
+                stage.items += 1
+                if sections:
+                    await section_q.put(sections)
+        finally:
+            await section_q.put(_DONE)
+
+    async def write() -> None:
+        stage = stages["write"]
+        batch: List[Dict[str, Any]] = []
+        done = False
+        while not done:
+            item = await section_q.get()
+            if item is _DONE:
+                done = True
+            else:
+                batch.extend(item)
+            while batch and (done or len(batch) >= batch_size):
+                chunk, batch = batch[:batch_size], batch[batch_size:]
+                t = time.perf_counter()
+                await kg.write_sections(doc_header, chunk)
+                stage.busy += time.perf_counter() - t
+                stage.items += 1
+                written.update(s["section_id"] for s in chunk)
+
+    extractor = loop.run_in_executor(None, extract)
+    tasks = [asyncio.ensure_future(build()), asyncio.ensure_future(write())]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        # free a blocked producer so the extract thread can see `stop`
+        while not extractor.done():
+            while not page_q.empty():
+                page_q.get_nowait()
+            await asyncio.sleep(0.01)
+
+    t = time.perf_counter()
+    store = await asyncio.to_thread(lambda: dump_store(builder.finish()))
+    kg_result = await kg.import_store(store, mode="delta", streamed=written)
+    stages["finish"].busy = time.perf_counter() - t
+    stages["finish"].items = 1
+
+    wall = time.perf_counter() - t0
+    busy = {name: stage.report() for name, stage in stages.items()}
+    return {
+        "doc_id": builder.doc_id,
+        "store": store,
+        "kg_result": kg_result,
+        "pipeline": {
+            "pages": len(pages),
+            "ocr_pages": sum(1 for p in pages if p.get("route") == "ocr"),
+            "sections": len(store.get("sections") or []),
+            "sections_streamed": len(written),
+            "batch_size": batch_size,
+            "stages": busy,
+            "wall_seconds": round(wall, 6),
+            # > 1 means stages overlapped; the sum is what running them back to back would cost
+            "overlap": round(sum(s.busy for s in stages.values()) / wall, 3) if wall else None,
+        },
+    }
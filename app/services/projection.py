@@ -0,0 +1,70 @@
+from typing import Any, Dict, Optional
+
+from app.models.store import Store, Section, Definition, CrossRef, DocumentHeader
+
+# store key -> model of its records (list fields) / header; dict fields map to None
+_LIST_FIELDS = {"sections": Section, "definitions": Definition, "cross_references": CrossRef}
+_DICT_FIELDS = {"topology", "provenance"}
+
+
+def parse_fields(spec: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Turn a `fields=` projection like
+        "document.doc_id,sections.section_id,sections.text,topology.children_by_parent"
+    into a pydantic include-map. None/empty means "everything".
+    Top-level names select the whole part; dotted names select sub-fields.
+    """
+    if not spec or not spec.strip():
+        return None
+    include: Dict[str, Any] = {}
+    for raw in spec.split(","):
+        name = raw.strip()
+        if not name:
+            continue
+        top, _, sub = name.partition(".")
+        if top not in Store.model_fields:
+            raise ValueError(f"Unknown field {top!r}; expected one of {sorted(Store.model_fields)}")
+        if not sub:
+            include[top] = True
+            continue
+        if top in _LIST_FIELDS:
+            if sub not in _LIST_FIELDS[top].model_fields:
+                raise ValueError(f"Unknown field {name!r}")
+        elif top == "document":
+            if sub not in DocumentHeader.model_fields:
+                raise ValueError(f"Unknown field {name!r}")
+        elif top not in _DICT_FIELDS:
+            raise ValueError(f"{top!r} has no sub-fields")
+        if include.get(top) is True:
+            continue
+        include.setdefault(top, set()).add(sub)
+
+    # pydantic wants {"__all__": {...}} for per-item selection in lists
+    return {
+        k: ({"__all__": v} if k in _LIST_FIELDS and v is not True else v)
+        for k, v in include.items()
+    }
+
+
+def dump_store(store: Store, include: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """model_dump with the projection applied, so excluded parts are never materialized."""
+    return store.model_dump(exclude_none=False, include=include)
+
+
+def project_dict(store: Dict[str, Any], include: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Same projection as dump_store, for an already-dumped store dict."""
+    if include is None:
+        return store
+    out: Dict[str, Any] = {}
+    for key, sel in include.items():
+        if key not in store:
+            continue
+        val = store[key]
+        if sel is True:
+            out[key] = val
+        elif key in _LIST_FIELDS:
+            keep = sel["__all__"]
+            out[key] = [{k: item[k] for k in keep if k in item} for item in (val or [])]
+        else:
+            out[key] = {k: val[k] for k in sel if k in (val or {})}
+    return out
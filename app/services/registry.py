@@ -0,0 +1,74 @@
+from typing import Any, Callable, Dict, List
+import importlib
+import threading
+import time
+
+# name -> "module:attribute". Nothing is imported until a backend is first used.
+# Extractors are blocking callables (contents: bytes, filename: str) -> list of dicts.
+EXTRACTORS: Dict[str, str] = {
+    "pymupdf": "app.services.pdf_processor:extract_pymupdf_pages",
+    "unstructured": "app.services.pdf_processor:extract_unstructured_elements",
+    "hybrid": "app.services.hybrid_extractor:extract_hybrid_elements",
+}
+
+# Async KG client classes (no-arg constructors)
+KG_BACKENDS: Dict[str, str] = {
+    "neo4j": "app.services.kg_async:AsyncKGClient",
+    "memory": "app.services.kg_memory:AsyncMemoryKGClient",
+    "sqlite": "app.services.kg_sqlite:AsyncSQLiteKGClient",
+}
+
+# Third-party libraries each backend pulls in; used by warm-up to preload them
+BACKEND_LIBRARIES: Dict[str, List[str]] = {
+    "pymupdf": ["fitz"],
+    "unstructured": ["unstructured.partition.pdf"],
+    "hybrid": ["fitz"],
+    "neo4j": ["neo4j"],
+    "memory": [],
+    "sqlite": [],
+}
+
+# module name -> seconds spent importing it through this registry
+IMPORT_TIMES: Dict[str, float] = {}
+
+_resolved: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def timed_import(module: str):
+    """import_module, recording the first (cold) import time in IMPORT_TIMES."""
+    with _lock:
+        t0 = time.perf_counter()
+        mod = importlib.import_module(module)
+        if module not in IMPORT_TIMES:
+            IMPORT_TIMES[module] = round(time.perf_counter() - t0, 6)
+        return mod
+
+
+def _resolve(target: str) -> Any:
+    obj = _resolved.get(target)
+    if obj is None:
+        module, _, attr = target.partition(":")
+        obj = getattr(timed_import(module), attr)
+        _resolved[target] = obj
+    return obj
+
+
+def register_extractor(name: str, target: str) -> None:
+    EXTRACTORS[name] = target
+
+
+def register_kg_backend(name: str, target: str) -> None:
+    KG_BACKENDS[name] = target
+
+
+def get_extractor(name: str) -> Callable[..., List[Dict[str, Any]]]:
+    if name not in EXTRACTORS:
+        raise KeyError(f"Unknown extractor {name!r}; available: {sorted(EXTRACTORS)}")
+    return _resolve(EXTRACTORS[name])
+
+
+def get_kg_backend(name: str):
+    if name not in KG_BACKENDS:
+        raise KeyError(f"Unknown KG backend {name!r}; available: {sorted(KG_BACKENDS)}")
+    return _resolve(KG_BACKENDS[name])
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional
+import html
+import re
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+# Cached search pages; tagged with the doc_ids they filter on, or "*" when unfiltered
+SEARCH_CACHE = TTLCache(maxsize=settings.search_cache_size, ttl=settings.search_cache_ttl)
+_ALL_DOCS = "*"
+
+_LUCENE_SPECIAL_RE = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+_TERM_RE = re.compile(r"\w+")
+
+
+def escape_lucene(q: str) -> str:
+    """Escape Lucene query syntax so user text is matched literally."""
+    return _LUCENE_SPECIAL_RE.sub(r"\\\1", q)
+
+
+def invalidate_doc(*doc_ids: Optional[str]) -> None:
+    """
+    Drop cached searches that could contain sections of these docs. KG imports call it
+    once their write is done: invalidating first would let a search that runs during
+    the write cache the old rows again.
+    """
+    SEARCH_CACHE.invalidate_tags([_ALL_DOCS, *(d for d in doc_ids if d)])
+
+
+def highlight(text: Optional[str], terms: List[str], snippet_chars: int = 200) -> Optional[str]:
+    """
+    Cut a window of ~snippet_chars around the first matching term and wrap every
+    term occurrence in <em>…</em>. The snippet is HTML: section text is escaped, so
+    markup in an agreement shows up as text, never as live HTML.
+    """
+    if not text:
+        return None
+    words = [t for t in terms if t]
+    if not words:
+        return html.escape(text[:snippet_chars] if snippet_chars else text)
+    pat = re.compile("|".join(re.escape(t) for t in sorted(words, key=len, reverse=True)), re.I)
+    m = pat.search(text)
+    start = 0
+    if m and snippet_chars:
+        start = max(0, m.start() - snippet_chars // 3)
+    window = text[start: start + snippet_chars] if snippet_chars else text
+    # match the raw text, escape around the matches: a term can't hit an entity like &amp;
+    parts, pos = [], 0
+    for hit in pat.finditer(window):
+        parts.append(html.escape(window[pos:hit.start()]))
+        parts.append(f"<em>{html.escape(hit.group(0))}</em>")
+        pos = hit.end()
+    parts.append(html.escape(window[pos:]))
+    out = "".join(parts)
+    if start > 0:
+        out = "…" + out
+    if snippet_chars and start + snippet_chars < len(text):
+        out = out + "…"
+    return out
+
+
+async def search_sections(
+    kg,
+    q: str,
+    doc_ids: Optional[List[str]] = None,
+    page: int = 1,
+    page_size: int = 20,
+    snippet_chars: int = 200,
+    raw_query: bool = False,
+) -> Dict[str, Any]:
+    """
+    Query sectionTextIdx through `kg` (any async KG client), one page at a time.
+    Pages are cached until the TTL expires or an import touches one of their docs.
+    """
+    doc_filter = tuple(sorted(set(doc_ids))) if doc_ids else None
+    key = ("sections", q, raw_query, doc_filter, page, page_size, snippet_chars)
+    cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    lucene = q if raw_query else escape_lucene(q)
+    skip = (page - 1) * page_size
+    # one extra row tells us whether another page exists
+    rows = await kg.search_sections(lucene, list(doc_filter) if doc_filter else None, skip, page_size + 1)
+    terms = _TERM_RE.findall(q)
+    hits = [
+        {
+            "doc_id": r.get("doc_id"),
+            "section_id": r.get("section_id"),
+            "label": r.get("label"),
+            "title": r.get("title"),
+            "page_start": r.get("page_start"),
+            "score": r.get("score"),
+            "snippet": highlight(r.get("text"), terms, snippet_chars),
+        }
+        for r in rows[:page_size]
+    ]
+    result = {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "has_more": len(rows) > page_size,
+        "hits": hits,
+    }
+    SEARCH_CACHE.set(key, result, tags=doc_filter or (_ALL_DOCS,))
+    return {**result, "cached": False}
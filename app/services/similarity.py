@@ -0,0 +1,442 @@
+# app/services/similarity.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import contextlib
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import zlib
+
+from app.core.config import settings
+
+_TOKEN_RE = re.compile(r"\w+")
+# universal hashing (a*x + b) mod p with a Mersenne prime: products stay below 2**62, so uint64 is exact
+_PRIME = (1 << 31) - 1
+# shingles hashed per NumPy chunk; bounds the (num_perm x shingles) matrix to ~num_perm * 256 KiB
+_CHUNK_SHINGLES = 1 << 15
+_PREVIEW_CHARS = 160
+_FNV_OFFSET = 1469598103934665603
+_FNV_PRIME = 1099511628211
+
+
+def _np():
+    """Import NumPy on first use; raise a clear error if missing."""
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError("The clause similarity index needs NumPy. "
+                           "Install with: pip install numpy (or the [similarity] extra)") from e
+    return np
+
+
+def shingles(text: Optional[str], size: int, min_tokens: int) -> List[int]:
+    """
+    crc32 of every word `size`-gram of the lower-cased text (stable across processes,
+    unlike hash()). Texts shorter than min_tokens words give no shingles.
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if len(tokens) < max(1, min_tokens):
+        return []
+    if len(tokens) <= size:
+        return [zlib.crc32(" ".join(tokens).encode("utf-8"))]
+    return sorted({zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8")) for i in range(len(tokens) - size + 1)})
+
+
+@functools.lru_cache(maxsize=8)
+def _perm_params(num_perm: int, seed: int):
+    np = _np()
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(shingle_sets: List[List[int]], num_perm: int, seed: int = 1):
+    """
+    (n, num_perm) uint32 MinHash signatures for non-empty shingle sets. Each chunk of
+    sets is flattened into one array, hashed by every permutation at once and reduced
+    per set with np.minimum.reduceat.
+    """
+    np = _np()
+    a, b = _perm_params(num_perm, seed)
+    out = np.empty((len(shingle_sets), num_perm), dtype=np.uint32)
+    i = 0
+    while i < len(shingle_sets):
+        j, total = i, 0
+        while j < len(shingle_sets) and (j == i or total + len(shingle_sets[j]) <= _CHUNK_SHINGLES):
+            total += len(shingle_sets[j])
+            j += 1
+        lengths = [len(s) for s in shingle_sets[i:j]]
+        flat = np.fromiter(itertools.chain.from_iterable(shingle_sets[i:j]), dtype=np.uint64, count=total)
+        hashed = (a * (flat % _PRIME)[None, :] + b) % _PRIME
+        offsets = np.concatenate(([0], np.cumsum(lengths[:-1]))).astype(np.int64)
+        out[i:j] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        i = j
+    return out
+
+
+def band_keys(sigs, bands: int):
+    """(n, bands) uint64 FNV-1a keys of each signature band; equal band => equal key."""
+    np = _np()
+    n, num_perm = sigs.shape
+    rows = num_perm // bands
+    v = sigs.reshape(n, bands, rows).astype(np.uint64)
+    h = np.full((n, bands), _FNV_OFFSET, dtype=np.uint64)
+    for r in range(rows):
+        h = (h ^ v[:, :, r]) * np.uint64(_FNV_PRIME)  # wraps mod 2**64
+    return h
+
+
+def section_signatures(store: Dict[str, Any], num_perm: int, shingle_size: int, min_tokens: int,
+                       seed: int = 1) -> Tuple[List[Dict[str, Any]], Any]:
+    """(row metadata, signatures) for every section of a store with enough text to shingle."""
+    rows, sets = [], []
+    for s in store.get("sections") or []:
+        sh = shingles(s.get("text"), shingle_size, min_tokens)
+        if not sh:
+            continue
+        sets.append(sh)
+        rows.append({
+            "section_id": s["section_id"],
+            "label": s.get("label"),
+            "title": s.get("title"),
+            "page_start": s.get("page_start"),
+            "preview": (s.get("text") or "")[:_PREVIEW_CHARS],
+        })
+    return rows, minhash_signatures(sets, num_perm, seed)
+
+
+class ClauseIndex:
+    """
+    MinHash/LSH index of section texts across documents.
+
+    Signatures and banded LSH keys live in slot arrays. Slots up to the last merge are
+    looked up per band in sorted key arrays (searchsorted); slots added since then are
+    matched with one vectorized comparison. Removing a document tombstones its slots;
+    merge() compacts and re-sorts once either tail grows past a quarter of the index.
+    """
+
+    def __init__(self, num_perm: Optional[int] = None, bands: Optional[int] = None,
+                 shingle_size: Optional[int] = None, min_tokens: Optional[int] = None, seed: int = 1):
+        np = _np()
+        self.num_perm = num_perm or settings.similarity_num_perm
+        self.bands = bands or settings.similarity_bands
+        self.shingle_size = shingle_size or settings.similarity_shingle_size
+        self.min_tokens = settings.similarity_min_tokens if min_tokens is None else min_tokens
+        self.seed = seed
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands}).")
+        self._lock = threading.RLock()
+        self._n = 0
+        self._sigs = np.empty((0, self.num_perm), dtype=np.uint32)
+        self._keys = np.empty((0, self.bands), dtype=np.uint64)
+        self._alive = np.empty(0, dtype=bool)
+        self._meta: List[Dict[str, Any]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._doc_slots: Dict[str, List[int]] = {}
+        self._dead = 0
+        # merged part: per band, sorted keys and the slots they belong to
+        self._merged_n = 0
+        self._sorted_keys = np.empty((self.bands, 0), dtype=np.uint64)
+        self._sorted_slots = np.empty((self.bands, 0), dtype=np.int64)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {"num_perm": self.num_perm, "bands": self.bands, "shingle_size": self.shingle_size,
+                "min_tokens": self.min_tokens, "seed": self.seed}
+
+    # ---------- updates ----------
+
+    def signatures_for(self, store: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Any]:
+        return section_signatures(store, self.num_perm, self.shingle_size, self.min_tokens, self.seed)
+
+    def add_store(self, store: Dict[str, Any]) -> Dict[str, Any]:
+        doc_id = (store.get("document") or {}).get("doc_id")
+        if not doc_id:
+            raise ValueError("store has no document.doc_id")
+        rows, sigs = self.signatures_for(store)
+        return self.add_signatures(doc_id, rows, sigs)
+
+    def add_signatures(self, doc_id: str, rows: List[Dict[str, Any]], sigs) -> Dict[str, Any]:
+        """Replace doc_id's sections with precomputed (rows, signatures), e.g. from build_corpus workers."""
+        np = _np()
+        if len(rows) and sigs.shape[1] != self.num_perm:
+            raise ValueError(f"signatures have {sigs.shape[1]} permutations; the index uses {self.num_perm}.")
+        keys = band_keys(sigs, self.bands) if len(rows) else np.empty((0, self.bands), dtype=np.uint64)
+        with self._lock:
+            removed = self._remove(doc_id)
+            start = self._n
+            self._grow(start + len(rows))
+            self._sigs[start:start + len(rows)] = sigs
+            self._keys[start:start + len(rows)] = keys
+            self._alive[start:start + len(rows)] = True
+            slots = []
+            for i, row in enumerate(rows):
+                slot = start + i
+                if row["section_id"] in self._slot_of:  # same section id under another doc: last one wins
+                    self._tombstone(self._slot_of[row["section_id"]])
+                self._meta.append({**row, "doc_id": doc_id})
+                self._slot_of[row["section_id"]] = slot
+                slots.append(slot)
+            self._n = start + len(rows)
+            self._doc_slots[doc_id] = slots
+            self._maybe_merge()
+        return {"doc_id": doc_id, "sections_indexed": len(rows), "sections_replaced": removed}
+
+    def remove_document(self, doc_id: str) -> int:
+        with self._lock:
+            removed = self._remove(doc_id)
+            self._maybe_merge()
+            return removed
+
+    def _remove(self, doc_id: str) -> int:
+        slots = self._doc_slots.pop(doc_id, [])
+        for slot in slots:
+            self._tombstone(slot)
+        return len(slots)
+
+    def _tombstone(self, slot: int) -> None:
+        if self._alive[slot]:
+            self._alive[slot] = False
+            self._dead += 1
+            sid = self._meta[slot]["section_id"]
+            if self._slot_of.get(sid) == slot:
+                del self._slot_of[sid]
+
+    def _grow(self, need: int) -> None:
+        np = _np()
+        cap = len(self._alive)
+        if need <= cap:
+            return
+        cap = max(need, cap * 2, 1024)
+        for name, width, dtype in (("_sigs", self.num_perm, np.uint32), ("_keys", self.bands, np.uint64)):
+            arr = np.empty((cap, width), dtype=dtype)
+            arr[:self._n] = getattr(self, name)[:self._n]
+            setattr(self, name, arr)
+        alive = np.zeros(cap, dtype=bool)
+        alive[:self._n] = self._alive[:self._n]
+        self._alive = alive
+
+    def _maybe_merge(self) -> None:
+        pending = self._n - self._merged_n
+        if pending > max(8192, self._merged_n // 4) or self._dead > max(8192, self._n // 4):
+            self.merge()
+
+    def merge(self) -> None:
+        """Drop tombstoned slots, renumber, and rebuild the sorted band arrays from scratch."""
+        np = _np()
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._n])
+            self._sigs = self._sigs[keep]
+            self._keys = self._keys[keep]
+            self._alive = np.ones(len(keep), dtype=bool)
+            self._meta = [self._meta[i] for i in keep]
+            self._n = len(keep)
+            self._dead = 0
+            self._slot_of = {m["section_id"]: i for i, m in enumerate(self._meta)}
+            self._doc_slots = {}
+            for i, m in enumerate(self._meta):
+                self._doc_slots.setdefault(m["doc_id"], []).append(i)
+            order = np.argsort(self._keys.T, axis=1, kind="stable")
+            self._sorted_keys = np.take_along_axis(self._keys.T, order, axis=1)
+            self._sorted_slots = order.astype(np.int64)
+            self._merged_n = self._n
+
+    # ---------- queries ----------
+
+    def _candidates(self, keys) -> Any:
+        np = _np()
+        found = []
+        for band in range(self.bands):
+            key = keys[band]
+            row = self._sorted_keys[band]
+            lo, hi = np.searchsorted(row, key, "left"), np.searchsorted(row, key, "right")
+            if hi > lo:
+                found.append(self._sorted_slots[band, lo:hi])
+        pending = self._keys[self._merged_n:self._n]
+        if len(pending):
+            found.append(self._merged_n + np.flatnonzero((pending == keys[None, :]).any(axis=1)))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        slots = np.unique(np.concatenate(found))
+        return slots[self._alive[slots]]
+
+    def _query(self, sig, k: int, min_similarity: float, exclude_slot: Optional[int] = None,
+               exclude_doc_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        np = _np()
+        with self._lock:
+            slots = self._candidates(band_keys(sig[None, :], self.bands)[0])
+            if exclude_slot is not None:
+                slots = slots[slots != exclude_slot]
+            if not len(slots):
+                return []
+            # estimated Jaccard similarity = share of equal MinHash values
+            sims = (self._sigs[slots] == sig[None, :]).mean(axis=1)
+            order = np.argsort(-sims, kind="stable")
+            hits = []
+            for i in order:
+                if sims[i] < min_similarity:
+                    break
+                meta = self._meta[slots[i]]
+                if exclude_doc_id is not None and meta["doc_id"] == exclude_doc_id:
+                    continue
+                hits.append({**meta, "similarity": round(float(sims[i]), 4)})
+                if len(hits) >= k:
+                    break
+        return hits
+
+    def query_text(self, text: str, k: int = 10, min_similarity: float = 0.5,
+                   exclude_doc_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        sh = shingles(text, self.shingle_size, 1)
+        if not sh:
+            return []
+        sig = minhash_signatures([sh], self.num_perm, self.seed)[0]
+        return self._query(sig, k, min_similarity, exclude_doc_id=exclude_doc_id)
+
+    def query_section(self, section_id: str, k: int = 10, min_similarity: float = 0.5,
+                      other_documents_only: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """Near-duplicates of an indexed section; None when the section is not in the index."""
+        with self._lock:
+            slot = self._slot_of.get(section_id)
+            if slot is None:
+                return None
+            sig = self._sigs[slot].copy()
+            doc_id = self._meta[slot]["doc_id"]
+        return self._query(sig, k, min_similarity, exclude_slot=slot,
+                           exclude_doc_id=doc_id if other_documents_only else None)
+
+    def documents(self) -> List[str]:
+        with self._lock:
+            return sorted(self._doc_slots)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self.num_perm // self.bands
+            return {
+                **self.params,
+                "documents": len(self._doc_slots),
+                "sections": len(self._slot_of),
+                "pending_merge": self._n - self._merged_n,
+                "tombstones": self._dead,
+                # similarity at which a pair becomes a candidate with probability ~1/2
+                "threshold": round((1 / self.bands) ** (1 / rows), 3),
+            }
+
+    # ---------- persistence ----------
+
+    def save(self, path: str) -> str:
+        """Write <path> (npz: signatures) and <path>.json (params + section metadata) atomically."""
+        np = _np()
+        with self._lock:
+            self.merge()
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.savez(f, sigs=self._sigs[:self._n])
+            with open(tmp + ".json", "w", encoding="utf-8") as f:
+                json.dump({"params": self.params, "sections": self._meta}, f)
+            os.replace(tmp, path)
+            os.replace(tmp + ".json", path + ".json")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ClauseIndex":
+        np = _np()
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(**meta["params"])
+        with np.load(path) as data:
+            sigs = data["sigs"]
+        by_doc: Dict[str, List[int]] = {}
+        for i, m in enumerate(meta["sections"]):
+            by_doc.setdefault(m["doc_id"], []).append(i)
+        with index._lock:
+            for doc_id, idx in by_doc.items():
+                rows = [{k: v for k, v in meta["sections"][i].items() if k != "doc_id"} for i in idx]
+                index.add_signatures(doc_id, rows, sigs[idx])
+            index.merge()
+        return index
+
+
+_INDEX: Optional[ClauseIndex] = None
+_INDEX_STAMP: Optional[Tuple[int, int]] = None  # file version _INDEX was loaded from / saved as
+_INDEX_LOCK = threading.RLock()
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path + ".json")  # save() replaces the sidecar last
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@contextlib.contextmanager
+def _file_lock(path: str, exclusive: bool):
+    """flock on <path>.lock: readers share it, a saving writer holds it alone."""
+    import fcntl
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _shared_path() -> Optional[str]:
+    return settings.similarity_index_path if settings.similarity_shared and settings.similarity_index_path else None
+
+
+def _reload(path: str) -> None:
+    """(Re)load _INDEX from path; caller holds _INDEX_LOCK (and the file lock in shared mode)."""
+    global _INDEX, _INDEX_STAMP
+    stamp = _file_stamp(path) if path else None
+    if stamp is None:
+        _INDEX = _INDEX or ClauseIndex()
+        return
+    _INDEX, _INDEX_STAMP = ClauseIndex.load(path), stamp
+
+
+def get_clause_index() -> ClauseIndex:
+    """
+    The process-wide index; loaded from SIMILARITY_INDEX_PATH on first use when that file
+    exists. With SIMILARITY_SHARED, reloaded whenever another process saved a newer one.
+    """
+    with _INDEX_LOCK:
+        shared = _shared_path()
+        if _INDEX is None or (shared and _file_stamp(shared) != _INDEX_STAMP):
+            if shared:
+                with _file_lock(shared, exclusive=False):
+                    _reload(shared)
+            else:
+                _reload(settings.similarity_index_path)
+        return _INDEX
+
+
+def update_clause_index(change: Callable[[ClauseIndex], Any]) -> Any:
+    """
+    Apply change(index) and return its result. With SIMILARITY_SHARED the change is made
+    on the newest saved index and saved before the file lock is released, so concurrent
+    writers in other workers don't lose each other's updates.
+    """
+    global _INDEX_STAMP
+    shared = _shared_path()
+    if not shared:
+        return change(get_clause_index())
+    with _INDEX_LOCK, _file_lock(shared, exclusive=True):
+        if _INDEX is None or _file_stamp(shared) != _INDEX_STAMP:
+            _reload(shared)
+        result = change(_INDEX)
+        _INDEX.save(shared)
+        _INDEX_STAMP = _file_stamp(shared)
+        return result
+
+
+def register_similarity(store: Dict[str, Any]) -> Dict[str, Any]:
+    return update_clause_index(lambda index: index.add_store(store))
+
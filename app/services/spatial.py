@@ -0,0 +1,191 @@
+# app/services/spatial.py
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
+import math
+import os
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.utils.ids import sha256_str
+
+# boxes per grid cell we aim for; the grid is sized per page from its box count
+_TARGET_PER_CELL = 4
+_MAX_CELLS_PER_AXIS = 64
+
+QUERY_MODES = ("intersects", "contains", "within")
+
+
+class PageGrid:
+    """
+    Uniform grid over one page's section boxes. Each box is registered in every
+    cell it touches, so a point query reads one cell and a rect query reads the
+    cells the rect covers.
+    """
+
+    def __init__(self, page: int, boxes: List[Tuple[float, float, float, float, str, int]]):
+        self.page = page
+        self.boxes = boxes  # (x0, y0, x1, y1, section_id, sequence)
+        self.x0 = min(b[0] for b in boxes)
+        self.y0 = min(b[1] for b in boxes)
+        self.x1 = max(b[2] for b in boxes)
+        self.y1 = max(b[3] for b in boxes)
+        n = max(1, math.ceil(math.sqrt(len(boxes) / _TARGET_PER_CELL)))
+        self.cols = self.rows = min(n, _MAX_CELLS_PER_AXIS)
+        self.cw = ((self.x1 - self.x0) / self.cols) or 1.0
+        self.ch = ((self.y1 - self.y0) / self.rows) or 1.0
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, (bx0, by0, bx1, by1, _sid, _seq) in enumerate(boxes):
+            c0, r0, c1, r1 = self._cell_range(bx0, by0, bx1, by1)
+            for c in range(c0, c1 + 1):
+                for r in range(r0, r1 + 1):
+                    self.cells.setdefault((c, r), []).append(i)
+
+    def _col(self, x: float) -> int:
+        return min(self.cols - 1, max(0, int((x - self.x0) / self.cw)))
+
+    def _row(self, y: float) -> int:
+        return min(self.rows - 1, max(0, int((y - self.y0) / self.ch)))
+
+    def _cell_range(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[int, int, int, int]:
+        return self._col(x0), self._row(y0), self._col(x1), self._row(y1)
+
+    def point(self, x: float, y: float) -> List[int]:
+        if not (self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1):
+            return []
+        out = []
+        for i in self.cells.get((self._col(x), self._row(y)), ()):
+            bx0, by0, bx1, by1 = self.boxes[i][:4]
+            if bx0 <= x <= bx1 and by0 <= y <= by1:
+                out.append(i)
+        return out
+
+    def rect(self, x0: float, y0: float, x1: float, y1: float, mode: str = "intersects") -> List[int]:
+        if x1 < self.x0 or x0 > self.x1 or y1 < self.y0 or y0 > self.y1:
+            return []
+        c0, r0, c1, r1 = self._cell_range(x0, y0, x1, y1)
+        seen: Set[int] = set()
+        out = []
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                for i in self.cells.get((c, r), ()):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    bx0, by0, bx1, by1 = self.boxes[i][:4]
+                    if mode == "contains":  # region fully contains the section box
+                        hit = x0 <= bx0 and y0 <= by0 and bx1 <= x1 and by1 <= y1
+                    elif mode == "within":  # section box fully contains the region
+                        hit = bx0 <= x0 and by0 <= y0 and x1 <= bx1 and y1 <= by1
+                    else:
+                        hit = bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1
+                    if hit:
+                        out.append(i)
+        return out
+
+
+class SpatialIndex:
+    """Per-page PageGrids over every section span that has a bbox."""
+
+    def __init__(self, doc_id: str, pages: Dict[int, PageGrid]):
+        self.doc_id = doc_id
+        self.pages = pages
+
+    @classmethod
+    def from_store(cls, store: Dict[str, Any]) -> "SpatialIndex":
+        by_page: Dict[int, List[Tuple[float, float, float, float, str, int]]] = {}
+        for s in store.get("sections") or []:
+            for span in s.get("spans") or []:
+                page, bbox = span.get("page"), span.get("bbox")
+                if page is None or not bbox or len(bbox) < 4:
+                    continue
+                x0, y0, x1, y1 = (float(v) for v in bbox[:4])
+                box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1), s["section_id"], s.get("sequence") or 0)
+                by_page.setdefault(int(page), []).append(box)
+        doc_id = (store.get("document") or {}).get("doc_id")
+        return cls.from_boxes(doc_id, by_page)
+
+    @classmethod
+    def from_boxes(cls, doc_id: str, by_page: Dict[int, List[Tuple[float, float, float, float, str, int]]]) -> "SpatialIndex":
+        return cls(doc_id, {p: PageGrid(p, boxes) for p, boxes in by_page.items()})
+
+    def to_boxes(self) -> Dict[str, Any]:
+        """Section boxes per page: all from_boxes needs to rebuild the grids."""
+        return {"doc_id": self.doc_id, "pages": {str(p): g.boxes for p, g in self.pages.items()}}
+
+    def _hits(self, grid: PageGrid, idx: Iterable[int], order: str) -> List[Dict[str, Any]]:
+        rows = []
+        for i in idx:
+            x0, y0, x1, y1, sid, seq = grid.boxes[i]
+            rows.append({"section_id": sid, "page": grid.page, "bbox": [x0, y0, x1, y1],
+                         "sequence": seq, "area": (x1 - x0) * (y1 - y0)})
+        if order == "area":  # innermost box first: what a click means
+            rows.sort(key=lambda r: (r["area"], r["sequence"]))
+        else:
+            rows.sort(key=lambda r: r["sequence"])
+        return rows
+
+    def query_point(self, page: int, x: float, y: float) -> List[Dict[str, Any]]:
+        grid = self.pages.get(page)
+        return self._hits(grid, grid.point(x, y), "area") if grid else []
+
+    def query_rect(self, page: int, x0: float, y0: float, x1: float, y1: float,
+                   mode: str = "intersects") -> List[Dict[str, Any]]:
+        if mode not in QUERY_MODES:
+            raise ValueError(f"Unknown mode {mode!r}; expected one of {QUERY_MODES}.")
+        grid = self.pages.get(page)
+        if not grid:
+            return []
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return self._hits(grid, grid.rect(x0, y0, x1, y1, mode), "sequence")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "doc_id": self.doc_id,
+            "pages": len(self.pages),
+            "boxes": sum(len(g.boxes) for g in self.pages.values()),
+            "cells": sum(len(g.cells) for g in self.pages.values()),
+        }
+
+
+# doc_id -> SpatialIndex for stores registered through the API
+SPATIAL_INDEXES = TTLCache(maxsize=settings.spatial_index_cache_size, ttl=0)
+
+
+def _index_path(doc_id: str) -> Optional[str]:
+    """<SPATIAL_INDEX_DIR>/<hash[:2]>/<hash>.json for the doc_id, or None without a disk tier."""
+    if not settings.spatial_index_dir:
+        return None
+    key = sha256_str(doc_id)
+    return os.path.join(settings.spatial_index_dir, key[:2], key + ".json")
+
+
+def register_spatial_index(store: Dict[str, Any]) -> SpatialIndex:
+    index = SpatialIndex.from_store(store)
+    if not index.doc_id:
+        raise ValueError("store has no document.doc_id")
+    SPATIAL_INDEXES.set(index.doc_id, index)
+    path = _index_path(index.doc_id)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index.to_boxes(), f)
+        os.replace(tmp, path)
+    return index
+
+
+def get_spatial_index(doc_id: str) -> Optional[SpatialIndex]:
+    """From memory, else rebuilt from the disk tier (another worker may have registered it)."""
+    index = SPATIAL_INDEXES.get(doc_id)
+    path = _index_path(doc_id) if index is None else None
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = SpatialIndex.from_boxes(data["doc_id"], {
+            int(p): [tuple(b) for b in boxes] for p, boxes in data["pages"].items()})
+        SPATIAL_INDEXES.set(doc_id, index)
+    return index
@@ -0,0 +1,201 @@
+# app/services/text_store.py
+from typing import Any, Dict, List, Optional, Set, Tuple
+import copy
+import json
+import os
+import threading
+
+from app.utils.ids import sha256_str
+
+REFS_NAME = "refs.json"
+
+
+def text_hash(text: str) -> str:
+    """Same key as Section text_hash in the KG (sha256_str of the canonical text)."""
+    return sha256_str(text)
+
+
+def dedupe_store(store: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Split a store dict into (store whose sections reference text by text_hash, {hash: text}).
+    Sections with empty text keep text="" and get no reference.
+    """
+    out = copy.copy(store)
+    texts: Dict[str, str] = {}
+    sections = []
+    for s in store.get("sections") or []:
+        s = dict(s)
+        text = s.get("text")
+        if text:
+            h = text_hash(text)
+            texts[h] = text
+            s.pop("text")
+            s["text_hash"] = h
+        sections.append(s)
+    out["sections"] = sections
+    return out, texts
+
+
+def section_text_refs(store: Dict[str, Any]) -> Dict[str, int]:
+    """{text_hash: number of sections referencing it} for a deduped store."""
+    refs: Dict[str, int] = {}
+    for s in store.get("sections") or []:
+        h = s.get("text_hash")
+        if h and "text" not in s:
+            refs[h] = refs.get(h, 0) + 1
+    return refs
+
+
+class TextStore:
+    """
+    Content-addressed section text shared across documents.
+
+    Objects live at <root>/objects/<hash[:2]>/<hash>.txt; <root>/refs.json maps
+    doc_id -> {text_hash: section count}. Reference counts and the hash -> doc_ids
+    index are derived from refs on load, so "which documents share this clause" is
+    a dict lookup. root=None keeps everything in memory. load_refs=False skips
+    reading refs.json (workers that only write objects).
+    """
+
+    def __init__(self, root: Optional[str] = None, load_refs: bool = True):
+        self.root = root
+        self._lock = threading.Lock()
+        self._texts: Dict[str, str] = {}
+        self._refs: Dict[str, Dict[str, int]] = {}
+        self._counts: Dict[str, int] = {}
+        self._docs_by_hash: Dict[str, Set[str]] = {}
+        if root:
+            os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+            path = os.path.join(root, REFS_NAME)
+            if load_refs and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    for doc_id, refs in json.load(f).items():
+                        self._add_refs(doc_id, refs)
+
+    # ---------- objects ----------
+
+    def _object_path(self, h: str) -> str:
+        return os.path.join(self.root, "objects", h[:2], h + ".txt")
+
+    def put_text(self, text: str) -> str:
+        """Store one text object (idempotent; safe to call from several processes)."""
+        h = text_hash(text)
+        if not self.root:
+            self._texts.setdefault(h, text)
+            return h
+        path = self._object_path(h)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return h
+
+    def get(self, h: str) -> Optional[str]:
+        if not self.root:
+            return self._texts.get(h)
+        try:
+            with open(self._object_path(h), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    # ---------- references ----------
+
+    def _add_refs(self, doc_id: str, refs: Dict[str, int]) -> None:
+        self._refs[doc_id] = dict(refs)
+        for h, n in refs.items():
+            self._counts[h] = self._counts.get(h, 0) + n
+            self._docs_by_hash.setdefault(h, set()).add(doc_id)
+
+    def _drop_refs(self, doc_id: str) -> None:
+        for h, n in self._refs.pop(doc_id, {}).items():
+            self._counts[h] -= n
+            docs = self._docs_by_hash.get(h)
+            if docs is not None:
+                docs.discard(doc_id)
+            if self._counts[h] <= 0:
+                self._counts.pop(h)
+                self._docs_by_hash.pop(h, None)
+
+    def set_refs(self, doc_id: str, refs: Dict[str, int]) -> None:
+        """Replace the references held by doc_id (objects must already be stored)."""
+        with self._lock:
+            self._drop_refs(doc_id)
+            if refs:
+                self._add_refs(doc_id, refs)
+
+    def add_store(self, store: Dict[str, Any]) -> Dict[str, Any]:
+        """Dedupe a full store into this text store; returns the referencing store."""
+        deduped, texts = dedupe_store(store)
+        for text in texts.values():
+            self.put_text(text)
+        self.set_refs(store["document"]["doc_id"], section_text_refs(deduped))
+        return deduped
+
+    def remove_document(self, doc_id: str) -> None:
+        with self._lock:
+            self._drop_refs(doc_id)
+
+    def refcount(self, h: str) -> int:
+        return self._counts.get(h, 0)
+
+    def documents(self, h: str) -> List[str]:
+        return sorted(self._docs_by_hash.get(h, ()))
+
+    def rehydrate(self, store: Dict[str, Any]) -> Dict[str, Any]:
+        """Inverse of dedupe_store: put text back on every section that references it."""
+        out = copy.copy(store)
+        sections = []
+        for s in store.get("sections") or []:
+            if "text" not in s and s.get("text_hash"):
+                text = self.get(s["text_hash"])
+                if text is None:
+                    raise KeyError(f"Text object {s['text_hash']} missing from text store")
+                s = {**s, "text": text}
+            sections.append(s)
+        out["sections"] = sections
+        return out
+
+    # ---------- maintenance ----------
+
+    def gc(self) -> int:
+        """Delete text objects no document references. Returns the number removed."""
+        with self._lock:
+            live = set(self._counts)
+            if not self.root:
+                dead = [h for h in self._texts if h not in live]
+                for h in dead:
+                    del self._texts[h]
+                return len(dead)
+            removed = 0
+            objects = os.path.join(self.root, "objects")
+            for dirpath, _dirs, files in os.walk(objects):
+                for name in files:
+                    if name.endswith(".txt") and name[:-4] not in live:
+                        os.remove(os.path.join(dirpath, name))
+                        removed += 1
+            return removed
+
+    def save(self) -> None:
+        if not self.root:
+            return
+        with self._lock:
+            path = os.path.join(self.root, REFS_NAME)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._refs, f, sort_keys=True)
+            os.replace(tmp, path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            refs = sum(self._counts.values())
+            unique = len(self._counts)
+            return {
+                "documents": len(self._refs),
+                "unique_texts": unique,
+                "section_refs": refs,
+                "shared_texts": sum(1 for docs in self._docs_by_hash.values() if len(docs) > 1),
+                "dedupe_ratio": round(refs / unique, 4) if unique else 0.0,
+            }
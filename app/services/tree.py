@@ -0,0 +1,47 @@
+# app/services/tree.py
+from typing import Any, Dict, List, Optional
+
+
+def euler_intervals(children_by_parent: Dict[Optional[str], List[str]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Nested-set numbering of the section tree from topology.children_by_parent.
+
+    One clock ticks on entering and on leaving every node, so for sections a, b:
+      b is in a's subtree  <=>  a.pre <= b.pre and b.post <= a.post
+    depth is 0 for roots; ancestors lists section ids from the root down to the parent.
+    Parents that are not sections themselves (e.g. a parent element that was dropped)
+    are treated as extra roots, after the None root, so every section gets an interval.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    children = {k: list(v) for k, v in children_by_parent.items() if isinstance(v, list)}
+    all_children = {c for v in children.values() for c in v}
+    roots: List[str] = list(children.get(None, []))
+    # a parent key that is nobody's child and not a top-level section: its children are roots
+    for pid in sorted(k for k in children if k is not None and k not in all_children):
+        roots.extend(children[pid])
+
+    clock = 0
+    for root in roots:
+        if root in out:
+            continue
+        # iterative DFS: (section_id, depth, ancestors, children iterator or None before entry)
+        stack: List[List[Any]] = [[root, 0, [], None]]
+        while stack:
+            frame = stack[-1]
+            sid, depth, ancestors, it = frame
+            if it is None:
+                if sid in out:  # cycle / shared child guard
+                    stack.pop()
+                    continue
+                out[sid] = {"pre": clock, "post": None, "depth": depth, "ancestors": ancestors}
+                clock += 1
+                frame[3] = it = iter(children.get(sid, ()))
+            child = next(it, None)
+            if child is None:
+                out[sid]["post"] = clock
+                clock += 1
+                stack.pop()
+            elif child not in out:
+                stack.append([child, depth + 1, ancestors + [sid], None])
+    return out
+
@@ -1,27 +1,70 @@
+import time
+_t0 = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
 # import the router objects directly from their modules
 from app.routers.extraction import router as extractor_router
 from app.routers.kg import router as kg_router
+from app.routers.spatial import router as spatial_router
+from app.routers.sqlite_store import router as sqlite_router
+from app.routers.similarity import router as similarity_router
+from app.core.admission import admission_gauges
+from app.core.kg_client import close_kg_client, open_kg_client
+from app.core.warmup import STARTUP_REPORT, pending_backends, warm_up
+
+STARTUP_REPORT["app_import_seconds"] = round(time.perf_counter() - _t0, 6)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn only starts accepting connections once this returns
+    backends = pending_backends()
+    if backends:
+        await asyncio.to_thread(warm_up, backends)
+    await open_kg_client(app)
+    try:
+        yield
+    finally:
+        await close_kg_client(app)
+
 
 app = FastAPI(
     title="PDF Extraction Comparison API",
     description="data extraction libraries.",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # use the variables you imported above
 app.include_router(extractor_router)
 app.include_router(kg_router)
+app.include_router(spatial_router)
+app.include_router(sqlite_router)
+app.include_router(similarity_router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/health/startup", tags=["Root"])
+def startup_report():
+    """App import time, per-library import times and warm-up timings for this worker."""
+    return STARTUP_REPORT
+
+@app.get("/metrics/admission", tags=["Root"])
+def admission_metrics():
+    """Per-endpoint queue depth, in-flight count, wait times and rejections."""
+    return admission_gauges()
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the PDF Extraction API. Go to /docs to see the endpoints."}
 
 if __name__ == "__main__":
+    # development server; for production use the prefork server: python -m app.cli.serve --workers N
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
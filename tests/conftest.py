@@ -0,0 +1,33 @@
+import copy
+
+import pytest
+
+from app.services.builder import StoreBuilder
+from app.services.projection import dump_store
+
+
+def clause_elements(name, n, title=True):
+    """A title and n numbered clauses under it, as extractor elements."""
+    elements = [{"type": "Title", "element_id": f"{name}-t", "text": f"ARTICLE I {name}",
+                 "metadata": {"page_number": 1}}] if title else []
+    elements += [
+        {"type": "NarrativeText", "element_id": f"{name}-e{i}",
+         "metadata": {"page_number": 1, **({"parent_id": f"{name}-t"} if title else {})},
+         "text": f"Section {i}. \"Term {i}\" means the {name} clause number {i} of this Agreement, see Section 1.1."}
+        for i in range(1, n + 1)
+    ]
+    return elements
+
+
+@pytest.fixture
+def make_store():
+    """make_store(elements, filename=...) -> a full store dict, as /structure builds it."""
+    def _make(elements, filename="document.pdf", extracted_with="test", **options):
+        builder = StoreBuilder(copy.deepcopy(elements), filename=filename, extracted_with=extracted_with, **options)
+        return dump_store(builder.build())
+    return _make
+
+
+@pytest.fixture
+def clauses():
+    return clause_elements
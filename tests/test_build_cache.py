@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from app.routers import extraction
+from app.services.build_cache import BUILD_CACHE, BuildCache
+from main import app
+
+
+def test_entries_round_trip_through_disk(tmp_path):
+    store = {"document": {"doc_id": "d"}, "sections": [{"section_id": "s", "text": "Clause."}]}
+    schema = {"type": "object"}
+    BuildCache(maxsize=4, directory=str(tmp_path)).put("ab12", store, schema)
+    # a fresh cache (another worker) reads the disk tier
+    assert BuildCache(maxsize=4, directory=str(tmp_path)).get("ab12") == {"store": store, "schema": schema}
+
+
+def test_hit_returns_cached_store_and_schema_without_inference(clauses, monkeypatch):
+    BUILD_CACHE.memory.clear()
+    calls = []
+    infer = extraction.build_dynamic_schema
+
+    def counting(store):
+        calls.append(store)
+        return infer(store)
+
+    monkeypatch.setattr(extraction, "build_dynamic_schema", counting)
+    payload = {"elements": clauses("Alpha", 5)}
+    with TestClient(app) as client:
+        first = client.post("/api/extraction/rawjson", json=payload).json()
+        assert first["cached"] is False
+        assert len(calls) == 1
+        second = client.post("/api/extraction/rawjson", json=payload).json()
+        assert second["cached"] is True
+        assert len(calls) == 1
+        assert second["schema"] == first["schema"]
+        assert second["store"] == first["store"]
+
+        projected = client.post("/api/extraction/rawjson?fields=document", json=payload).json()
+        assert projected["cached"] is True
+        assert set(projected["schema"]["properties"]["document"]["properties"]) == set(first["store"]["document"])
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+HEAVY = ("fitz", "pymupdf", "unstructured", "numpy", "neo4j")
+
+
+def test_app_import_leaves_heavy_backends_unloaded():
+    code = "import sys, main; print(' '.join(sorted(m for m in sys.modules if m.split('.')[0] in %r)))" % (HEAVY,)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.split() == []
@@ -0,0 +1,45 @@
+import pytest
+
+from app.schemas import json_schema
+from app.schemas.json_schema import SCHEMA_CACHE, build_dynamic_schema, compile_validator, schema_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    SCHEMA_CACHE.clear()
+
+
+def test_same_keys_different_types_get_own_schema(make_store):
+    plain = make_store([{"type": "NarrativeText", "element_id": "e1", "text": "Plain body text."}])
+    titled = make_store([
+        {"type": "Title", "element_id": "t1", "text": "ARTICLE I Merger"},
+        {"type": "NarrativeText", "element_id": "e1", "text": "Body.", "metadata": {"parent_id": "t1"}},
+    ])
+    assert set(plain["sections"][0]) == set(titled["sections"][0])
+    assert schema_fingerprint(plain) != schema_fingerprint(titled)
+
+    build_dynamic_schema(plain)
+    schema = build_dynamic_schema(titled)
+    assert compile_validator(schema)(titled) == []
+
+
+def test_cache_hit_skips_type_inference(make_store, clauses, monkeypatch):
+    first = make_store(clauses("Alpha", 5))
+    second = make_store(clauses("Beta", 40), filename="other.pdf")
+    assert schema_fingerprint(first) == schema_fingerprint(second)
+    expected = build_dynamic_schema(first)
+
+    def walk(_store):
+        raise AssertionError("type inference ran on a cache hit")
+
+    monkeypatch.setattr(json_schema, "_store_props", walk)
+    assert build_dynamic_schema(second) == expected
+
+
+def test_cached_schema_is_not_shared_with_callers(make_store):
+    store = make_store([{"type": "Title", "element_id": "t1", "text": "ARTICLE I Merger"}])
+    first = build_dynamic_schema(store)
+    first["properties"].clear()
+    second = build_dynamic_schema(store)
+    assert second["properties"]
+    assert build_dynamic_schema(store) is not second
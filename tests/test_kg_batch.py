@@ -0,0 +1,21 @@
+from app.services.kg import IMPORT_BATCH_STATEMENTS, batch_import_params, build_import_params
+
+
+def test_batch_params_concatenate_every_store(make_store, clauses):
+    stores = [make_store(clauses("Alpha", 3), filename="Alpha.pdf"), make_store(clauses("Beta", 5), filename="Beta.pdf")]
+    batch = batch_import_params(stores)
+    single = [build_import_params(s) for s in stores]
+
+    assert batch["docs"] == [p["doc"] for p in single]
+    assert [(s["doc_id"], s["section_id"]) for s in batch["sections"]] == [
+        (p["doc"]["doc_id"], s["section_id"]) for p in single for s in p["sections"]]
+    for key in ("parent_rels", "next_rels", "definitions", "xrefs"):
+        assert batch[key] == [x for p in single for x in p[key]]
+    assert batch["next_rels"]
+
+
+def test_batch_statements_only_read_batch_keys(make_store, clauses):
+    batch = batch_import_params([make_store(clauses("Alpha", 1))])
+    for q in IMPORT_BATCH_STATEMENTS:
+        params = {tok.split()[0].rstrip(".,)") for tok in q.split("$")[1:]}
+        assert params <= set(batch), params - set(batch)
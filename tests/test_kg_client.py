@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.kg_memory import AsyncMemoryKGClient
+from main import app
+
+
+def test_one_kg_client_serves_every_request(monkeypatch):
+    monkeypatch.setattr(settings, "kg_backend", "memory")
+    closed = []
+
+    async def close(self):
+        closed.append(self)
+
+    monkeypatch.setattr(AsyncMemoryKGClient, "close", close)
+    with TestClient(app) as client:
+        kg = app.state.kg
+        assert isinstance(kg, AsyncMemoryKGClient)
+        for _ in range(3):
+            assert client.post("/api/kg/texts/gc").status_code == 200
+        assert app.state.kg is kg
+        assert closed == []
+    assert closed == [kg]
+    assert app.state.kg is None
+
+
+def test_kg_endpoints_need_a_backend(monkeypatch):
+    monkeypatch.setattr(settings, "kg_backend", "neo4j")
+    monkeypatch.setattr(settings, "neo4j_uri", "")
+    with TestClient(app) as client:
+        assert client.post("/api/kg/texts/gc").status_code == 503
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services.kg_memory import AsyncMemoryKGClient, MemoryGraph
+from app.services.kg_sqlite import AsyncSQLiteKGClient
+
+
+@pytest.fixture
+def versions(make_store, clauses):
+    """Two versions of merger.pdf: the second edits one clause, so it gets a new doc_id."""
+    elements = clauses("Definitions", 29)
+    edited = [dict(e) for e in elements]
+    edited[5]["text"] = edited[5]["text"].replace("clause", "article")
+    return make_store(elements, filename="merger.pdf"), make_store(edited, filename="merger.pdf")
+
+
+def _delta_twice(kg, versions):
+    old, new = versions
+    assert old["document"]["doc_id"] != new["document"]["doc_id"]
+    asyncio.run(kg.import_store(old, mode="delta", doc_key="merger"))
+    return asyncio.run(kg.import_store(new, mode="delta", doc_key="merger"))
+
+
+def test_memory_delta_writes_only_the_edited_section(versions):
+    graph = MemoryGraph()
+    result = _delta_twice(AsyncMemoryKGClient(graph), versions)
+    assert result["sections_written"] == 1
+    assert result["sections_removed"] == 0
+    assert graph.counts()["Document"] == 1
+    assert graph.counts()["Section"] == len(versions[1]["sections"])
+
+    fresh = MemoryGraph()
+    asyncio.run(AsyncMemoryKGClient(fresh).import_store(versions[1], doc_key="merger"))
+    assert graph.nodes == fresh.nodes
+    assert graph.rels == fresh.rels
+
+
+def test_sqlite_delta_writes_only_the_edited_section(tmp_path, versions):
+    kg = AsyncSQLiteKGClient(str(tmp_path / "store.db"))
+    result = _delta_twice(kg, versions)
+    assert result["sections_written"] == 1
+    conn = kg.store.conn
+    assert [r[0] for r in conn.execute("SELECT doc_id FROM documents")] == [versions[1]["document"]["doc_id"]]
+    assert conn.execute("SELECT count(*) FROM sections").fetchone()[0] == len(versions[1]["sections"])
+
+
+def _unrelated(make_store, clauses):
+    return make_store(clauses("Alpha", 3), filename="contract.pdf"), make_store(clauses("Beta", 4), filename="contract.pdf")
+
+
+def test_memory_delta_keeps_unrelated_documents_with_the_same_filename(make_store, clauses):
+    graph = MemoryGraph()
+    kg = AsyncMemoryKGClient(graph)
+    alpha, beta = _unrelated(make_store, clauses)
+    asyncio.run(kg.import_store(alpha, mode="delta"))
+    result = asyncio.run(kg.import_store(beta, mode="delta"))
+    assert result["previous_doc_id"] is None
+    assert result["superseded_doc_ids"] == []
+    assert graph.counts()["Document"] == 2
+    assert graph.counts()["Section"] == len(alpha["sections"]) + len(beta["sections"])
+
+
+def test_sqlite_delta_keeps_unrelated_documents_with_the_same_filename(tmp_path, make_store, clauses):
+    kg = AsyncSQLiteKGClient(str(tmp_path / "store.db"))
+    alpha, beta = _unrelated(make_store, clauses)
+    asyncio.run(kg.import_store(alpha, mode="delta"))
+    result = asyncio.run(kg.import_store(beta, mode="delta"))
+    assert result["previous_doc_id"] is None
+    conn = kg.store.conn
+    assert conn.execute("SELECT count(*) FROM documents").fetchone()[0] == 2
+    assert conn.execute("SELECT count(*) FROM sections").fetchone()[0] == len(alpha["sections"]) + len(beta["sections"])
+
+
+def test_delta_prunes_other_versions_only_when_asked(versions, make_store, clauses):
+    graph = MemoryGraph()
+    kg = AsyncMemoryKGClient(graph)
+    old, new = versions
+    asyncio.run(kg.import_store(old, doc_key="merger"))
+    asyncio.run(kg.import_store(new, doc_key="merger"))
+    third = clauses("Definitions", 29)
+    third[0]["text"] = "ARTICLE I Defined Terms"
+
+    kept = asyncio.run(kg.import_store(make_store(third, filename="merger.pdf"), mode="delta", doc_key="merger"))
+    assert kept["superseded_doc_ids"] == []
+    assert graph.counts()["Document"] == 2
+
+    fourth = [dict(e, text=e["text"].replace("Agreement", "Contract")) for e in third]
+    pruned = asyncio.run(kg.import_store(make_store(fourth, filename="merger.pdf"), mode="delta",
+                                         doc_key="merger", prune_versions=True))
+    assert len(pruned["superseded_doc_ids"]) == 1
+    assert graph.counts()["Document"] == 1
+    assert graph.counts()["Section"] == len(third)
@@ -0,0 +1,15 @@
+import pytest
+
+from app.cli.loadtest import _percentile
+
+
+@pytest.mark.parametrize("n, pct, expected", [
+    (100, 50, 50), (100, 95, 95), (100, 99, 99), (100, 100, 100),
+    (100, 7, 7), (20, 95, 19), (20, 50, 10), (10, 90, 9), (1, 99, 1), (3, 0, 1),
+])
+def test_nearest_rank_percentile(n, pct, expected):
+    assert _percentile([float(x) for x in range(1, n + 1)], pct) == expected
+
+
+def test_percentile_of_nothing():
+    assert _percentile([], 95) is None
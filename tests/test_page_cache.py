@@ -0,0 +1,53 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app.services.page_cache import PageCache, extract_pages_cached
+
+
+def _pdf(pages=3):
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {n} text")
+    return fitz.open(stream=doc.tobytes(), filetype="pdf")
+
+
+def _extract(calls):
+    """Unstructured-like extractor: the page 2-3 body elements hang off the page 1 title."""
+    def extract(doc, pages, filename):
+        calls.append(list(pages))
+        out = {}
+        for n in pages:
+            els = [{"type": "NarrativeText", "element_id": f"body-{n}", "text": f"body {n}",
+                    "metadata": {"page_number": n, "parent_id": "title-1"}}]
+            if n == 1:
+                els.insert(0, {"type": "Title", "element_id": "title-1", "text": "ARTICLE I", "metadata": {"page_number": 1}})
+            out[n] = els
+        return out
+    return extract
+
+
+def test_hit_and_miss_build_the_same_hierarchy(tmp_path):
+    doc = _pdf()
+    calls = []
+    cache = PageCache(str(tmp_path))
+    miss, miss_stats = extract_pages_cached(doc, [1, 2, 3], "t.pdf", "test", _extract(calls), cache)
+    assert miss_stats["cache_hits"] == 0
+
+    # fresh in-memory tier: served from disk
+    hit, hit_stats = extract_pages_cached(doc, [1, 2, 3], "t.pdf", "test", _extract(calls), PageCache(str(tmp_path)))
+    assert hit_stats["cache_hits"] == 3
+    assert calls == [[1, 2, 3]]
+    assert hit == miss
+
+    title_id = miss[1][0]["element_id"]
+    assert [miss[n][-1]["metadata"]["parent_id"] for n in (1, 2, 3)] == [title_id] * 3
+
+
+def test_cross_page_parent_on_missing_page_is_dropped(tmp_path):
+    doc = _pdf()
+    cache = PageCache(str(tmp_path))
+    extract_pages_cached(doc, [1, 2, 3], "t.pdf", "test", _extract([]), cache)
+    subset, _ = extract_pages_cached(doc, [2, 3], "t.pdf", "test", _extract([]), cache)
+    assert subset[2][0]["metadata"]["parent_id"] is None
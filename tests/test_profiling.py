@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+from app.core.profiling import RequestProfiler
+
+
+async def _queued_behind_another_profile():
+    first, second = RequestProfiler("first"), RequestProfiler("second")
+    entered = asyncio.Event()
+    threads = threading.active_count()
+
+    async def queued():
+        async with second:
+            entered.set()
+
+    async with first:
+        task = asyncio.create_task(queued())
+        await asyncio.sleep(0.05)
+        assert not entered.is_set()
+        assert threading.active_count() == threads
+    await asyncio.wait_for(task, 1)
+    assert entered.is_set()
+
+
+def test_queued_profile_waits_on_the_loop_not_a_thread():
+    asyncio.run(_queued_behind_another_profile())
+
+
+def test_each_event_loop_gets_its_own_lock():
+    # a lock shared across loops is bound to the first one that waited on it
+    asyncio.run(_queued_behind_another_profile())
+    asyncio.run(_queued_behind_another_profile())
@@ -0,0 +1,42 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from starlette.requests import Request
+
+from app.core import responses
+from app.core.config import settings
+
+
+def _request(accept_encoding):
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]})
+
+
+def _respond(monkeypatch, payload):
+    threads = []
+    compress = responses.compress_body
+
+    def recording(body, encoding):
+        threads.append(threading.current_thread())
+        return compress(body, encoding)
+
+    monkeypatch.setattr(responses, "compress_body", recording)
+    response = asyncio.run(responses.json_response(payload, _request(b"gzip")))
+    return response, threads
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "compress_threadpool_bytes", 4096)
+    payload = {"sections": [{"text": f"clause {i}"} for i in range(1000)]}
+    response, threads = _respond(monkeypatch, payload)
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == payload
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_small_bodies_are_compressed_inline(monkeypatch):
+    monkeypatch.setattr(settings, "compress_threadpool_bytes", 1 << 30)
+    response, threads = _respond(monkeypatch, {"text": "x" * 2048})
+    assert response.headers["content-encoding"] == "gzip"
+    assert threads == [threading.main_thread()]
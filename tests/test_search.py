@@ -0,0 +1,34 @@
+import asyncio
+
+from app.services.kg_memory import AsyncMemoryKGClient, MemoryGraph
+from app.services.search import SEARCH_CACHE, highlight, search_sections
+
+
+def test_highlight_escapes_section_markup():
+    text = 'Buyer shall pay <script>alert("x")</script> & the Seller shall deliver the Shares.'
+    out = highlight(text, ["Seller", "amp"], snippet_chars=0)
+    assert "<script>" not in out
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; the <em>Seller</em>" in out
+    assert out.count("<em>") == 1
+
+
+def test_highlight_escapes_without_terms():
+    assert highlight("a < b", [], snippet_chars=10) == "a &lt; b"
+
+
+def test_search_cached_during_an_import_is_dropped_after_it(make_store, clauses, monkeypatch):
+    graph = MemoryGraph()
+    kg = AsyncMemoryKGClient(graph)
+    store = make_store(clauses("Alpha", 3))
+    doc_id = store["document"]["doc_id"]
+    write = graph.import_params
+
+    def write_racing_a_search(params):
+        # a search that runs while the import is writing caches the old rows
+        SEARCH_CACHE.set("racing", {"hits": []}, tags=(doc_id,))
+        write(params)
+
+    monkeypatch.setattr(graph, "import_params", write_racing_a_search)
+    asyncio.run(kg.import_store(store))
+    assert SEARCH_CACHE.get("racing") is None
+    assert asyncio.run(search_sections(kg, "Alpha", [doc_id]))["hits"]
@@ -0,0 +1,43 @@
+from app.core.config import settings
+from app.services import similarity, spatial
+from app.services.similarity import ClauseIndex
+
+STORE = {
+    "document": {"doc_id": "doc-1"},
+    "sections": [
+        {"section_id": "s1", "sequence": 1, "spans": [{"page": 1, "bbox": [10, 10, 100, 40]}]},
+        {"section_id": "s2", "sequence": 2, "spans": [{"page": 1, "bbox": [10, 50, 100, 80]}]},
+    ],
+}
+
+
+def test_spatial_index_registered_by_another_worker_is_read_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "spatial_index_dir", str(tmp_path))
+    registered = spatial.register_spatial_index(STORE)
+    spatial.SPATIAL_INDEXES.clear()  # a worker that never saw the registration
+
+    index = spatial.get_spatial_index("doc-1")
+    assert index is not None
+    assert index.summary() == registered.summary()
+    assert [h["section_id"] for h in index.query_point(1, 50, 60)] == ["s2"]
+
+
+def test_shared_similarity_index_sees_other_workers_writes(tmp_path, monkeypatch, make_store, clauses):
+    path = str(tmp_path / "index.npz")
+    monkeypatch.setattr(settings, "similarity_index_path", path)
+    monkeypatch.setattr(settings, "similarity_shared", True)
+    monkeypatch.setattr(similarity, "_INDEX", None)
+    monkeypatch.setattr(similarity, "_INDEX_STAMP", None)
+
+    a = make_store(clauses("Alpha", 3, title=False), filename="a.pdf")
+    b = make_store(clauses("Beta", 4, title=False), filename="b.pdf")
+    similarity.register_similarity(a)
+    # another worker: loads the saved index, adds a document and saves under the lock
+    with similarity._file_lock(path, exclusive=True):
+        other = ClauseIndex.load(path)
+        other.add_store(b)
+        other.save(path)
+
+    assert similarity.get_clause_index().stats()["documents"] == 2
+    similarity.update_clause_index(lambda index: index.remove_document(a["document"]["doc_id"]))
+    assert ClauseIndex.load(path).stats()["documents"] == 1
@@ -0,0 +1,39 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.routers import extraction
+from main import app
+
+
+def test_stream_builds_off_the_loop_and_keeps_the_documented_order(make_store, clauses, monkeypatch):
+    elements = clauses("Alpha", 4) + clauses("Beta", 3)
+    threads = []
+    builder_cls = extraction.StoreBuilder
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return builder_cls(*args, **kwargs)
+
+    loop_threads = []
+    admit = extraction.admit
+
+    async def recording_admit(name):
+        loop_threads.append(threading.current_thread())
+        return await admit(name)
+
+    monkeypatch.setattr(extraction, "StoreBuilder", recording)
+    monkeypatch.setattr(extraction, "admit", recording_admit)
+    with TestClient(app) as client:
+        resp = client.post("/api/extraction/structure?stream=true",
+                           files={"file": ("deal.json", json.dumps(elements), "application/json")})
+    assert resp.status_code == 200
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert records[0]["record"] == "document"
+    assert records[-1]["record"] == "end"
+    assert threads and loop_threads and threads[0] is not loop_threads[0]
+
+    streamed = [r["data"] for r in records if r["record"] == "section"]
+    built = make_store(elements, filename="deal.json", extracted_with="unstructured.io")["sections"]
+    assert sorted(streamed, key=lambda s: (s["parent_element_id"] or "", s["sequence"])) == built
@@ -0,0 +1,10 @@
+from app.services.tree import euler_intervals
+
+
+def test_intervals_nest_descendants_inside_ancestors():
+    tree = euler_intervals({None: ["a", "d"], "a": ["b", "c"], "b": ["b1"]})
+    inside = lambda x, y: tree[x]["pre"] < tree[y]["pre"] and tree[y]["post"] < tree[x]["post"]
+    assert inside("a", "b1") and inside("b", "b1") and inside("a", "c")
+    assert not inside("b", "c") and not inside("a", "d")
+    assert tree["b1"]["depth"] == 2
+    assert tree["b1"]["ancestors"] == ["a", "b"]